@@ -0,0 +1,143 @@
+import os
+import time
+
+try:
+    import numpy as np
+    USE_NUMPY = True
+except Exception:
+    USE_NUMPY = False
+
+# ── Akustische Sprecherzuordnung (ohne LLM) ───────────────────────────────
+# Pro Segment ein kompaktes Stimmprofil aus dem 16-kHz-PCM: Mel-Cepstren
+# (Mittelwert + Streuung über die lauteren Frames), über die ganze Aufnahme
+# normiert. Zwei Cluster (k-means, Kosinus) → zwei Sprecher; welcher Cluster
+# der Arzt ist, entscheidet eine einfache Heuristik (stellt mehr Fragen,
+# bei Gleichstand: spricht zuerst). Läuft auf der CPU in Sekunden.
+ACOUSTIC_MIN_SEG   = float(os.getenv("ACOUSTIC_MIN_SEG", "1.0"))     # Sekunden; kürzere Segmente bestimmen die Cluster nicht mit
+ACOUSTIC_N_MELS    = int(os.getenv("ACOUSTIC_N_MELS", "24"))
+ACOUSTIC_N_CEPS    = int(os.getenv("ACOUSTIC_N_CEPS", "13"))
+_FRAME_MS, _HOP_MS, _NFFT = 25.0, 10.0, 512
+_VOICED_PERCENTILE = 30     # leiseste Frames eines Segments (Pausen, Atmen) fließen nicht ins Profil ein
+_KMEANS_ITER = 20
+
+_MEL_CACHE: dict[tuple[int, int], "np.ndarray"] = {}
+
+
+def _mel_filterbank(sample_rate: int, n_mels: int) -> "np.ndarray":
+    """Dreieckige Mel-Filter (n_mels × NFFT/2+1), pro (Rate, Bänder) einmal gebaut."""
+    key = (sample_rate, n_mels)
+    fb = _MEL_CACHE.get(key)
+    if fb is not None:
+        return fb
+    mel = lambda f: 2595.0 * np.log10(1.0 + f / 700.0)
+    hz = lambda m: 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+    edges = hz(np.linspace(mel(60.0), mel(sample_rate / 2.0 - 200.0), n_mels + 2))
+    bins = np.fft.rfftfreq(_NFFT, 1.0 / sample_rate)
+    lo, mid, hi = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    fb = np.maximum(0.0, np.minimum((bins - lo) / (mid - lo), (hi - bins) / (hi - mid))).astype(np.float32)
+    _MEL_CACHE[key] = fb
+    return fb
+
+
+def _dct_matrix(n_in: int, n_out: int) -> "np.ndarray":
+    k = np.arange(n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    return np.cos(np.pi * k * (2 * n + 1) / (2.0 * n_in)).astype(np.float32)
+
+
+def _segment_embedding(x: "np.ndarray", sample_rate: int, fb: "np.ndarray", dct: "np.ndarray") -> "np.ndarray | None":
+    """Stimmprofil eines Segments (float32-Samples) → Mittelwert + Streuung der Cepstren 1..N, None wenn zu kurz."""
+    frame = int(sample_rate * _FRAME_MS / 1000.0)
+    hop = int(sample_rate * _HOP_MS / 1000.0)
+    if len(x) < frame + hop:
+        return None
+    n = 1 + (len(x) - frame) // hop
+    idx = np.arange(frame)[None, :] + hop * np.arange(n)[:, None]
+    frames = x[idx] * np.hamming(frame).astype(np.float32)
+    power = np.abs(np.fft.rfft(frames, n=_NFFT, axis=1)) ** 2
+    energy = power.sum(axis=1)
+    voiced = energy >= np.percentile(energy, _VOICED_PERCENTILE)
+    if voiced.sum() < 3:
+        return None
+    ceps = np.log(power[voiced] @ fb.T + 1e-10) @ dct.T
+    ceps = ceps[:, 1:]                      # c0 = Lautstärke → sagt nichts über den Sprecher
+    return np.concatenate([ceps.mean(axis=0), ceps.std(axis=0)])
+
+
+def _kmeans2(emb: "np.ndarray", weights: "np.ndarray") -> "np.ndarray":
+    """Zwei Zentren (Kosinus, nach Dauer gewichtet); Start: entferntestes Profil und das davon entfernteste."""
+    c0 = emb[np.argmin(emb @ (weights @ emb))]
+    c1 = emb[np.argmin(emb @ c0)]
+    centers = np.stack([c0, c1])
+    for _ in range(_KMEANS_ITER):
+        labels = np.argmax(emb @ centers.T, axis=1)
+        new = centers.copy()
+        for k in (0, 1):
+            m = labels == k
+            if m.any():
+                c = weights[m] @ emb[m]
+                new[k] = c / (np.linalg.norm(c) or 1.0)
+        if np.allclose(new, centers):
+            break
+        centers = new
+    return centers
+
+
+def speaker_labels_acoustic(blocks: list[dict], pcm: bytes, sample_rate: int = 16000) -> list[str]:
+    """
+    Sprecher je Block ("Arzt"/"Patient"/"Unbekannt") aus dem Audio; blocks brauchen start/end in
+    Sekunden relativ zum Anfang von pcm (PCM16 mono). Blöcke ohne Zeitstempel/Audio → "Unbekannt".
+    """
+    labels = ["Unbekannt"] * len(blocks)
+    if not USE_NUMPY or not blocks or not pcm:
+        return labels
+    t0 = time.perf_counter()
+    x = np.frombuffer(pcm[: len(pcm) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+    fb = _mel_filterbank(sample_rate, ACOUSTIC_N_MELS)
+    dct = _dct_matrix(ACOUSTIC_N_MELS, ACOUSTIC_N_CEPS)
+
+    idx, emb, dur = [], [], []
+    for i, b in enumerate(blocks):
+        if b.get("start") is None or b.get("end") is None:
+            continue
+        s, e = int(b["start"] * sample_rate), int(b["end"] * sample_rate)
+        v = _segment_embedding(x[max(0, s):max(0, e)], sample_rate, fb, dct)
+        if v is not None:
+            idx.append(i)
+            emb.append(v)
+            dur.append(b["end"] - b["start"])
+    if not idx:
+        return labels
+
+    emb = np.asarray(emb, dtype=np.float32)
+    emb = (emb - emb.mean(axis=0)) / (emb.std(axis=0) + 1e-6)      # über die Aufnahme normieren (Raum, Mikrofon)
+    emb /= np.linalg.norm(emb, axis=1, keepdims=True) + 1e-9
+    dur = np.asarray(dur, dtype=np.float32)
+    fit = dur >= ACOUSTIC_MIN_SEG
+    if fit.sum() < 2:
+        fit = np.ones(len(idx), dtype=bool)
+    if len(idx) < 2:
+        cluster = np.zeros(1, dtype=int)
+    else:
+        centers = _kmeans2(emb[fit], dur[fit])
+        cluster = np.argmax(emb @ centers.T, axis=1)
+
+    # Arzt = Cluster mit mehr Fragen (pro Segment); bei Gleichstand der, der zuerst spricht
+    questions = [0.0, 0.0]
+    counts = [0, 0]
+    for k, i in zip(cluster, idx):
+        counts[k] += 1
+        questions[k] += (blocks[i].get("text") or "").rstrip().endswith("?")
+    rate = [questions[k] / counts[k] if counts[k] else 0.0 for k in (0, 1)]
+    doctor = int(cluster[0]) if abs(rate[0] - rate[1]) < 1e-9 else int(np.argmax(rate))
+    for k, i in zip(cluster, idx):
+        labels[i] = "Arzt" if k == doctor else "Patient"
+
+    print(f"🗣️ Akustische Sprecherzuordnung: {len(idx)}/{len(blocks)} Segmente, "
+          f"Cluster {counts[0]}/{counts[1]}, {1000 * (time.perf_counter() - t0):.0f} ms")
+    return labels
+
+
+def assign_speakers_acoustic(blocks: list[dict], pcm: bytes, sample_rate: int = 16000) -> list[str]:
+    """Wie assign_speakers_llm, aber akustisch: Zeilen "Arzt: …"/"Patient: …"/"Unbekannt: …"."""
+    return [f"{spk}: {b['text']}" for spk, b in zip(speaker_labels_acoustic(blocks, pcm, sample_rate), blocks)]
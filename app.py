@@ -1,29 +1,52 @@
-from flask import Flask, request, render_template, session, jsonify, redirect, url_for, flash
+from flask import Flask, Response, request, render_template, session, jsonify, redirect, url_for, flash
 from difflib import SequenceMatcher
 from collections import defaultdict
 from werkzeug.middleware.proxy_fix import ProxyFix
 import subprocess
-import shlex
-import os, requests, tempfile
+import os
 import re
 import json
 import uuid
 import glob
-import shutil
 import time
-try:
-    from rapidfuzz import process, fuzz
-    USE_RAPIDFUZZ = True
-except Exception:
-    USE_RAPIDFUZZ = False
+import threading
+import struct
 
 
 from datetime import datetime
-from utils import transcribe_with_whispercpp, assign_speakers_llm, summarize_with_lmstudio, get_gespraechsdauer_from_vtt, MODEL_PATH
+from concurrent.futures import ThreadPoolExecutor
+from utils import (
+    assign_speakers_llm, assign_speakers_llm_batched, summarize_with_lmstudio, get_gespraechsdauer_from_vtt,
+    get_whisper_pool, write_wav_pcm, read_wav_pcm, wav_duration, write_vtt, blocks_duration,
+    transcribe_long_audio, trim_leading_overlap, transcribe_pcm, pcm_duration, speaker_labels_batched, warm_up_llm, MODEL_PATH,
+)
+from audio_ingest import ingest_chunk
+from med_terms import MED_TERMS, MedTermIndex, USE_RAPIDFUZZ
+from session_transcript import SessionTranscript
+from summary_stream import SUMMARY_STREAMS
+from live_notes import LiveNotes, LIVE_NOTES_MIN_CHARS
+from acoustic_diarization import assign_speakers_acoustic
+from speaker_classifier import speaker_labels_classifier
+from vad import new_session_vad, speech_bounds, has_speech_between, VAD_MIN_SPEECH
+from whisper_pool import pool_stats
+from llm_client import LLM, LLM_MEMO
+from llm_router import ROUTER
+from asr_cache import TRANSCRIPT_CACHE
+from jobs import JobQueue
+from scheduler import SCHEDULER, LIVE, FINALIZE, BATCH, with_priority, priority
+
+try:
+    from flask_sock import Sock
+    from simple_websocket import ConnectionClosed
+    USE_WEBSOCKET = True
+except Exception:
+    USE_WEBSOCKET = False
+    ConnectionClosed = EOFError   # Platzhalter – ohne flask-sock gibt es /ws/live nicht
 
 app = Flask(__name__)
 
 app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1, x_proto=1, x_host=1, x_port=1)
+sock = Sock(app) if USE_WEBSOCKET else None
 
 def _safe_unlink(path: str) -> bool:
     try:
@@ -34,56 +57,13 @@ def _safe_unlink(path: str) -> bool:
         print(f"⚠️ Löschen fehlgeschlagen: {path} -> {e}")
     return False
 
-def _load_med_terms(path="medical_terms_de.txt"):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
-    except Exception:
-        return []
-
-def _match_case(src: str, cand: str) -> str:
-    # Groß-/Kleinschreibung vom Originalwort übernehmen
-    if src.isupper(): return cand.upper()
-    if src.istitle(): return cand[:1].upper() + cand[1:]
-    if src.islower(): return cand.lower()
-    return cand
-
 def med_postprocess(text: str, terms=None, cutoff=0.90) -> str:
-    import re
-    replaced = 0
-    if terms is None:
-        terms = _load_med_terms()
-    if not terms:
-        return text
-
-    tokens = re.findall(r"\w+|[^\w\s]+|\s+", text, flags=re.UNICODE)
-    out = []
-    for tok in tokens:
-        if tok.strip() and tok.isalpha() and len(tok) >= 4:  # Mini-Filter
-            if 'USE_RAPIDFUZZ' in globals() and USE_RAPIDFUZZ:
-                from rapidfuzz import process, fuzz
-                cand = process.extractOne(tok, terms, scorer=fuzz.WRatio)
-                if cand and (cand[1] / 100.0) >= cutoff:
-                    out.append(_match_case(tok, cand[0]))
-                    replaced += 1
-                else:
-                    out.append(tok)
-            else:
-                from difflib import get_close_matches
-                m = get_close_matches(tok, terms, n=1, cutoff=cutoff)
-                if m:
-                    out.append(_match_case(tok, m[0]))
-                    replaced += 1
-                else:
-                    out.append(tok)
-        else:
-            out.append(tok)
-
-    result = "".join(out)
-    try:
-        print(f"🔎 med_postprocess: backend={'rapidfuzz' if USE_RAPIDFUZZ else 'difflib'}, terms={len(terms)}, replacements={replaced}")
-    except Exception:
-        pass
+    """Fachwort-Korrektur über den vorkompilierten Index (med_terms.py); terms=None → MED_TERMS_FILE."""
+    index = MED_TERMS if terms is None else MedTermIndex.from_terms(terms)
+    t0 = time.time()
+    result, replaced = index.correct(text, cutoff=cutoff)
+    print(f"🔎 med_postprocess: backend={'rapidfuzz' if USE_RAPIDFUZZ else 'difflib'}, terms={index.n_terms}, "
+          f"replacements={replaced}, {1000 * (time.time() - t0):.1f} ms")
     return result
 
 def preprocess_audio_chunk_soft(input_path: str, output_path: str, timeout: int = 20) -> str:
@@ -201,14 +181,35 @@ UPLOAD_FOLDER = "uploads"
 
 # Live-Streaming Session State
 SESSION_TRANSCRIPTS = {}
-SESSION_TEXT = {}                      # session_id -> kumulativer Text (für UI)
+SESSION_TEXT = {}                      # session_id -> SessionTranscript (kumulativer Live-Text für UI)
 SESSION_CHUNK_IDX = defaultdict(int)   # session_id -> laufende Nummer
-SESSION_CHUNK_WAVS = defaultdict(list) # session_id -> Liste der absoluten Chunk-WAV-Pfade
+SESSION_CHUNKS = defaultdict(list)     # session_id -> Liste der Chunk-Ergebnisse (idx, pcm, duration, blocks, ok)
+SESSION_BOUNDARIES = defaultdict(dict) # session_id -> {linker idx: Segmente des Grenz-Fensters}
+SESSION_VAD = {}                       # session_id -> EnergyVAD (adaptiver Rauschboden) oder None
+SESSION_NOTES = {}                     # session_id -> LiveNotes (laufende Notizen für die Zusammenfassung)
+SESSION_DIAR = {}                      # session_id -> Hintergrund-Sprecherzuordnung (siehe _diarize_live)
+SESSION_INGEST_LOCKS = {}              # session_id -> Lock: Sequenz-Prüfung + VAD + Anlegen des Chunks atomar
+SESSION_FINALIZE = {}                  # session_id -> {"done": Event, "result", "at"} – Finalisierung nur einmal
+SESSION_FINALIZE_LOCK = threading.Lock()
+FINALIZE_RESULT_TTL = 600              # Sekunden, die ein Ergebnis für späte Zweitaufrufe bereitliegt
 
 # Limits & Timeouts
 FFMPEG_TIMEOUT = 15         # Sekunden pro ffmpeg-Aufruf
-MAX_SESSION_TEXT = 20000    # Zeichen (UI bremst sonst aus)
+UPLOAD_FFMPEG_TIMEOUT = 600 # Sekunden – ganze Uploads (Hintergrund-Job) brauchen länger als Live-Chunks
 OVERLAP_TRIM_MS = int(os.getenv("OVERLAP_TRIM_MS", "700"))
+FINALIZE_MODE = os.getenv("FINALIZE_MODE", "chunks")  # "chunks" = aus Live-Ergebnissen, "full" = komplette Neu-Transkription
+FINALIZE_BOUNDARY_SEC = float(os.getenv("FINALIZE_BOUNDARY_SEC", "1.5"))  # Fenster je Seite einer Chunk-Grenze
+
+# Grenz-Fenster werden schon während der Aufnahme im Hintergrund dekodiert
+BOUNDARY_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="boundary")
+
+# Beim Session-Start das LLM laden und den festen Teil des Zusammenfassungs-Prompts vorab auswerten
+WARMUP_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-warmup")
+
+# Sprecherzuordnung läuft (Modus "llm") ebenfalls schon während der Aufnahme mit
+DIAR_LIVE_EVERY = int(os.getenv("DIAR_LIVE_EVERY", "3"))      # Chunks pro Hintergrund-Lauf, 0 = erst bei Finalisierung
+DIAR_LIVE_WAIT = float(os.getenv("DIAR_LIVE_WAIT", "20"))     # Sekunden, die die Finalisierung auf einen laufenden Lauf wartet
+DIAR_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-diar")
 
 
 os.makedirs(TRANSKRIPT_DIR, exist_ok=True)
@@ -259,35 +260,16 @@ def save_file_safely(path: str, content: str) -> None:
     except Exception as e:
         print(f"⚠️ Konnte Datei nicht speichern ({path}):", e)
 
-def lm_base_url(gen_url: str) -> str:
-    try:
-        if "/api/" in gen_url:
-            return gen_url.split("/api/")[0]
-        return gen_url.rstrip("/")
-    except Exception:
-        return gen_url.rstrip("/")
-
-def list_ollama_models(gen_url: str) -> list[str]:
+def list_ollama_models() -> list[str]:
     """
-    Fragt eine Ollama/LM-Studio-kompatible Instanz nach verfügbaren Modellen.
-    Erwartet GET {base}/api/tags → { "models": [{"name": "..."}] }.
+    Verfügbare Modelle aller erreichbaren LLM-Server (LLM_BACKENDS bzw. LMSTUDIO_URL).
+    Erwartet je Server GET {base}/api/tags → { "models": [{"name": "..."}] }.
     """
-    base = lm_base_url(gen_url)
-    url = f"{base}/api/tags"
     try:
-        r = requests.get(url, timeout=8)
-        r.raise_for_status()
-        data = r.json() if r.headers.get("content-type","").startswith("application/json") else {}
-        models = data.get("models", [])
-        names = []
-        for m in models:
-            name = m.get("name")
-            if isinstance(name, str) and name.strip():
-                names.append(name.strip())
-        return names
+        return ROUTER.models()
     except Exception:
         return []
-        
+
 
 def preprocess_audio(input_path: str, output_path: str, timeout: int = 30) -> str:
     """
@@ -415,16 +397,19 @@ def dedupe_sentences(text: str) -> str:
     Entfernt direkt aufeinanderfolgende Dopplungen/Varianten auf Satzebene.
     Sehr defensiv, damit nichts Gutes verloren geht.
     """
-    import re
-    from difflib import SequenceMatcher
-
     s = (text or "").strip()
     if not s:
         return s
+    return "\n".join(_dedupe_sentence_list(s)[0])
+
+def _dedupe_sentence_list(text: str, last_norm: str | None = None) -> tuple[list[str], str | None]:
+    """Kern von dedupe_sentences: Sätze von text ohne Dopplungen (auch gegenüber last_norm) → (Sätze, letzter Satz normiert)."""
+    import re
+    from difflib import SequenceMatcher
+
     # Sätze naiv splitten (nach ., !, ?)
-    sents = re.split(r'(?<=[\.\!\?])\s+', s)
+    sents = re.split(r'(?<=[\.\!\?])\s+', (text or "").strip())
     out = []
-    last_norm = None
 
     for sent in sents:
         t = sent.strip()
@@ -439,31 +424,192 @@ def dedupe_sentences(text: str) -> str:
         out.append(t)
         last_norm = norm
 
-    return "\n".join(out)
+    return out, last_norm
 
-def merge_with_overlap(prev: str, new: str, lookback: int = 400, min_overlap: int = 16) -> str:
+def dedupe_blocks(blocks: list[dict]) -> list[dict]:
     """
-    Führt prev + new zusammen, indem es den besten Suffix/Prefix-Overlap (bis lookback Zeichen)
-    sucht und doppelte Passagen vermeidet. Gut für Live-Text mit Audio-Overlap.
+    dedupe_sentences über die Segmente, aber pro Segment: Sätze eines Segments bleiben in einer Zeile,
+    Segmente ohne verbleibenden Text entfallen. Für die Sprecherzuordnung – vorher deduplizieren,
+    damit jede Dialog-Zeile ihr „Arzt:“/„Patient:“ behält.
     """
-    prev = prev or ""
-    new  = (new or "").strip()
-    if not new:
-        return prev
+    out, last_norm = [], None
+    for b in blocks:
+        sents, last_norm = _dedupe_sentence_list(b.get("text", ""), last_norm)
+        if sents:
+            out.append({**b, "text": " ".join(sents)})
+    return out
+
+def _live_delta(session_id: str, known: int | None = None) -> dict:
+    """
+    Live-Text als Delta für die UI: alles ab known (Zeichen, die der Client schon hat).
+    → {'offset', 'delta', 'length', 'rev'}; offset 0 = kompletter Text (Resync / Client ohne known).
+    """
+    st = SESSION_TEXT.get(session_id)
+    if st is None:
+        return {'offset': 0, 'delta': '', 'length': 0, 'rev': 0}
+    offset, delta = st.since(known or 0)
+    return {'offset': offset, 'delta': delta, 'length': len(st), 'rev': st.rev}
+
+def _client_known() -> int | None:
+    """Vom Client gemeldete Länge seines Live-Texts (Form-Feld oder Query 'known')."""
+    try:
+        return int(request.values.get('known', ''))
+    except ValueError:
+        return None
 
-    import difflib
-    tail = prev[-lookback:] if prev else ""
-    if tail.endswith(new):
-        return prev
+def _chunk_trim_sec(i: int) -> float:
+    # alle Chunks außer dem ersten beginnen mit OVERLAP_TRIM_MS Überlappung zum Vorgänger
+    return (OVERLAP_TRIM_MS / 1000.0) if i > 0 else 0.0
 
-    sm = difflib.SequenceMatcher(a=tail, b=new, autojunk=False)
-    match = sm.find_longest_match(0, len(tail), 0, len(new))
-    if match.size >= min_overlap:
-        add = new[match.b + match.size:]
-        return (prev + add).strip()
+def _transcribe_chunk(rec: dict, model_path: str) -> str:
+    """
+    Dekodiert einen Chunk-Record – nur den Bereich zwischen erstem und letztem Sprachabschnitt (VAD);
+    Zeitstempel werden wieder auf Chunk-Zeit verschoben. Setzt rec["blocks"]/rec["ok"], liefert den Text.
+    """
+    pcm, lead = rec["pcm"], 0.0
+    bounds = speech_bounds(rec["speech"]) if rec.get("speech") is not None else None
+    if bounds is not None:
+        lead = bounds[0]
+        pcm = pcm[int(bounds[0] * 16000) * 2:int(bounds[1] * 16000) * 2]
+    # Live-Audio wiederholt sich nie → kein Cache (spart Hash + Eintrag, der nur Platz verdrängt)
+    _, blocks = transcribe_pcm(pcm, model_path=model_path, use_cache=False)
+    if lead:
+        blocks = [_shift_block(b, lead) for b in blocks]
+    rec["blocks"] = _correct_blocks(blocks)
+    rec["ok"] = True
+    return "\n".join(b["text"] for b in rec["blocks"])
+
+def _correct_blocks(blocks: list[dict], cutoff: float = 0.90) -> list[dict]:
+    """
+    Fachwort-Korrektur pro Segment, direkt nach der Dekodierung (Live-Pfad). Bereits korrigierte
+    Segmente sind markiert und werden bei der Finalisierung nicht noch einmal angefasst; die
+    Token-Ergebnisse merkt sich der Index (med_terms.py), wiederkehrende Wörter kosten nichts.
+    """
+    out = []
+    for b in blocks:
+        if b.get("corrected"):
+            out.append(b)
+            continue
+        text, _ = MED_TERMS.correct(b["text"], cutoff=cutoff)
+        out.append({**b, "text": text, "corrected": True})
+    return out
+
+def _shift_block(b: dict, dt: float) -> dict:
+    sh = lambda t: None if t is None else t + dt
+    out = {**b, "start": sh(b.get("start")), "end": sh(b.get("end"))}
+    if b.get("tokens"):
+        out["tokens"] = [{**t, "start": sh(t.get("start")), "end": sh(t.get("end"))} for t in b["tokens"]]
+    return out
+
+def _boundary_has_speech(left: dict, right: dict) -> bool:
+    """Liegt im Grenz-Fenster left|right überhaupt Sprache? (sonst lohnt die Nachdekodierung nicht)"""
+    trim = _chunk_trim_sec(1)
+    return (has_speech_between(left.get("speech"), left["duration"] - FINALIZE_BOUNDARY_SEC, left["duration"])
+            or has_speech_between(right.get("speech"), trim, trim + FINALIZE_BOUNDARY_SEC))
+
+def _session_timeline(chunks: list[dict]) -> None:
+    """Session-Zeitachse: Chunk i beginnt (nach Overlap-Trim) bei offset_i – setzt c["trim"], c["offset"]."""
+    offset = 0.0
+    for i, c in enumerate(chunks):
+        c["trim"] = _chunk_trim_sec(i)
+        c["offset"] = offset
+        offset += max(0.0, c["duration"] - c["trim"])
+
+def session_speech_timeline(session_id: str) -> list[tuple[float, float]] | None:
+    """Sprachabschnitte der ganzen Session in Session-Zeit (None, wenn ohne VAD aufgenommen)."""
+    chunks = sorted(SESSION_CHUNKS.get(session_id) or [], key=lambda c: c["idx"])
+    if not chunks or any(c.get("speech") is None for c in chunks):
+        return None
+    _session_timeline(chunks)
+    out = []
+    for c in chunks:
+        for s, e in c["speech"]:
+            s, e = max(s, c["trim"]), e
+            if e <= s:
+                continue
+            s, e = round(s - c["trim"] + c["offset"], 3), round(e - c["trim"] + c["offset"], 3)
+            if out and s <= out[-1][1]:
+                out[-1] = (out[-1][0], max(out[-1][1], e))
+            else:
+                out.append((s, e))
+    return out
 
-    sep = "" if (not prev or prev.endswith((" ", "\n"))) else " "
-    return (prev + sep + new).strip()
+@with_priority(FINALIZE)
+def _decode_boundary(session_id: str, left: dict, right: dict, model_path: str) -> list[dict]:
+    """
+    Dekodiert das Fenster um die Grenze left|right neu (Ende von left + Anfang von right ohne Overlap),
+    damit an der Schnittstelle zerschnittene Wörter korrekt erkannt werden.
+    Ergebnis-Segmente in Fenster-Zeit (0 = Fensterbeginn) unter SESSION_BOUNDARIES[session_id][left idx].
+    """
+    cached = SESSION_BOUNDARIES.get(session_id, {}).get(left["idx"])
+    if cached is not None:
+        return cached
+    try:
+        b = int(FINALIZE_BOUNDARY_SEC * 16000) * 2          # Bytes (PCM16, 16 kHz)
+        trim = int(_chunk_trim_sec(1) * 16000) * 2
+        _, blocks = transcribe_pcm(left["pcm"][-b:] + right["pcm"][trim:trim + b], model_path=model_path, use_cache=False)
+        blocks = _correct_blocks(blocks)
+    except Exception as e:
+        print(f"⚠️ Grenz-Dekodierung {left['idx']}|{right['idx']} fehlgeschlagen: {e}")
+        return []
+    if session_id in SESSION_CHUNKS:
+        SESSION_BOUNDARIES[session_id][left["idx"]] = blocks
+    return blocks
+
+def _finalize_from_chunks(session_id: str, model_path: str) -> list[dict]:
+    """
+    Baut das finale Transkript aus den gespeicherten Chunk-Ergebnissen:
+    - fehlgeschlagene Chunks werden neu dekodiert
+    - Chunk-Grenzen werden durch die (meist schon im Hintergrund berechneten) Grenz-Fenster ersetzt
+    - Zeitstempel werden auf die Session-Zeitachse umgerechnet
+    Returns: Liste von {"start", "end", "text"} in Session-Zeit
+    """
+    chunks = sorted(SESSION_CHUNKS.get(session_id) or [], key=lambda c: c["idx"])
+
+    for c in chunks:
+        if not c["ok"] and c["pcm"]:
+            try:
+                _transcribe_chunk(c, model_path)
+            except Exception as e:
+                print(f"⚠️ Chunk {c['idx']} auch bei Finalisierung fehlgeschlagen: {e}")
+
+    _session_timeline(chunks)
+
+    def to_session(c, b):
+        if b.get("start") is None or b.get("end") is None:
+            return dict(b)
+        d = c["offset"] - c["trim"]
+        return {**b, "start": b["start"] + d, "end": b["end"] + d}
+
+    pieces = [[to_session(c, b) for b in c["blocks"]] for c in chunks]
+    timed = [all(b.get("start") is not None for b in p) for p in pieces]
+
+    # Grenzen ersetzen (nur wo beide Seiten Zeitstempel haben)
+    boundary = {}
+    for i in range(len(chunks) - 1):
+        left, right = chunks[i], chunks[i + 1]
+        if not (left["ok"] and right["ok"] and timed[i] and timed[i + 1]):
+            continue
+        if not _boundary_has_speech(left, right):
+            continue   # Stille an der Grenze → nichts zu reparieren
+        win_start = right["offset"] - min(FINALIZE_BOUNDARY_SEC, left["duration"])
+        win_end = right["offset"] + FINALIZE_BOUNDARY_SEC
+        segs = _decode_boundary(session_id, left, right, model_path)
+        boundary[i] = [
+            {**b, "start": b["start"] + win_start, "end": b["end"] + win_start}
+            for b in segs if b.get("start") is not None
+        ]
+        mid = lambda b: (b["start"] + b["end"]) / 2.0
+        pieces[i] = [b for b in pieces[i] if mid(b) < win_start]
+        pieces[i + 1] = [b for b in pieces[i + 1] if mid(b) >= win_end]
+
+    out = []
+    for i, p in enumerate(pieces):
+        for b in p + boundary.get(i, []):
+            t = trim_leading_overlap(out[-1]["text"], b["text"]) if out else b["text"]
+            if t:
+                out.append({**b, "text": t})
+    return out
 
 @app.route('/start_stream')
 def start_stream():
@@ -472,11 +618,30 @@ def start_stream():
     SESSION_TRANSCRIPTS.pop(session_id, None)
     SESSION_TEXT.pop(session_id, None)
     SESSION_CHUNK_IDX.pop(session_id, None)
-    SESSION_CHUNK_WAVS.pop(session_id, None)
+    SESSION_CHUNKS.pop(session_id, None)
+    SESSION_BOUNDARIES.pop(session_id, None)
+    SESSION_VAD.pop(session_id, None)
+    SESSION_NOTES[session_id] = LiveNotes(session.get('lmmodel_name') or DEFAULT_LMMODEL_NAME)
+    WARMUP_EXECUTOR.submit(warm_up_llm, session.get('lmmodel_name') or DEFAULT_LMMODEL_NAME)
+    SESSION_DIAR[session_id] = {
+        "mode": load_setting("diarization", default="off"),   # wie Upload-Jobs: Modus aus settings.json
+        "lmmodel_name": session.get('lmmodel_name') or DEFAULT_LMMODEL_NAME,
+        "segments": [],      # schon zugeordnete Segmente in Session-Zeit: {start, end, text, speaker}
+        "next_idx": 1,       # nächster noch nicht zugeordneter Chunk
+        "pending": 0,
+        "future": None,
+        "lock": threading.Lock(),   # schützt pending/future/next_idx/segments (Chunk-Threads vs. Hintergrund-Lauf)
+    }
     # (Optional) man könnte hier alte Sessions aufräumen – lassen wir bewusst weg
-    return jsonify({'session_id': session_id})
+
+    # Whisper-Worker vorwärmen, damit der erste Chunk nicht auf das Modell-Laden wartet
+    pool = get_whisper_pool(get_current_whisper_model_path())
+    if pool is not None:
+        threading.Thread(target=pool.start, name="whisper-pool-warmup", daemon=True).start()
+    return jsonify({'session_id': session_id, 'ws': USE_WEBSOCKET})
 
 @app.route('/stream_chunk', methods=['POST'])
+@with_priority(LIVE)
 def stream_chunk():
     session_id = request.form.get('session_id')
     if not session_id:
@@ -495,81 +660,368 @@ def stream_chunk():
         SESSION_CHUNK_IDX[session_id] += 1
         idx = SESSION_CHUNK_IDX[session_id]
 
-        # 1) Chunk speichern (immer als "raw", damit Input != Output ist – auch bei WAV)
-        in_name = f"{session_id}_{idx}.raw.{ext}"           # <<— immer anderer Dateiname als Ziel
-        tmp_in  = os.path.abspath(os.path.join(UPLOAD_FOLDER, in_name))
-        with open(tmp_in, 'wb') as f:
-            f.write(blob.read())
-
-        # 2) Normalize -> WAV (16 kHz, Mono, PCM16)
-        tmp_wav = os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{session_id}_{idx}.wav"))
-        ffmpeg_cmd = (
-            f'ffmpeg -y -hide_banner -loglevel error '
-            f'-i {shlex.quote(tmp_in)} '
-            f'-ac 1 -ar 16000 -c:a pcm_s16le '
-            f'{shlex.quote(tmp_wav)}'
-        )
+        # 1) Einmal dekodieren + Soft-Filter (HP/LP/Kompressor) im Speicher → PCM16 16 kHz Mono
+        #    (siehe audio_ingest.py: WAV ohne Prozess/Datei, andere Container über eine ffmpeg-Pipe)
         try:
-            proc = subprocess.run(
-                ffmpeg_cmd, shell=True,
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                timeout=FFMPEG_TIMEOUT
-            )
+            pcm = ingest_chunk(blob.read(), ext, timeout=FFMPEG_TIMEOUT)
         except subprocess.TimeoutExpired:
             print(f"⚠️ ffmpeg Timeout bei Chunk {idx}")
-            current_total = SESSION_TEXT.get(session_id, "")
-            return jsonify({'partial_transcript': current_total, 'seq': idx, 'warning': 'ffmpeg_timeout'})
+            return jsonify({**_live_delta(session_id, _client_known()), 'seq': idx, 'warning': 'ffmpeg_timeout'})
+        except Exception as e:
+            print(f"⚠️ Ingest-Fehler bei Chunk {idx}: {e}")
+            return jsonify({**_live_delta(session_id, _client_known()), 'seq': idx, 'warning': 'ffmpeg_failed'})
 
-        if proc.returncode != 0 or not os.path.exists(tmp_wav):
-            err = proc.stderr.decode(errors='ignore')
-            print(f"⚠️ ffmpeg-Fehler bei Chunk {idx}: {err}")
-            current_total = SESSION_TEXT.get(session_id, "")
-            return jsonify({'partial_transcript': current_total, 'seq': idx, 'warning': 'ffmpeg_failed'})
+        return jsonify(_live_chunk_pcm(session_id, idx, pcm, _client_known(), get_current_whisper_model_path()))
 
-        # Roh-Upload weg
-        try: os.remove(tmp_in)
-        except Exception: pass
+    except Exception as e:
+        print("❌ stream_chunk exception:", str(e))
+        return jsonify({'error': str(e)}), 500
 
-        # >>> NEU: Soft-Preprocessing *vor* dem Append und genau *das* in die Liste
-        clean_wav = tmp_wav.replace(".wav", "_clean.wav")
-        try:
-            preprocess_audio_chunk_soft(tmp_wav, clean_wav, timeout=FFMPEG_TIMEOUT)
-            use_wav = clean_wav
-            # Optional: raw tmp_wav entsorgen, spart Platz
-            try: os.remove(tmp_wav)
-            except Exception: pass
-        except Exception as e:
-            print(f"⚠️ Preprocess failed for chunk {idx}: {e}")
-            use_wav = tmp_wav  # Fallback
+@app.route('/stream_pcm', methods=['POST'])
+@with_priority(LIVE)
+def stream_pcm():
+    """
+    Live-Ingest ohne Container: Body = rohes PCM16 (little-endian, 16 kHz, Mono), session_id + seq als Query.
+    Der Client hat bereits gefiltert und heruntergetastet → kein Dekodieren/Resampling auf dem Server.
+    """
+    session_id = request.args.get('session_id')
+    if not session_id:
+        return jsonify({'error': 'No session_id provided'}), 400
+    try:
+        seq = int(request.args.get('seq', ''))
+    except ValueError:
+        return jsonify({'error': 'seq must be an integer'}), 400
 
-        # WICHTIG: jetzt das *verwendete* WAV merken
-        SESSION_CHUNK_WAVS[session_id].append(use_wav)
+    pcm = request.get_data(cache=False)
+    if len(pcm) % 2:
+        pcm = pcm[:-1]
+    if not pcm:
+        return jsonify({'error': 'Empty PCM body'}), 400
 
-        # 3) Chunk transkribieren (auf use_wav)
-        try:
-            chunk_text, _, _ = transcribe_with_whispercpp(use_wav, model_path=get_current_whisper_model_path(), write_outputs=False)
-        except TypeError:
-            chunk_text, _, _ = transcribe_with_whispercpp(use_wav, model_path=get_current_whisper_model_path())
-        chunk_text = (chunk_text or "").strip()
+    try:
+        return jsonify(_ingest_pcm(session_id, seq, pcm, _client_known(), get_current_whisper_model_path()))
+    except Exception as e:
+        print("❌ stream_pcm exception:", str(e))
+        return jsonify({'error': str(e)}), 500
 
-        # 4) Live-Text per Overlap mergen
-        prev = SESSION_TEXT.get(session_id, "")
-        new_total = merge_with_overlap(prev, chunk_text, lookback=400, min_overlap=16)
-        if len(new_total) > MAX_SESSION_TEXT:
-            new_total = new_total[-MAX_SESSION_TEXT:]
-        SESSION_TEXT[session_id] = new_total
+# ── Live-Session über eine WebSocket-Verbindung (/ws/live) ────────────────
+# Hoch:   Binär-Frames = uint32 seq (little-endian) + PCM16 (16 kHz, Mono),
+#         Text-Frames  = JSON-Befehle {"type": "finalize"} / {"type": "resync", "offset": n}
+# Runter: JSON {"type": "partial", seq, offset, delta, length, rev, ...} sobald ein Chunk fertig ist,
+#         {"type": "stage", "stage": ...} und {"type": "summary", "delta": ...} während der Finalisierung,
+#         {"type": "final", status, ...}
+# Chunks und Finalisierung laufen nacheinander in einem Worker pro Verbindung → die
+# Empfangsschleife blockiert nie, und "finalize" kommt automatisch nach allen offenen Chunks.
+WS_FRAME_HEADER = struct.Struct("<I")
+
+class _LiveSocket:
+    """Sendeseite einer /ws/live-Verbindung: serialisiert Sends, merkt sich die schon gesendete Textlänge."""
+
+    def __init__(self, ws, session_id: str):
+        self.ws = ws
+        self.session_id = session_id
+        self.sent = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def send(self, msg: dict) -> None:
+        with self._lock:
+            if self.closed:
+                return
+            try:
+                self.ws.send(json.dumps(msg, ensure_ascii=False))
+            except Exception:
+                self.closed = True   # Client weg – Chunks werden trotzdem fertig verarbeitet
 
-        return jsonify({'partial_transcript': new_total, 'seq': idx})
+    def partial(self, result: dict) -> None:
+        self.sent = max(self.sent, result.get('length', 0))
+        self.send({'type': 'partial', **result})
 
+def _ws_chunk(conn: _LiveSocket, seq: int, pcm: bytes, model_path: str) -> None:
+    try:
+        with priority(LIVE):
+            conn.partial(_ingest_pcm(conn.session_id, seq, pcm, conn.sent, model_path))
+    except Exception as e:
+        print("❌ ws chunk exception:", str(e))
+        conn.send({'type': 'error', 'seq': seq, 'error': str(e)})
 
+def _ws_finalize(conn: _LiveSocket, lmmodel_name: str, model_path: str) -> None:
+    try:
+        with priority(FINALIZE):
+            result, status = _finalize_session(conn.session_id, lmmodel_name, model_path,
+                                               progress=lambda stage: conn.send({'type': 'stage', 'stage': stage}),
+                                               on_token=lambda piece: conn.send({'type': 'summary', 'delta': piece}))
+        conn.send({'type': 'final', 'status': status, **result})
     except Exception as e:
-        print("❌ stream_chunk exception:", str(e))
-        return jsonify({'error': str(e)}), 500
+        print("❌ ws finalize exception:", str(e))
+        conn.send({'type': 'final', 'status': 500, 'error': str(e)})
+
+def live_ws(ws):
+    session_id = request.args.get('session_id')
+    if not session_id:
+        ws.send(json.dumps({'type': 'error', 'error': 'No session_id provided'}))
+        return
+    # Request-Kontext gibt es nur hier, nicht im Worker
+    model_path = get_current_whisper_model_path()
+    lmmodel_name = session.get('lmmodel_name') or DEFAULT_LMMODEL_NAME
+    conn = _LiveSocket(ws, session_id)
+    worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ws-live")
+    conn.send({'type': 'ready', 'session_id': session_id})
+    try:
+        while True:
+            msg = ws.receive()
+            if msg is None:
+                break
+            if isinstance(msg, (bytes, bytearray)):
+                if len(msg) < WS_FRAME_HEADER.size + 2:
+                    conn.send({'type': 'error', 'error': 'Frame zu kurz (uint32 seq + PCM16 erwartet)'})
+                    continue
+                (seq,) = WS_FRAME_HEADER.unpack_from(msg)
+                pcm = bytes(msg[WS_FRAME_HEADER.size:])
+                if len(pcm) % 2:
+                    pcm = pcm[:-1]
+                worker.submit(_ws_chunk, conn, seq, pcm, model_path)
+                continue
+            try:
+                cmd = json.loads(msg)
+            except ValueError:
+                conn.send({'type': 'error', 'error': 'Ungültiges JSON'})
+                continue
+            if not isinstance(cmd, dict):
+                conn.send({'type': 'error', 'error': 'JSON-Objekt erwartet'})
+                continue
+            if cmd.get('type') == 'finalize':
+                worker.submit(_ws_finalize, conn, lmmodel_name, model_path)
+            elif cmd.get('type') == 'resync':
+                offset = cmd.get('offset') or 0
+                if isinstance(offset, bool) or not isinstance(offset, int) or offset < 0:
+                    conn.send({'type': 'error', 'error': 'offset muss eine ganze Zahl ≥ 0 sein'})
+                    continue
+                conn.partial(_live_delta(session_id, offset))
+    except ConnectionClosed:
+        pass   # Client hat die Verbindung geschlossen
+    except Exception as e:
+        print("⚠️ WebSocket beendet:", str(e))
+    finally:
+        worker.shutdown(wait=False)   # offene Chunks laufen zu Ende (Finalisierung auch per /process_stream möglich)
+
+if sock is not None:
+    sock.route('/ws/live')(live_ws)
+
+SUMMARY_SSE_IDLE_SEC = 300   # SSE-Verbindung schließen, wenn so lange nichts kommt
+
+@app.route('/summary_stream/<key>')
+def summary_stream_route(key):
+    """
+    Entstehende Zusammenfassung (Job-ID oder Live-Session-ID) als Server-Sent Events:
+    data: {"delta": "..."} je Stück, zum Schluss event: done mit data: {"text": endgültiger Text}.
+    Unbekannte Schlüssel → 404; angelegt wird der Stream nur für laufende Sessions/Jobs.
+    """
+    stream = SUMMARY_STREAMS.find(key)
+    if stream is None:
+        job = UPLOAD_JOBS.get(key) if key not in SESSION_NOTES else None
+        if key not in SESSION_NOTES and (job is None or job["status"] not in ("queued", "running")):
+            return jsonify({"error": "Unbekannter Stream"}), 404
+        stream = SUMMARY_STREAMS.get(key)   # Leser vor dem Produzenten
+
+    def events():
+        offset, idle = 0, 0.0
+        while True:
+            offset, delta, done = stream.read(offset, timeout=15)
+            if delta:
+                idle = 0.0
+                yield f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+            if done:
+                yield f"event: done\ndata: {json.dumps({'text': stream.final}, ensure_ascii=False)}\n\n"
+                return
+            if not delta:
+                idle += 15
+                if idle >= SUMMARY_SSE_IDLE_SEC:
+                    return
+                yield ": keep-alive\n\n"
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/stream_text')
+def stream_text():
+    """Resync für das Delta-Protokoll: Live-Text ab offset (0 = komplett)."""
+    session_id = request.args.get('session_id')
+    if not session_id:
+        return jsonify({'error': 'No session_id provided'}), 400
+    try:
+        offset = int(request.args.get('offset', '0'))
+    except ValueError:
+        return jsonify({'error': 'offset must be an integer'}), 400
+    return jsonify(_live_delta(session_id, offset))
+
+def _ingest_pcm(session_id: str, seq: int, pcm: bytes, known: int | None, model_path: str) -> dict:
+    """PCM-Chunk mit Client-Sequenznummer (/stream_pcm, WebSocket) – Wiederholungen werden ignoriert."""
+    return _live_chunk_pcm(session_id, seq, pcm, known, model_path, client_seq=True)
+
+def _live_chunk_pcm(session_id: str, idx: int, pcm: bytes, known: int | None, model_path: str,
+                    client_seq: bool = False) -> dict:
+    """
+    Gemeinsamer Live-Pfad für /stream_chunk, /stream_pcm und /ws/live: PCM16 16 kHz → ASR → Live-Text.
+    Ergebnis enthält nur das Delta ab known (siehe _live_delta). Läuft auch außerhalb eines Requests.
+    client_seq: idx ist die Sequenznummer des Clients – ein schon vorhandener Chunk wird nicht erneut angelegt.
+    """
+    with SESSION_INGEST_LOCKS.setdefault(session_id, threading.Lock()):
+        if client_seq:
+            # Wiederholter Upload (Retry nach Netzfehler): nicht doppelt transkribieren
+            if any(c["idx"] == idx for c in SESSION_CHUNKS.get(session_id) or []):
+                return {**_live_delta(session_id, known), 'seq': idx}
+            SESSION_CHUNK_IDX[session_id] = max(SESSION_CHUNK_IDX[session_id], idx)
+
+        # VAD: Sprachabschnitte + Sprachanteil (adaptiver Rauschboden pro Session)
+        if session_id not in SESSION_VAD:
+            SESSION_VAD[session_id] = new_session_vad()
+        vad = SESSION_VAD[session_id]
+        info = vad.analyze(pcm) if vad is not None else None
+        speech_ratio = info["speech_ratio"] if info else None
+
+        # PCM + Ergebnis für die Finalisierung aufheben
+        rec = {"idx": idx, "pcm": pcm, "duration": pcm_duration(pcm), "blocks": [], "ok": False,
+               "speech": info["spans"] if info else None, "speech_ratio": speech_ratio}
+        SESSION_CHUNKS[session_id].append(rec)
+
+    if info and (info["speech_ratio"] < VAD_MIN_SPEECH or not info["spans"]):
+        # Nur Raumgeräusch → kein whisper-Lauf (und keine Halluzinationen im Live-Text)
+        rec["ok"] = True
+        rec["text_end"] = len(SESSION_TEXT[session_id]) if session_id in SESSION_TEXT else 0
+        return {**_live_delta(session_id, known), 'seq': idx,
+                'speech_ratio': speech_ratio, 'skipped': 'silence'}
+
+    # Chunk transkribieren (Stille am Rand abgeschnitten)
+    try:
+        chunk_text = _transcribe_chunk(rec, model_path)
+    except Exception as e:
+        print(f"⚠️ ASR fehlgeschlagen bei Chunk {idx} (wird bei Finalisierung wiederholt): {e}")
+        return {**_live_delta(session_id, known), 'seq': idx, 'warning': 'asr_failed', 'speech_ratio': speech_ratio}
+    chunk_text = (chunk_text or "").strip()
+
+    # Grenze zum Vorgänger-Chunk schon jetzt im Hintergrund nachdekodieren (nur wenn dort gesprochen wird)
+    prev_rec = next((c for c in SESSION_CHUNKS[session_id] if c["idx"] == idx - 1), None)
+    if prev_rec is not None and _boundary_has_speech(prev_rec, rec):
+        BOUNDARY_EXECUTOR.submit(_decode_boundary, session_id, prev_rec, rec, model_path)
+    # (PCM-Uploads können sich überholen – dann auch die Grenze zum schon vorhandenen Nachfolger)
+    next_rec = next((c for c in SESSION_CHUNKS[session_id] if c["idx"] == idx + 1 and c["ok"]), None)
+    if next_rec is not None and _boundary_has_speech(rec, next_rec):
+        BOUNDARY_EXECUTOR.submit(_decode_boundary, session_id, rec, next_rec, model_path)
+
+    # Live-Text: Chunk ohne die Überlappung zum bisherigen Ende anhängen (session_transcript.py)
+    st = SESSION_TEXT.setdefault(session_id, SessionTranscript())
+    st.append(chunk_text)
+    rec["text_end"] = len(st)   # Live-Text bis hier → Zeitachse der Notizen (_notes_covered_sec)
+
+    # Alle paar Chunks die laufenden Notizen im Hintergrund nachziehen (live_notes.py)
+    notes = SESSION_NOTES.get(session_id)
+    if notes is not None and chunk_text:
+        notes.chunk_committed(st)
+    _schedule_live_diarization(session_id)
+
+    return {**_live_delta(session_id, known), 'seq': idx, 'speech_ratio': speech_ratio}
 
 # =========================================================
 # Klassischer Workflow
 # =========================================================
 
+def _close_summary_stream(key: str, error: str) -> None:
+    """SSE-Leser nicht hängen lassen: Stream beenden, falls die Generierung ihn nicht abgeschlossen hat."""
+    stream = SUMMARY_STREAMS.find(key)
+    if stream is not None and not stream.done:
+        stream.finish(f"❌ {error}")
+
+@with_priority(BATCH)
+def _run_upload_job(job: dict, progress) -> dict:
+    """
+    Verarbeitet einen Upload-Job im Hintergrund (siehe jobs.py):
+    Vorverarbeitung → Transkription → Sprecherzuordnung → Fachwort-Korrektur → Zusammenfassung → Speichern.
+    """
+    error = "Verarbeitung abgebrochen"
+    try:
+        return _run_upload_job_once(job, progress)
+    except Exception as e:
+        error = str(e)
+        raise
+    finally:
+        _close_summary_stream(job["id"], error)
+
+def _run_upload_job_once(job: dict, progress) -> dict:
+    """Eigentliche Verarbeitung – nur über _run_upload_job aufrufen."""
+    p = job["params"]
+    basename = p["basename"]
+    upload_path = p["upload_path"]
+    lmmodel_name = p["lmmodel_name"]
+    start_processing = datetime.now()
+
+    # 1) Schonende Normalisierung nach 16 kHz/Mono/PCM16 (ohne silenceremove)
+    progress("preprocess")
+    clean_wav = os.path.join(UPLOAD_FOLDER, f"{basename}_clean.wav")
+    try:
+        preprocess_audio_chunk_soft(upload_path, clean_wav, timeout=UPLOAD_FFMPEG_TIMEOUT)
+        wav_for_asr = clean_wav
+    except Exception as e:
+        print("⚠️ Soft-Preprocess fehlgeschlagen, nutze Upload direkt:", e)
+        wav_for_asr = upload_path
+    if wav_for_asr.endswith(".wav"):
+        job["audio_duration"] = round(wav_duration(wav_for_asr), 1)
+
+    # 2) Transkription – **nur einmal**, auf der bereinigten Datei
+    #    (lange Dateien: an Pausen geteilt und parallel transkribiert)
+    progress("asr")
+    transcript, _, blocks = transcribe_long_audio(
+        wav_for_asr,
+        model_path=p["whisper_model_path"],
+        write_outputs=True,
+        output_dir=TRANSKRIPT_DIR,
+        output_basename=f"{basename}.wav"  # erzeugt transkripte/<basename>.wav.vtt
+    )
+
+    # 3) Sprecher-Zuweisung / Dialog
+    progress("diarization")
+    pcm, diarization = None, p["diarization"]
+    if diarization in ("acoustic", "audio"):
+        if wav_for_asr == clean_wav:
+            pcm, _ = read_wav_pcm(wav_for_asr)   # 16 kHz Mono nach dem Soft-Preprocess
+        else:
+            # Original-Upload (Format/Rate unbekannt) taugt nicht für Stimmprofile → LLM-Zuordnung
+            print("⚠️ Akustische Sprecherzuordnung braucht die vorverarbeitete WAV – nutze LLM")
+            diarization = "llm"
+    dialog = _apply_diarization(blocks, diarization, lmmodel_name, pcm=pcm)
+
+    # 4) Fuzzy Match
+    progress("postprocess")
+    dialog = med_postprocess(dialog)  # sanfte Fachwort-Korrektur
+
+    # 5) Zusammenfassung
+    progress("summary")
+    stream = SUMMARY_STREAMS.get(job["id"])   # Ergebnisseite liest per /summary_stream/<job_id> mit
+    llm_timing = {}
+    if dialog.strip():
+        anamnese = summarize_with_lmstudio(dialog, p["geschlecht"], lmmodel_name, on_token=stream.append,
+                                           timing=llm_timing)
+    else:
+        anamnese = "⚠️ Keine Sprachaufnahme erkannt – keine Zusammenfassung möglich."
+    stream.finish(anamnese)
+
+    # 6) Speichern + Meta
+    progress("save")
+    os.makedirs(TRANSKRIPT_DIR, exist_ok=True)
+    with open(os.path.join(TRANSKRIPT_DIR, f"{basename}_anamnese.txt"), 'w', encoding='utf-8') as f:
+        f.write(anamnese)
+    with open(os.path.join(TRANSKRIPT_DIR, f"{basename}_transkript.txt"), 'w', encoding='utf-8') as f:
+        f.write(dialog)
+    processing_duration = round((datetime.now() - start_processing).total_seconds(), 1)
+    meta_path = os.path.join(TRANSKRIPT_DIR, f"{basename}.meta.json")
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({"verarbeitungsdauer": processing_duration, "gesprächsdauer": blocks_duration(blocks),
+                   "llm": llm_timing or None}, f)
+
+    return {"filename": f"{basename}_anamnese.txt", "processing_duration": processing_duration}
+
+UPLOAD_JOBS = JobQueue(_run_upload_job)
+
 @app.route('/', methods=['GET', 'POST'])
 def index():
     lmmodel_name = session.get('lmmodel_name') or DEFAULT_LMMODEL_NAME
@@ -582,7 +1034,7 @@ def index():
     if request.method == 'POST':
         file = request.files.get('audiofile')
         if file and file.filename:
-            # 1) Upload mit Original-Endung speichern (mp3/wav/m4a/ogg/webm)
+            # Upload mit Original-Endung speichern (mp3/wav/m4a/ogg/webm)
             orig_ext = os.path.splitext(file.filename)[1].lower()
             allowed = {'.wav', '.mp3', '.m4a', '.ogg', '.webm'}
             if orig_ext not in allowed:
@@ -592,71 +1044,59 @@ def index():
             upload_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{basename}{orig_ext}")
             file.save(upload_path)
 
-            # 2) Schonende Normalisierung nach 16 kHz/Mono/PCM16 (ohne silenceremove)
-            clean_wav = os.path.join(app.config['UPLOAD_FOLDER'], f"{basename}.wav")
-            try:
-                preprocess_audio_chunk_soft(upload_path, clean_wav, timeout=FFMPEG_TIMEOUT)
-                wav_for_asr = clean_wav
-            except Exception as e:
-                print("⚠️ Soft-Preprocess fehlgeschlagen, nutze Upload direkt:", e)
-                wav_for_asr = upload_path
-
-            # 3) Transkription – **nur einmal**, auf der bereinigten Datei
-            start_processing = datetime.now()
-            transcript, _, blocks = transcribe_with_whispercpp(
-                wav_for_asr,
-                model_path=get_current_whisper_model_path(),
-                write_outputs=True,
-                output_dir=TRANSKRIPT_DIR,
-                output_basename=basename  # erzeugt z.B. transkripte/<basename>.wav.vtt
-            )
-
-            # 4) Sprecher-Zuweisung / Dialog
-            diarization = session.get("diarization", "llm")
-            if diarization == "off":
-                dialog = "\n".join([b["text"] for b in blocks])
-            elif diarization == "llm":
-                dialog = "\n".join(assign_speakers_llm(blocks, lmmodel_name))
-            else:
-                dialog = "\n".join([f"Unbekannt: {b.get('text', '')}" for b in blocks])
-            
-            # 4.1)Fuzzy Match
-            dialog = med_postprocess(dialog)  # sanfte Fachwort-Korrektur
-            anamnese = summarize_with_lmstudio(dialog, geschlecht, lmmodel_name)
-            
-            # 5) Zusammenfassung
-            if dialog.strip():
-                anamnese = summarize_with_lmstudio(dialog, geschlecht, lmmodel_name)
-            else:
-                anamnese = "⚠️ Keine Sprachaufnahme erkannt – keine Zusammenfassung möglich."
-
-            # 6) Speichern
-            os.makedirs(TRANSKRIPT_DIR, exist_ok=True)
-            with open(os.path.join(TRANSKRIPT_DIR, f"{basename}_anamnese.txt"), 'w', encoding='utf-8') as f:
-                f.write(anamnese)
-            with open(os.path.join(TRANSKRIPT_DIR, f"{basename}_transkript.txt"), 'w', encoding='utf-8') as f:
-                f.write(dialog)
-
-            # 7) GDT & Meta
+            # Verarbeitung läuft als Job im Hintergrund; Einstellungen jetzt festhalten,
+            # da der Worker keinen Request-/Session-Kontext hat
+            job = UPLOAD_JOBS.submit({
+                "basename": basename,
+                "upload_path": upload_path,
+                "geschlecht": geschlecht,
+                "lmmodel_name": lmmodel_name,
+                "diarization": session.get("diarization", "llm"),
+                "whisper_model_path": get_current_whisper_model_path(),
+            }, audio_duration=wav_duration(upload_path) if orig_ext == ".wav" else None)
+
+            # GDT gehört zu diesem Patienten – Daten sind übernommen
             if os.path.exists(gdt_path):
                 os.remove(gdt_path)
-            processing_duration = round((datetime.now() - start_processing).total_seconds(), 1)
-            meta_path = os.path.join(TRANSKRIPT_DIR, f"{basename}.meta.json")
-            with open(meta_path, 'w', encoding='utf-8') as f:
-                json.dump({"verarbeitungsdauer": processing_duration}, f)
-
-            return render_template(
-                "result.html",
-                dialog=dialog,
-                anamnese=anamnese,
-                filename=f"{basename}_anamnese.txt",
-                grouped_transkripte=group_transkripte_by_date()
-            )
+
+            return redirect(url_for("job_view", job_id=job["id"]))
 
     # GET
     return render_template("index.html", grouped_transkripte=group_transkripte_by_date())
 
 
+@app.route('/job/<job_id>')
+def job_view(job_id):
+    if UPLOAD_JOBS.get(job_id) is None:
+        return "❌ Job nicht gefunden", 404
+    return render_template("job.html", job_id=job_id, grouped_transkripte=group_transkripte_by_date())
+
+
+@app.route('/job_status/<job_id>')
+def job_status(job_id):
+    st = UPLOAD_JOBS.status(job_id)
+    if st is None:
+        return jsonify({"error": "Job nicht gefunden"}), 404
+    return jsonify(st)
+
+
+@app.route('/job/<job_id>/result')
+def job_result(job_id):
+    job = UPLOAD_JOBS.get(job_id)
+    if job is None or job.get("status") != "done":
+        return redirect(url_for("job_view", job_id=job_id))
+    filename = job["result"]["filename"]
+    anamnese = read_file_safely(os.path.join(TRANSKRIPT_DIR, filename))
+    dialog = read_file_safely(os.path.join(TRANSKRIPT_DIR, filename.replace("_anamnese.txt", "_transkript.txt")))
+    return render_template(
+        "result.html",
+        dialog=dialog,
+        anamnese=anamnese,
+        filename=filename,
+        grouped_transkripte=group_transkripte_by_date()
+    )
+
+
 @app.route("/upload_audio", methods=["POST"])
 def upload_audio():
     from flask import abort
@@ -725,54 +1165,25 @@ def admin_view(filename):
         "size_kb": round(os.path.getsize(anamnese_path) / 1024, 1)
     }
 
-    start_time, end_time = None, None
-    try:
-        with open(os.path.join(TRANSKRIPT_DIR, diag_file), 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            times = []
-            for line in lines:
-                match = re.search(r"\(([\d\.]+)s\s*-\s*([\d\.]+)s\)", line)
-                if match:
-                    times.append((float(match.group(1)), float(match.group(2))))
-            if times:
-                start_time = min(t[0] for t in times)
-                end_time = max(t[1] for t in times)
-    except Exception:
-        pass
-
-    if start_time is not None and end_time is not None:
-        gesprächsdauer = round(end_time - start_time, 1)
-    else:
-        gesprächsdauer = None
-
-    try:
-        erstellt = datetime.fromtimestamp(os.path.getctime(anamnese_path))
-        bearbeitet = datetime.fromtimestamp(os.path.getmtime(anamnese_path))
-        verarbeitungsdauer = round((bearbeitet - erstellt).total_seconds(), 1)
-    except Exception:
-        verarbeitungsdauer = None
-
     meta_path = os.path.join(TRANSKRIPT_DIR, filename.replace("_anamnese.txt", ".meta.json"))
     verarbeitungsdauer = "-"
+    gesprächsdauer = None
+    llm_timing = None
     try:
         if os.path.exists(meta_path):
             with open(meta_path, 'r') as f:
                 meta_data = json.load(f)
                 verarbeitungsdauer = meta_data.get("verarbeitungsdauer", "-")
+                gesprächsdauer = meta_data.get("gesprächsdauer")
+                llm_timing = meta_data.get("llm")
     except Exception:
         pass
 
-    audio_basename = filename.replace("_anamnese.txt", "")
-    vtt_path = find_vtt_for_basename(audio_basename, TRANSKRIPT_DIR)
-
-    if vtt_path and os.path.exists(vtt_path):
-        gesprächsdauer = get_gespraechsdauer_from_vtt(vtt_path)
-    else:
-        print("VTT nicht gefunden für Gesprächsdauer. Probiert:",
-          os.path.join(TRANSKRIPT_DIR, f"{audio_basename}.wav.vtt"),
-          os.path.join(TRANSKRIPT_DIR, f"{audio_basename}.vtt"),
-          os.path.join(TRANSKRIPT_DIR, f"{audio_basename}*.vtt"))
-        gesprächsdauer = "-"
+    # Ältere Datensätze ohne gespeicherte Gesprächsdauer: aus der VTT lesen
+    if gesprächsdauer is None:
+        audio_basename = filename.replace("_anamnese.txt", "")
+        vtt_path = find_vtt_for_basename(audio_basename, TRANSKRIPT_DIR)
+        gesprächsdauer = get_gespraechsdauer_from_vtt(vtt_path) if vtt_path else "-"
 
 
     return render_template(
@@ -786,7 +1197,8 @@ def admin_view(filename):
         diarization=session.get("diarization", "llm"),
         grouped_transkripte=group_transkripte_by_date(),
         gesprächsdauer=gesprächsdauer,
-        verarbeitungsdauer=verarbeitungsdauer
+        verarbeitungsdauer=verarbeitungsdauer,
+        llm_timing=llm_timing
     )
 
 @app.route("/delete_record", methods=["POST"])
@@ -843,8 +1255,7 @@ def settings():
     prompt_summary= load_setting("prompt_summary", default=read_file_safely("prompt_summary.txt"))
 
     # Modelle vom LLM-Server holen
-    lm_url = os.getenv("LMSTUDIO_URL", "http://192.168.105.136:11434/api/generate")
-    models = list_ollama_models(lm_url)
+    models = list_ollama_models()
 
     if request.method == "POST":
         new_model      = request.form.get("lmmodel_name", "").strip()
@@ -941,212 +1352,425 @@ def group_transkripte_by_date():
     group_order = {"Heute": 0, "Gestern": 1, "Vorgestern": 2, "Ältere": 3}
     return dict(sorted(cleaned_groups.items(), key=lambda g: group_order.get(g[0], 99)))
 
-@app.route('/process_stream', methods=['POST'])
-def process_stream():
-    start_processing = datetime.now()
-
-    lmmodel_name = session.get('lmmodel_name') or DEFAULT_LMMODEL_NAME
-    session_id = request.form.get('session_id')
-    if not session_id:
-        return jsonify({"error": "Keine Session-ID übergeben"}), 400
-    live_text = SESSION_TEXT.get(session_id, "") or ""
-
-    # GDT lesen + Ziel-Basisname bauen
-    gdt_path = "GDT/AuriT2MD.gdt"
-    initialen, patientennr, geschlecht = extract_patient_data_from_gdt(gdt_path)
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    basename = f"{initialen}_{patientennr}_{timestamp}"
-
-    # Chunks einsammeln (concat)
-    chunk_wavs = SESSION_CHUNK_WAVS.get(session_id, [])
-    if not chunk_wavs:
-        legacy_wav = os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{session_id}.wav"))
-        if not os.path.exists(legacy_wav):
-            return jsonify({"error": "Keine Audio-Chunks gefunden"}), 404
-        chunk_wavs = [legacy_wav]
-
-    # NEU: Overlap der Audio-Chunks entfernen (alles außer dem ersten um OVERLAP_TRIM_MS kürzen)
-    trimmed_chunks = []
-    temp_trims = []
-    if OVERLAP_TRIM_MS > 0 and len(chunk_wavs) > 1:
-        tsec = OVERLAP_TRIM_MS / 1000.0
-        for i, p in enumerate(chunk_wavs):
-            if i == 0:
-                trimmed_chunks.append(p)
-                continue
-            p_trim = os.path.abspath(p.replace(".wav", "_trim.wav"))
-            cmd = [
-                "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
-                "-i", p,
-                "-af", f"atrim=start={tsec:.3f},asetpts=PTS-STARTPTS",
-                "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le",
-                p_trim
-            ]
-            proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if proc.returncode == 0 and os.path.exists(p_trim) and os.path.getsize(p_trim) > 0:
-                trimmed_chunks.append(p_trim)
-                temp_trims.append(p_trim)
-            else:
-                # Fallback: ungeschnitten übernehmen
-                trimmed_chunks.append(p)
+def _finalize_full_asr(session_id: str, chunks: list[dict], basename: str, live_text: str, model_path: str):
+    """
+    Klassische Finalisierung (FINALIZE_MODE=full): alle Chunks zusammenfügen und komplett neu transkribieren.
+    Die Chunks liegen bereits gefiltert als PCM16 im Speicher vor → Overlap abschneiden, aneinanderhängen,
+    einmal als WAV schreiben (kein ffmpeg-Concat/-Resample/-Preprocess mehr).
+    Ohne Live-Chunks wird eine ältere {session_id}.wav im Upload-Ordner verwendet.
+    Returns: (dialog, vtt_path, blocks, temp_files, wav_for_asr)
+    """
+    temp_files = []
+    if chunks:
+        parts = []
+        for i, c in enumerate(sorted(chunks, key=lambda c: c["idx"])):
+            trim = int(_chunk_trim_sec(i) * 16000) * 2   # Bytes (PCM16) – alles außer dem ersten um OVERLAP_TRIM_MS kürzen
+            parts.append(c["pcm"][trim:])
+        wav_for_asr = write_wav_pcm(os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{session_id}.wav")), b"".join(parts))
+        temp_files.append(wav_for_asr)
     else:
-        trimmed_chunks = list(chunk_wavs)
-
-    concat_list_path = os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{session_id}_concat_list.txt"))
-    with open(concat_list_path, 'w', encoding='utf-8') as f:
-        for p in trimmed_chunks:
-            f.write(f"file '{os.path.abspath(p)}'\n")
-
-
-    concat_out = os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{session_id}_concat.wav"))
-    proc1 = subprocess.run(
-        f'ffmpeg -y -f concat -safe 0 -i {shlex.quote(concat_list_path)} -c copy {shlex.quote(concat_out)}',
-        shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    if proc1.returncode != 0 or not os.path.exists(concat_out):
-        print("❌ ffmpeg concat failed:", proc1.stderr.decode(errors='ignore'))
-        return jsonify({"error": "Concat fehlgeschlagen"}), 500
-
-    final_wav = os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{session_id}.wav"))
-    proc2 = subprocess.run(
-        f'ffmpeg -y -i {shlex.quote(concat_out)} -ar 16000 -ac 1 {shlex.quote(final_wav)}',
-        shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-    )
-    if proc2.returncode != 0 or not os.path.exists(final_wav):
-        print("❌ ffmpeg resample failed:", proc2.stderr.decode(errors='ignore'))
-        return jsonify({"error": "Resample fehlgeschlagen"}), 500
-
-    # NEU: Gesamtdatei vorverarbeiten
-    final_wav_clean = final_wav.replace(".wav", "_clean.wav")
-    try:
-        preprocess_audio_chunk_soft(final_wav, final_wav_clean, timeout=FFMPEG_TIMEOUT)
-        wav_for_asr = final_wav_clean
-    except Exception as e:
-        print("⚠️ Preprocess (soft) failed, fallback:", e)
-        wav_for_asr = final_wav
-
+        final_wav = os.path.abspath(os.path.join(UPLOAD_FOLDER, f"{session_id}.wav"))
+        if not os.path.exists(final_wav):
+            raise FileNotFoundError("Keine Audio-Chunks gefunden")
+        temp_files.append(final_wav)
+        final_wav_clean = final_wav.replace(".wav", "_clean.wav")
+        try:
+            preprocess_audio_chunk_soft(final_wav, final_wav_clean, timeout=FFMPEG_TIMEOUT)
+            wav_for_asr = final_wav_clean
+            temp_files.append(final_wav_clean)
+        except Exception as e:
+            print("⚠️ Preprocess (soft) failed, fallback:", e)
+            wav_for_asr = final_wav
 
     # === Finale Transkription (hast du schon) ===
-    transcript, _, blocks = transcribe_with_whispercpp(
-        wav_for_asr, model_path=get_current_whisper_model_path(),
-        write_outputs=True, output_dir=TRANSKRIPT_DIR, output_basename=session_id
+    transcript, dst_vtt, blocks = transcribe_long_audio(
+        wav_for_asr, model_path=model_path,
+        write_outputs=True, output_dir=TRANSKRIPT_DIR, output_basename=f"{basename}.wav"
     )
 
-    # Finaltext bilden
+    # Dialog aus Blocks (Fallback: gesamter Text) + Plausibilitäts-Check ggü. Live-Text
     final_txt = (transcript or "").strip()
     if not final_txt and blocks:
         final_txt = "\n".join([b.get("text","") for b in blocks]).strip()
 
-    # NEU: Nur finalen Text verwenden – dedupliziert
-    dialog = dedupe_sentences(final_txt)
+    # Finale Neu-Transkription bevorzugen, Live-Text nur als Rückfall (zu kurz/leer)
+    dialog = _prefer_full_text(final_txt, live_text)
 
-    # Fallback: falls final wider Erwarten leer/zu kurz ist
-    if len(dialog) < 20 and live_text:
-        dialog = dedupe_sentences(live_text)
+    return dialog, dst_vtt, blocks, temp_files, wav_for_asr
 
+@app.route('/process_stream', methods=['POST'])
+@with_priority(FINALIZE)
+def process_stream():
+    session_id = request.form.get('session_id')
+    if not session_id:
+        return jsonify({"error": "Keine Session-ID übergeben"}), 400
+    result, status = _finalize_session(session_id, session.get('lmmodel_name') or DEFAULT_LMMODEL_NAME,
+                                       get_current_whisper_model_path())
+    return jsonify(result), status
 
-    # VTT suchen (mit Polling), dann auf <basename>.wav.vtt umbenennen
-    dst_vtt = os.path.join(TRANSKRIPT_DIR, f"{basename}.wav.vtt")
-    candidates = [
-        os.path.join(TRANSKRIPT_DIR, f"{session_id}.wav.vtt"),   # erwartete Datei nach obigem Aufruf
-        os.path.join(TRANSKRIPT_DIR, f"{session_id}.vtt"),        # falls .wav.vtt nicht genutzt wurde
-        os.path.join(TRANSKRIPT_DIR, f"{basename}.wav.vtt"),      # falls utils doch schon basename schrieb
-        os.path.join(TRANSKRIPT_DIR, f"{basename}.vtt"),
-        os.path.join(UPLOAD_FOLDER,  f"{session_id}.wav.vtt"),    # Fallbacks
-        os.path.join(UPLOAD_FOLDER,  f"{session_id}.vtt"),
-        final_wav + ".vtt",
-    ]
+def _diarized_lines(blocks: list[dict], mode: str, lmmodel_name: str,
+                    known: list[str | None] | None = None, pcm: bytes | None = None) -> list[str]:
+    """
+    Sprecherzuordnung nach Modus (settings.json) → eine Dialog-Zeile je Block.
+    known = schon bekannte Sprecher je Block (LLM), pcm = Audio zur Zeitachse der Blöcke (akustisch).
+    """
+    if mode == "off":
+        return [b["text"] for b in blocks]
+    if mode in ("acoustic", "audio"):   # "audio" = alter Eintrag in settings.json
+        return assign_speakers_acoustic(blocks, pcm or b"")
+    if mode == "llm":
+        return assign_speakers_llm_batched(blocks, lmmodel_name, known=known)   # Fenster à DIAR_BATCH_LINES Zeilen
+    if mode == "classifier":
+        # lokaler Klassifikator; unsichere Zeilen (None) fragt die Fenster-Zuordnung beim LLM nach
+        labels = speaker_labels_classifier(blocks)
+        if labels is None:
+            print("⚠️ Kein trainierter Sprecher-Klassifikator (python speaker_classifier.py train) – nutze LLM")
+        return assign_speakers_llm_batched(blocks, lmmodel_name, known=labels)
+    if mode == "llm_line":
+        return assign_speakers_llm(blocks, lmmodel_name)
+    return [f"Unbekannt: {b.get('text', '')}" for b in blocks]
+
+def _apply_diarization(blocks: list[dict], mode: str, lmmodel_name: str,
+                       known: list[str | None] | None = None, pcm: bytes | None = None) -> str:
+    """Wie _diarized_lines, aber als Dialog-Text."""
+    return "\n".join(_diarized_lines(blocks, mode, lmmodel_name, known, pcm=pcm))
+
+def _session_pcm(session_id: str) -> bytes:
+    """
+    Audio der Session auf derselben Zeitachse wie _finalize_from_chunks (_session_timeline: c["offset"],
+    c["trim"]). Chunks ohne Transkript (auch bei Finalisierung fehlgeschlagen) bleiben still.
+    """
+    chunks = sorted(SESSION_CHUNKS.get(session_id) or [], key=lambda c: c["idx"])
+    _session_timeline(chunks)
+    if not chunks:
+        return b""
+    last = chunks[-1]
+    out = bytearray(int((last["offset"] + max(0.0, last["duration"] - last["trim"])) * 16000) * 2)
+    for c in chunks:
+        if not c["ok"]:
+            continue
+        pos = int(c["offset"] * 16000) * 2
+        part = c["pcm"][int(c["trim"] * 16000) * 2:][: len(out) - pos]
+        out[pos:pos + len(part)] = part
+    return bytes(out)
 
-    src_vtt = None
-    deadline = time.time() + 5.0  # etwas großzügiger warten
-    while time.time() < deadline and src_vtt is None:
-        for cand in candidates:
-            if os.path.exists(cand):
-                src_vtt = cand
+def _committed_segments(session_id: str, from_idx: int) -> tuple[list[dict], int]:
+    """
+    Segmente der lückenlos vorliegenden, fertig transkribierten Chunks ab from_idx in Session-Zeit
+    (Overlap-Anfang eines Chunks ausgelassen) → (Segmente, nächster offener Chunk-Index).
+    """
+    chunks = sorted(SESSION_CHUNKS.get(session_id) or [], key=lambda c: c["idx"])
+    _session_timeline(chunks)   # Offsets der lückenlosen Chunks hängen nur von ihren Vorgängern ab
+    out, nxt = [], from_idx
+    for c in chunks:
+        if c["idx"] < from_idx:
+            continue
+        if c["idx"] != nxt or not c["ok"]:
+            break
+        d = c["offset"] - c["trim"]
+        for b in c["blocks"]:
+            if b.get("start") is None or b.get("end") is None:
+                continue
+            if (b["start"] + b["end"]) / 2.0 < c["trim"]:
+                continue
+            out.append({"start": b["start"] + d, "end": b["end"] + d, "text": b["text"]})
+        nxt += 1
+    return out, nxt
+
+def _schedule_live_diarization(session_id: str) -> None:
+    """Nach jedem Live-Chunk: alle DIAR_LIVE_EVERY Chunks einen Hintergrund-Lauf anstoßen (nur Modus "llm")."""
+    state = SESSION_DIAR.get(session_id)
+    if state is None or state["mode"] != "llm" or DIAR_LIVE_EVERY <= 0:
+        return
+    with state["lock"]:
+        state["pending"] += 1
+        fut = state["future"]
+        if state["pending"] < DIAR_LIVE_EVERY or (fut is not None and not fut.done()):
+            return
+        state["pending"] = 0
+        state["future"] = DIAR_EXECUTOR.submit(_diarize_live, session_id)
+
+@with_priority(LIVE)
+def _diarize_live(session_id: str) -> None:
+    """Neu hinzugekommene Segmente zuordnen – die schon zugeordneten gehen als Kontext mit."""
+    state = SESSION_DIAR.get(session_id)
+    if state is None:
+        return
+    with state["lock"]:
+        segs, nxt = _committed_segments(session_id, state["next_idx"])
+        if not segs:
+            state["next_idx"] = nxt
+            return
+        done = list(state["segments"])
+    try:
+        speakers = speaker_labels_batched(done + segs, state["lmmodel_name"],
+                                          known=[s["speaker"] for s in done] + [None] * len(segs))
+    except Exception as e:
+        print(f"⚠️ Live-Sprecherzuordnung fehlgeschlagen (wird bei Finalisierung nachgeholt): {e}")
+        return
+    new = speakers[len(done):]
+    if any(s.startswith("Fehler") for s in new):
+        return   # nichts Halbes übernehmen – die Finalisierung fragt diese Segmente erneut
+    for s, spk in zip(segs, new):
+        s["speaker"] = spk
+    with state["lock"]:
+        state["segments"].extend(segs)
+        state["next_idx"] = nxt
+
+def _speculative_speakers(session_id: str, blocks: list[dict]) -> list[str | None] | None:
+    """
+    Schon während der Aufnahme berechnete Sprecher auf die finalen Blöcke übertragen:
+    Segment mit der größten zeitlichen Überschneidung, sofern der Text (fast) gleich ist.
+    None = keine Hintergrund-Zuordnung für diese Session.
+    """
+    state = SESSION_DIAR.get(session_id)
+    if state is None or state["mode"] != "llm":
+        return None
+    with state["lock"]:
+        fut = state["future"]
+    if fut is not None and not fut.done():
+        try:
+            fut.result(timeout=DIAR_LIVE_WAIT)
+        except Exception:
+            pass
+    with state["lock"]:
+        labeled = sorted(state["segments"], key=lambda s: s["start"])
+    if not labeled:
+        return None
+
+    norm = lambda t: re.sub(r"\W+", " ", t.lower()).strip()
+    known, j = [], 0
+    for b in blocks:
+        if b.get("start") is None or b.get("end") is None:
+            known.append(None)
+            continue
+        while j < len(labeled) and labeled[j]["end"] <= b["start"]:
+            j += 1
+        best, best_ov = None, 0.0
+        for s in labeled[j:]:
+            if s["start"] >= b["end"]:
                 break
-        if src_vtt is None:
-            time.sleep(0.2)
+            ov = min(s["end"], b["end"]) - max(s["start"], b["start"])
+            if ov > best_ov:
+                best, best_ov = s, ov
+        if best is not None and SequenceMatcher(None, norm(best["text"]), norm(b["text"])).ratio() >= 0.8:
+            known.append(best["speaker"])
+        else:
+            known.append(None)
+    reused = sum(1 for k in known if k)
+    print(f"🗣️ Live-Sprecherzuordnung: {reused}/{len(blocks)} Segmente übernommen")
+    return known
 
-    if src_vtt:
-        try:
-            if os.path.abspath(src_vtt) != os.path.abspath(dst_vtt):
-                shutil.move(src_vtt, dst_vtt)
-            print(f"✅ VTT bereit: {dst_vtt}")
-        except Exception as e:
-            print(f"⚠️ Konnte VTT nicht verschieben/umbenennen: {e}")
-            dst_vtt = src_vtt
-    else:
-        print(f"⚠️ VTT nicht gefunden. Gesuchte Kandidaten: {candidates}")
-        dst_vtt = None
+def _notes_covered_sec(session_id: str, covered: int) -> float | None:
+    """
+    Session-Zeit, bis zu der die Notizen (Live-Text bis Zeichen covered) reichen: Ende der längsten
+    lückenlosen Chunk-Folge, deren Text vollständig darin steckt. None = nicht bestimmbar.
+    """
+    chunks = sorted(SESSION_CHUNKS.get(session_id) or [], key=lambda c: c["idx"])
+    _session_timeline(chunks)
+    end = None
+    for c in chunks:
+        if c.get("text_end") is None or c["text_end"] > covered:
+            break
+        end = c["offset"] + max(0.0, c["duration"] - c["trim"])
+    return end
+
+def _summary_input(session_id: str, dialog: str, blocks: list[dict] | None = None,
+                   lines: list[str] | None = None, post=dedupe_sentences) -> tuple[str, int]:
+    """
+    Eingabe für die Zusammenfassung einer Live-Session → (Text, Anzahl eingeflossener Notiz-Updates).
+    Gibt es laufende Notizen, gehen nur Notizen + der danach gesprochene Rest an das LLM – der Rest
+    aus dem finalen Dialog: lines = Dialog-Zeile je Block (mit Sprecher), Blöcke ab dem Zeitpunkt,
+    bis zu dem die Notizen reichen; post = Nachbearbeitung wie beim Dialog.
+    Sonst (kurzes Gespräch, Notizen aus, LLM-Fehler, keine Zeitstempel) der komplette Dialog.
+    """
+    notes = SESSION_NOTES.get(session_id)
+    if notes is None or not blocks or lines is None or len(lines) != len(blocks):
+        return dialog, 0
+    if any(b.get("start") is None or b.get("end") is None for b in blocks):
+        return dialog, 0
+    notes.wait()
+    text, covered = notes.snapshot()
+    if not text or covered < LIVE_NOTES_MIN_CHARS:
+        return dialog, 0
+    covered_sec = _notes_covered_sec(session_id, covered)
+    if covered_sec is None:
+        return dialog, 0
+    first = next((i for i, b in enumerate(blocks) if (b["start"] + b["end"]) / 2.0 >= covered_sec), len(blocks))
+    tail = post("\n".join(lines[first:])) if first < len(blocks) else ""
+    print(f"📝 Zusammenfassung aus Live-Notizen ({len(text)} Zeichen, bis {covered_sec:.0f} s) "
+          f"+ Rest ({len(tail)} Zeichen) statt {len(dialog)} Zeichen Dialog")
+    return (f"Notizen zum bisherigen Gesprächsverlauf:\n{text}\n\n"
+            f"Letzter Gesprächsabschnitt (wörtlich):\n{tail.strip() or '—'}"), notes.updates
+
+def _finalize_session(session_id: str, lmmodel_name: str, model_path: str, progress=None,
+                      on_token=None) -> tuple[dict, int]:
+    """
+    Live-Session abschließen (Transkript, Zusammenfassung, Speichern, Session-State aufräumen)
+    → (Antwort, HTTP-Status). progress(stage) meldet Zwischenschritte, on_token(stück) die
+    entstehende Zusammenfassung (WebSocket); außerdem mitlesbar per /summary_stream/<session_id>.
+    Pro Session läuft das nur einmal: ein zweiter Aufruf (z.B. POST /process_stream, nachdem der
+    WebSocket während der Finalisierung abgebrochen ist) wartet auf den ersten und bekommt dessen Ergebnis.
+    """
+    with SESSION_FINALIZE_LOCK:
+        now = time.monotonic()
+        for sid in [s for s, e in SESSION_FINALIZE.items() if e["done"].is_set() and now - e["at"] > FINALIZE_RESULT_TTL]:
+            del SESSION_FINALIZE[sid]
+        entry = SESSION_FINALIZE.get(session_id)
+        leader = entry is None
+        if leader:
+            entry = SESSION_FINALIZE[session_id] = {"done": threading.Event(), "result": None, "at": now}
+    if not leader:
+        print(f"ℹ️ Session {session_id} wird bereits finalisiert – warte auf das Ergebnis")
+        entry["done"].wait()
+        return entry["result"]
 
-    # Dialog aus Blocks (Fallback: gesamter Text) + Plausibilitäts-Check ggü. Live-Text
-    final_txt = (transcript or "").strip()
-    if not final_txt and blocks:
-        final_txt = "\n".join([b.get("text","") for b in blocks]).strip()
+    try:
+        entry["result"] = _finalize_session_once(session_id, lmmodel_name, model_path, progress, on_token)
+    except Exception as e:
+        entry["result"] = ({"error": str(e)}, 500)
+        raise
+    finally:
+        _close_summary_stream(session_id, (entry["result"] or ({}, 0))[0].get("error", "Finalisierung abgebrochen"))
+        _drop_session_state(session_id)   # auch bei Fehlern – sonst bleibt das Chunk-PCM im Speicher
+        entry["at"] = time.monotonic()
+        entry["done"].set()
+    return entry["result"]
+
+def _drop_session_state(session_id: str) -> None:
+    """Live-Session-State (Chunk-PCM, Live-Text, Notizen, Sprecherzuordnung, …) freigeben."""
+    SESSION_CHUNKS.pop(session_id, None)
+    SESSION_BOUNDARIES.pop(session_id, None)
+    SESSION_VAD.pop(session_id, None)
+    SESSION_NOTES.pop(session_id, None)
+    SESSION_DIAR.pop(session_id, None)
+    SESSION_INGEST_LOCKS.pop(session_id, None)
+    SESSION_CHUNK_IDX.pop(session_id, None)
+    SESSION_TEXT.pop(session_id, None)
+    SESSION_TRANSCRIPTS.pop(session_id, None)
+
+def _finalize_session_once(session_id: str, lmmodel_name: str, model_path: str, progress=None,
+                           on_token=None) -> tuple[dict, int]:
+    """Eigentliche Finalisierung – nur über _finalize_session aufrufen."""
+    start_processing = datetime.now()
+    progress = progress or (lambda stage: None)
+    stream = SUMMARY_STREAMS.get(session_id)
 
-    # Live + Final per Overlap zusammenführen
-    dialog = merge_with_overlap(live_text, final_txt, lookback=800, min_overlap=10)
-    if not dialog.strip():  # Fallback, falls etwas schiefgeht
-        dialog = final_txt or live_text
+    def summary_token(piece: str) -> None:
+        stream.append(piece)
+        if on_token is not None:
+            on_token(piece)
 
-    # Fuzzy-Match
-    dialog = med_postprocess(dialog)
-    anamnese = summarize_with_lmstudio(dialog, geschlecht, lmmodel_name)
+    live_text = SESSION_TEXT[session_id].text() if session_id in SESSION_TEXT else ""
 
-    # Zusammenfassung
+    # GDT lesen + Ziel-Basisname bauen
+    gdt_path = "GDT/AuriT2MD.gdt"
+    initialen, patientennr, geschlecht = extract_patient_data_from_gdt(gdt_path)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    basename = f"{initialen}_{patientennr}_{timestamp}"
+
+    chunks = SESSION_CHUNKS.get(session_id) or []
+    temp_files = []
+    diar_state = SESSION_DIAR.get(session_id)
+    diarization = diar_state["mode"] if diar_state else load_setting("diarization", default="off")
+    progress("transkript")
+    try:
+        if FINALIZE_MODE == "chunks" and chunks:
+            # Finalisierung aus den bereits transkribierten Live-Chunks (nur Grenzen/Fehlschläge neu)
+            blocks = _finalize_from_chunks(session_id, model_path)
+            final_txt = "\n".join(b["text"] for b in blocks).strip()
+            dst_vtt = None
+            if any(b.get("start") is not None for b in blocks):
+                dst_vtt = write_vtt(blocks, os.path.join(TRANSKRIPT_DIR, f"{basename}.wav.vtt"))
+            dialog = dedupe_sentences(final_txt)
+            # Dialog-Zeile je Block für _summary_input (line_blocks = die Blöcke zu lines)
+            line_blocks, lines, post = blocks, [b["text"] for b in blocks], dedupe_sentences
+            if len(dialog) < 20 and live_text:
+                dialog, lines = dedupe_sentences(live_text), None
+            elif diarization != "off" and blocks:
+                # Dopplungen vor der Zuordnung entfernen – danach würde das Satz-Splitten Sprecher-Präfixe verlieren
+                line_blocks = dedupe_blocks(blocks)
+                # schon während der Aufnahme zugeordnete Segmente übernehmen, nur den Rest zuordnen
+                known = _speculative_speakers(session_id, line_blocks)
+                pcm = _session_pcm(session_id) if diarization in ("acoustic", "audio") else None
+                lines = _diarized_lines(line_blocks, diarization, lmmodel_name, known, pcm=pcm)
+                dialog, post = "\n".join(lines), str.strip
+            # Segmente sind schon live korrigiert (_correct_blocks) → kein zweiter Durchlauf über den Dialog
+        else:
+            dialog, dst_vtt, blocks, temp_files, wav_for_asr = _finalize_full_asr(session_id, chunks, basename, live_text, model_path)
+            line_blocks, post = blocks, med_postprocess
+            lines = [b.get("text", "") for b in blocks] if dialog != live_text.strip() else None
+            if diarization != "off" and blocks and dialog != live_text.strip():
+                pcm = read_wav_pcm(wav_for_asr)[0] if diarization in ("acoustic", "audio") else None
+                lines = _diarized_lines(blocks, diarization, lmmodel_name, _speculative_speakers(session_id, blocks), pcm=pcm)
+                dialog = "\n".join(lines)
+            dialog = med_postprocess(dialog)
+    except FileNotFoundError as e:
+        stream.finish(f"❌ {e}")
+        return {"error": str(e)}, 404
+    except RuntimeError as e:
+        stream.finish(f"❌ {e}")
+        return {"error": str(e)}, 500
+
+    # Zusammenfassung (gestreamt – Token-Stücke gehen sofort an die Seite)
+    progress("zusammenfassung")
+    notes_used = 0
+    llm_timing = {}
     if dialog.strip():
-        anamnese = summarize_with_lmstudio(dialog, geschlecht, lmmodel_name)
+        summary_input, notes_used = _summary_input(session_id, dialog, line_blocks, lines, post=post)
+        anamnese = summarize_with_lmstudio(summary_input, geschlecht, lmmodel_name, on_token=summary_token,
+                                           timing=llm_timing)
     else:
         anamnese = "⚠️ Keine Sprachaufnahme erkannt – keine Zusammenfassung möglich."
+    stream.finish(anamnese)
 
 
-    # Gesprächsdauer
-    if dst_vtt and os.path.exists(dst_vtt):
-        gesprächsdauer = get_gespraechsdauer_from_vtt(dst_vtt)
-    else:
+    # Gesprächsdauer direkt aus den Segment-Zeitstempeln
+    gesprächsdauer = blocks_duration(blocks)
+    if gesprächsdauer is None:
         gesprächsdauer = "-"
 
     # Speichern
+    progress("speichern")
     with open(os.path.join(TRANSKRIPT_DIR, f"{basename}_anamnese.txt"), 'w', encoding='utf-8') as f:
         f.write(anamnese)
     with open(os.path.join(TRANSKRIPT_DIR, f"{basename}_transkript.txt"), 'w', encoding='utf-8') as f:
         f.write(dialog)
 
+    # Sprechanteil aus der VAD-Zeitachse (nur Live-Sessions mit VAD)
+    meta = {"gesprächsdauer": blocks_duration(blocks)}
+    if notes_used:
+        meta["live_notizen"] = notes_used
+    if llm_timing:
+        meta["llm"] = llm_timing   # Server-Zeiten der Zusammenfassung (Prompt-Auswertung vs. Generierung)
+    timeline = session_speech_timeline(session_id)
+    if timeline is not None:
+        last = max(chunks, key=lambda c: c["idx"])
+        total = last["offset"] + last["duration"] - last["trim"]
+        meta["sprechanteil"] = round(sum(e - s for s, e in timeline) / total, 2) if total > 0 else None
+
     processing_duration = round((datetime.now() - start_processing).total_seconds(), 1)
     with open(os.path.join(TRANSKRIPT_DIR, f"{basename}.meta.json"), 'w', encoding='utf-8') as f:
-        json.dump({"verarbeitungsdauer": processing_duration}, f)
+        json.dump({"verarbeitungsdauer": processing_duration, **meta}, f)
 
     # Cleanup
     try:
-        if os.path.exists(concat_list_path): os.remove(concat_list_path)
-        if os.path.exists(concat_out): os.remove(concat_out)
-        for p in chunk_wavs:
-            try: os.remove(p)
-            except Exception: pass
-    # NEU:
-        for p in temp_trims:
+        for p in temp_files:
             try: os.remove(p)
             except Exception: pass
     except Exception as e:
         print("⚠️ Cleanup Warnung:", e)
 
-
-    SESSION_CHUNK_WAVS.pop(session_id, None)
-    SESSION_CHUNK_IDX.pop(session_id, None)
-    SESSION_TEXT.pop(session_id, None)
-    if session_id in SESSION_TRANSCRIPTS:
-        del SESSION_TRANSCRIPTS[session_id]
-
     if os.path.exists(gdt_path):
         os.remove(gdt_path)
 
-    return jsonify({
+    return {
         "dialog": dialog,
         "anamnese": anamnese,
         "filename": f"{basename}_anamnese.txt",
         "processing_duration": processing_duration,
         "gesprächsdauer": gesprächsdauer
-    })
+    }, 200
 
 
 @app.route('/sidebar_reload')
@@ -1161,6 +1785,41 @@ def list_models_route():
     return jsonify({"models": list_available_models(), "current": get_current_whisper_model_path()})
 
 
+@app.route("/admin/whisper_pool")
+def whisper_pool_route():
+    return jsonify({"pools": pool_stats()})
+
+
+@app.route("/admin/asr_cache", methods=["GET", "POST"])
+def asr_cache_route():
+    # POST: Cache leeren – komplett, für ein Modell (model_path) oder einen Eintrag (key)
+    if request.method == "POST":
+        data = request.get_json(silent=True) or request.form
+        key = (data.get("key") or "").strip()
+        if key:
+            removed = 1 if TRANSCRIPT_CACHE.invalidate(key) else 0
+        else:
+            removed = TRANSCRIPT_CACHE.clear(model_path=(data.get("model_path") or "").strip() or None)
+        return jsonify({"ok": True, "removed": removed, **TRANSCRIPT_CACHE.stats()})
+    return jsonify(TRANSCRIPT_CACHE.stats())
+
+
+@app.route("/admin/llm_metrics", methods=["GET", "POST"])
+def llm_metrics_route():
+    # Aufrufe/Latenzen je Aufrufart + Verbindungen pro Host (Keep-Alive-Wiederverwendung) + Memo
+    # + LLM-Server (Gesundheit, laufende Anfragen, Modelle, Failover)
+    # POST: Memo leeren (z.B. nach Prompt-Tests mit gleichem Modell)
+    if request.method == "POST":
+        LLM_MEMO.clear()
+    return jsonify({**LLM.stats(), "memo": LLM_MEMO.stats(), "router": ROUTER.stats()})
+
+
+@app.route("/admin/scheduler")
+def scheduler_route():
+    # Queue-Tiefe / laufende Jobs / Wartezeiten je Ressource und Prioritätsklasse
+    return jsonify(SCHEDULER.stats())
+
+
 @app.route("/set_model", methods=["POST"])
 def set_model_route():
     # akzeptiere FormData, x-www-form-urlencoded oder JSON
@@ -1209,6 +1868,9 @@ def set_model_route():
     _save_settings(cfg)
     return jsonify({"ok": True, "model_path": model_path})
 
+# Upload-Jobs: Worker starten, unerledigte Jobs vom letzten Lauf wieder aufnehmen
+UPLOAD_JOBS.start()
+
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5001)   # kein ssl_context hier!
 
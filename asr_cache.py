@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import wave
+
+# ── Persistenter Transkriptions-Cache ─────────────────────────────────────
+# Schlüssel = Hash über PCM-Inhalt + Modell-Identität + Decode-Parameter.
+# Dieselbe Aufnahme (erneuter Upload, Wiederverarbeitung nach Prompt-Änderung)
+# kostet damit keinen zweiten whisper-Lauf.
+CACHE_ENABLED = os.getenv("ASR_CACHE", "1") != "0"
+CACHE_DIR     = os.getenv("ASR_CACHE_DIR", os.path.join(os.getcwd(), "cache", "asr"))
+CACHE_MAX_MB  = float(os.getenv("ASR_CACHE_MAX_MB", "512"))
+
+
+def audio_content_hash(audio_path: str) -> str:
+    """SHA-256 über die PCM-Frames (WAV) bzw. die Dateibytes (andere Formate)."""
+    h = hashlib.sha256()
+    try:
+        with wave.open(audio_path, "rb") as w:
+            h.update(f"{w.getframerate()}:{w.getnchannels()}:{w.getsampwidth()}".encode())
+            while True:
+                frames = w.readframes(1 << 16)
+                if not frames:
+                    break
+                h.update(frames)
+        return h.hexdigest()
+    except (wave.Error, EOFError):
+        pass
+    with open(audio_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def pcm_content_hash(pcm: bytes, sample_rate: int = 16000) -> str:
+    """Wie audio_content_hash für eine Mono-PCM16-WAV mit diesen Frames – ohne Datei."""
+    h = hashlib.sha256()
+    h.update(f"{sample_rate}:1:2".encode())
+    h.update(pcm)
+    return h.hexdigest()
+
+
+def model_identity(model_path: str) -> str:
+    st = os.stat(model_path)
+    return f"{os.path.abspath(model_path)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class TranscriptCache:
+    """
+    Datei-basierter Cache (ein JSON pro Schlüssel) mit größenbasierter LRU-Verdrängung.
+    Zugriffe frischen die mtime auf; beim Überschreiten von max_bytes fliegen die ältesten Einträge.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_mb: float = CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._total = None   # Bytes, lazy beim ersten Zugriff berechnet
+
+    def make_key(self, audio_path: str, model_path: str, lang: str, beam: str, prompt: str,
+                 extra_args: list[str] | None = None, mode: str = "single", audio_hash: str | None = None) -> str:
+        """audio_hash (z.B. aus pcm_content_hash) ersetzt das Hashen von audio_path."""
+        parts = {
+            "pcm": audio_hash or audio_content_hash(audio_path),
+            "model": model_identity(model_path),
+            "lang": lang,
+            "beam": beam,
+            "prompt": prompt,
+            "extra": list(extra_args or []),
+            "mode": mode,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _entries(self) -> list[tuple[str, os.stat_result]]:
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return []
+        out = []
+        for n in names:
+            if n.endswith(".json"):
+                p = os.path.join(self.cache_dir, n)
+                try:
+                    out.append((p, os.stat(p)))
+                except FileNotFoundError:
+                    pass
+        return out
+
+    def get(self, key: str) -> dict | None:
+        p = self._path(key)
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(p)   # LRU: zuletzt benutzt
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, text: str, blocks: list[dict], model_path: str = "") -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        data = json.dumps({"text": text, "blocks": blocks, "model": model_path}, ensure_ascii=False).encode("utf-8")
+        p = self._path(key)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")   # eindeutig je Schreiber
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        except BaseException:
+            os.remove(tmp)
+            raise
+        with self._lock:
+            # Überschreiben: alte Größe abziehen (unter dem Lock, damit gleichzeitige puts richtig zählen)
+            try:
+                old = os.stat(p).st_size
+            except FileNotFoundError:
+                old = 0
+            os.replace(tmp, p)
+            if self._total is None:
+                self._total = sum(st.st_size for _, st in self._entries())
+            else:
+                self._total += len(data) - old
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda e: e[1].st_mtime)
+        total = sum(st.st_size for _, st in entries)
+        for p, st in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(p)
+                total -= st.st_size
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+        self._total = total
+
+    def invalidate(self, key: str) -> bool:
+        """Einen Eintrag entfernen (z.B. nach manueller Korrektur der Aufnahme)."""
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            return False
+        with self._lock:
+            self._total = None
+        return True
+
+    def clear(self, model_path: str | None = None) -> int:
+        """Alles löschen – oder nur Einträge eines Modells (z.B. nach Modell-Update)."""
+        removed = 0
+        for p, _ in self._entries():
+            if model_path:
+                try:
+                    with open(p, "r", encoding="utf-8") as f:
+                        if json.load(f).get("model") != os.path.abspath(model_path):
+                            continue
+                except (FileNotFoundError, ValueError):
+                    pass
+            try:
+                os.remove(p)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._total = None
+        return removed
+
+    def stats(self) -> dict:
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": CACHE_ENABLED,
+                "dir": self.cache_dir,
+                "entries": len(entries),
+                "size_mb": round(sum(st.st_size for _, st in entries) / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            }
+
+
+TRANSCRIPT_CACHE = TranscriptCache()
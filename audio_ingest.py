@@ -0,0 +1,167 @@
+import io
+import os
+import subprocess
+import tempfile
+import wave
+
+try:
+    import numpy as np
+    USE_NUMPY = True
+except Exception:
+    USE_NUMPY = False
+
+# ── Live-Chunk-Ingest im Prozess ──────────────────────────────────────────
+# Bisher kostete jeder Live-Chunk zwei ffmpeg-Prozesse (Decode → WAV, dann
+# HP/LP/Kompressor → _clean.wav) plus drei Dateien. Hier wird einmal dekodiert
+# und die Filterkette vektorisiert mit NumPy im Speicher angewendet; heraus
+# kommt PCM16 (16 kHz, Mono), das direkt an die ASR geht.
+# WAV: kein Prozess, keine Datei. Andere Container (webm/ogg/mp4): ein ffmpeg über Pipes.
+# Ohne NumPy: ein ffmpeg über Pipes mit derselben Filterkette (-af).
+TARGET_SR = 16000
+
+# Entspricht "highpass=f=70,lowpass=f=12000,acompressor=threshold=-18dB:ratio=2.0:attack=5:release=120:makeup=3"
+HP_HZ = 70.0
+LP_HZ = 12000.0
+COMP_THRESHOLD_DB = -18.0
+COMP_RATIO = 2.0
+COMP_ATTACK_MS = 5.0
+COMP_RELEASE_MS = 120.0
+COMP_MAKEUP = 3.0            # linearer Faktor wie bei ffmpeg acompressor (1..64)
+COMP_FRAME_MS = 5.0          # Hüllkurve pro Frame statt pro Sample
+
+FFMPEG_SOFT_FILTER = (
+    f"highpass=f={HP_HZ:g},lowpass=f={LP_HZ:g},"
+    f"acompressor=threshold={COMP_THRESHOLD_DB:g}dB:ratio={COMP_RATIO:g}:"
+    f"attack={COMP_ATTACK_MS:g}:release={COMP_RELEASE_MS:g}:makeup={COMP_MAKEUP:g}"
+)
+
+
+def _parse_wav(data: bytes):
+    """WAV aus dem Speicher → (float32-Mono in [-1, 1], sample_rate); None bei nicht unterstütztem Format."""
+    try:
+        with wave.open(io.BytesIO(data), "rb") as w:
+            ch, width, sr = w.getnchannels(), w.getsampwidth(), w.getframerate()
+            raw = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        return None   # z.B. Float-WAV (Format 3) → ffmpeg
+    if width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        v = (b[:, 0].astype(np.int32) | (b[:, 1].astype(np.int32) << 8) | (b[:, 2].astype(np.int32) << 16))
+        v = np.where(v >= 1 << 23, v - (1 << 24), v)
+        x = v.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        x = np.frombuffer(raw, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        return None
+    if ch > 1:
+        x = x[: len(x) - len(x) % ch].reshape(-1, ch).mean(axis=1)
+    return x, sr
+
+
+def _resample_and_filter(x, sr: int):
+    """
+    Resampling nach TARGET_SR + Hoch-/Tiefpass in *einer* FFT:
+    Spektrum auf die Ziel-Länge kürzen/auffüllen und mit Butterworth-Beträgen (2. Ordnung) gewichten.
+    Nullphasig – für Sprach-Chunks von einigen Sekunden unkritisch.
+    """
+    n = len(x)
+    if n == 0:
+        return x
+    n_out = max(1, int(round(n * TARGET_SR / float(sr))))
+    spec = np.fft.rfft(x)
+    k = n_out // 2 + 1
+    if len(spec) >= k:
+        spec = spec[:k]
+    else:
+        spec = np.concatenate([spec, np.zeros(k - len(spec), dtype=spec.dtype)])
+    f = np.fft.rfftfreq(n_out, d=1.0 / TARGET_SR)
+    with np.errstate(divide="ignore"):
+        hp = 1.0 / np.sqrt(1.0 + (HP_HZ / np.maximum(f, 1e-9)) ** 4)
+    lp = 1.0 / np.sqrt(1.0 + (f / LP_HZ) ** 4)   # bei 16 kHz liegt 12 kHz über Nyquist → wirkt kaum
+    y = np.fft.irfft(spec * hp * lp, n=n_out) * (n_out / float(n))
+    return y.astype(np.float32)
+
+
+def _compress(x):
+    """
+    Kompressor wie acompressor (RMS-Detektor, Attack/Release, Makeup), aber pro COMP_FRAME_MS-Frame:
+    Hüllkurve und Gain je Frame, danach linear auf Samples interpoliert.
+    """
+    frame = max(1, int(TARGET_SR * COMP_FRAME_MS / 1000.0))
+    n_frames = -(-len(x) // frame)
+    if n_frames == 0:
+        return x
+    padded = np.zeros(n_frames * frame, dtype=np.float32)
+    padded[: len(x)] = x
+    power = (padded.reshape(n_frames, frame) ** 2).mean(axis=1)
+
+    a_att = np.exp(-COMP_FRAME_MS / COMP_ATTACK_MS)
+    a_rel = np.exp(-COMP_FRAME_MS / COMP_RELEASE_MS)
+    env = np.empty(n_frames, dtype=np.float64)
+    e = 0.0
+    for i, p in enumerate(power.tolist()):   # rekursive Glättung: ~200 Frames/s, vernachlässigbar
+        a = a_att if p > e else a_rel
+        e = a * e + (1.0 - a) * p
+        env[i] = e
+
+    thr = 10.0 ** (COMP_THRESHOLD_DB / 20.0)
+    level = np.sqrt(env)
+    gain = np.ones(n_frames, dtype=np.float64)
+    over = level > thr
+    gain[over] = (level[over] / thr) ** (1.0 / COMP_RATIO - 1.0)
+    gain *= COMP_MAKEUP
+
+    centers = (np.arange(n_frames) + 0.5) * frame
+    g = np.interp(np.arange(len(x)), centers, gain)
+    return (x * g).astype(np.float32)
+
+
+def _to_pcm16(x) -> bytes:
+    return (np.clip(x, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def _ffmpeg_pipe(data: bytes, ext: str, with_filter: bool, timeout: float) -> bytes:
+    """Ein ffmpeg-Lauf: Container-Bytes über stdin → s16le 16 kHz Mono über stdout."""
+    def run(src: str, stdin_data: bytes | None) -> subprocess.CompletedProcess:
+        cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-i", src]
+        if with_filter:
+            cmd += ["-af", FFMPEG_SOFT_FILTER]
+        cmd += ["-f", "s16le", "-ac", "1", "-ar", str(TARGET_SR), "-c:a", "pcm_s16le", "pipe:1"]
+        return subprocess.run(cmd, input=stdin_data, capture_output=True, timeout=timeout)
+
+    proc = run("pipe:0", data)
+    if proc.returncode != 0 and ext in ("mp4", "m4a"):
+        # MP4/M4A mit moov-Atom am Ende ist über eine Pipe nicht lesbar → einmalig über eine Temp-Datei
+        fd, tmp = tempfile.mkstemp(suffix=f".{ext}")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            proc = run(tmp, None)
+        finally:
+            try: os.remove(tmp)
+            except Exception: pass
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.decode(errors="ignore") or "ffmpeg failed")
+    return proc.stdout
+
+
+def ingest_chunk(data: bytes, ext: str = "wav", timeout: float = 15) -> bytes:
+    """
+    Live-Chunk (Container-Bytes) → gefiltertes PCM16, 16 kHz, Mono.
+    Wirft subprocess.TimeoutExpired bzw. RuntimeError, wenn ffmpeg benötigt wird und scheitert.
+    """
+    ext = (ext or "").lower()
+    if not USE_NUMPY:
+        return _ffmpeg_pipe(data, ext, with_filter=True, timeout=timeout)
+
+    parsed = _parse_wav(data) if ext == "wav" else None
+    if parsed is not None:
+        x, sr = parsed
+    else:
+        pcm = _ffmpeg_pipe(data, ext, with_filter=False, timeout=timeout)
+        x, sr = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0, TARGET_SR
+    return _to_pcm16(_compress(_resample_and_filter(x, sr)))
@@ -0,0 +1,194 @@
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+# ── Persistente Job-Queue für den klassischen Upload-Workflow ─────────────
+# Jeder Job ist eine JSON-Datei in JOBS_DIR. Hintergrund-Worker arbeiten die
+# Queue ab; nach einem Neustart werden offene/abgebrochene Jobs wieder eingereiht.
+JOBS_DIR    = os.getenv("JOBS_DIR", os.path.join(os.getcwd(), "jobs"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+
+# Geschätzte Sekunden pro Sekunde Audio je Stufe (Startwerte, werden per EMA nachgeführt)
+# plus fester Sockel pro Stufe (z.B. LLM-Antwortzeit).
+STAGES = ["preprocess", "asr", "diarization", "postprocess", "summary", "save"]
+STAGE_LABELS = {
+    "queued": "In Warteschlange",
+    "preprocess": "Audio-Vorverarbeitung",
+    "asr": "Transkription",
+    "diarization": "Sprecherzuordnung",
+    "postprocess": "Fachwort-Korrektur",
+    "summary": "Zusammenfassung",
+    "save": "Speichern",
+    "done": "Fertig",
+    "error": "Fehler",
+}
+_STAGE_RTF  = {"preprocess": 0.01, "asr": 0.3, "diarization": 0.2, "postprocess": 0.0, "summary": 0.0, "save": 0.0}
+_STAGE_BASE = {"preprocess": 1.0, "asr": 2.0, "diarization": 0.0, "postprocess": 0.5, "summary": 20.0, "save": 0.1}
+_EMA_ALPHA = 0.3
+
+
+class JobQueue:
+    """
+    Job-Queue mit Datei-Persistenz.
+    handler(job: dict, progress: callable) erledigt die Arbeit und gibt das Ergebnis-Dict zurück;
+    progress(stage) meldet den Stufenwechsel (für Status/ETA).
+    """
+
+    def __init__(self, handler, jobs_dir: str = JOBS_DIR, workers: int = JOB_WORKERS):
+        self.handler = handler
+        self.jobs_dir = jobs_dir
+        self.workers = max(1, workers)
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._rtf = dict(_STAGE_RTF)
+        self._base = dict(_STAGE_BASE)
+
+    # ---- Persistenz ----
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: dict) -> None:
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        tmp = self._path(job["id"]) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self._path(job["id"]))
+
+    def get(self, job_id: str) -> dict | None:
+        try:
+            with open(self._path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # ---- API ----
+    def start(self) -> None:
+        """Worker starten und unerledigte Jobs (queued/running) aus JOBS_DIR wieder einreihen."""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        pending = []
+        for name in os.listdir(self.jobs_dir):
+            if not name.endswith(".json"):
+                continue
+            job = self.get(name[:-5])
+            if job and job.get("status") in ("queued", "running"):
+                if job["status"] == "running":
+                    print(f"♻️ Job {job['id']} nach Neustart wieder eingereiht (war: {job.get('stage')})")
+                job["status"] = "queued"
+                job["stage"] = "queued"
+                self._save(job)
+                pending.append(job)
+        for job in sorted(pending, key=lambda j: j.get("created", 0)):
+            self._q.put(job["id"])
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True).start()
+
+    def submit(self, params: dict, audio_duration: float | None = None) -> dict:
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "stage": "queued",
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "audio_duration": audio_duration,
+            "stage_started": None,
+            "params": params,
+            "result": None,
+            "error": None,
+        }
+        self._save(job)
+        self.start()
+        self._q.put(job["id"])
+        return job
+
+    def status(self, job_id: str) -> dict | None:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        stage = job.get("stage")
+        done_stages = STAGES.index(stage) if stage in STAGES else (len(STAGES) if stage == "done" else 0)
+        return {
+            "id": job["id"],
+            "status": job["status"],
+            "stage": stage,
+            "stage_label": STAGE_LABELS.get(stage, stage),
+            "progress": round(done_stages / len(STAGES), 2),
+            "eta_sec": self._eta(job),
+            "queue_position": self._queue_position(job),
+            "audio_duration": job.get("audio_duration"),
+            "result": job.get("result"),
+            "error": job.get("error"),
+        }
+
+    # ---- ETA ----
+    def _stage_estimate(self, stage: str, dur: float) -> float:
+        return self._base.get(stage, 0.0) + self._rtf.get(stage, 0.0) * dur
+
+    def _eta(self, job: dict) -> float | None:
+        if job["status"] in ("done", "error"):
+            return 0.0
+        dur = job.get("audio_duration") or 0.0
+        stage = job.get("stage")
+        if stage not in STAGES:
+            # wartet noch: eigene Laufzeit + alle Jobs davor (grob gleich lang angenommen)
+            own = sum(self._stage_estimate(s, dur) for s in STAGES)
+            return round(own * (1 + (self._queue_position(job) or 0)), 1)
+        i = STAGES.index(stage)
+        elapsed = time.time() - (job.get("stage_started") or time.time())
+        current = max(0.0, self._stage_estimate(stage, dur) - elapsed)
+        return round(current + sum(self._stage_estimate(s, dur) for s in STAGES[i + 1:]), 1)
+
+    def _queue_position(self, job: dict) -> int | None:
+        if job["status"] != "queued":
+            return None
+        with self._q.mutex:
+            ids = list(self._q.queue)
+        return ids.index(job["id"]) if job["id"] in ids else None
+
+    def _learn(self, stage: str, seconds: float, dur: float) -> None:
+        # Echtzeitfaktor je Stufe nachführen, damit die ETA zur Hardware passt
+        if dur and dur > 1.0:
+            obs = max(0.0, seconds - self._base.get(stage, 0.0)) / dur
+            self._rtf[stage] = (1 - _EMA_ALPHA) * self._rtf.get(stage, 0.0) + _EMA_ALPHA * obs
+
+    # ---- Worker ----
+    def _worker(self) -> None:
+        while True:
+            job_id = self._q.get()
+            job = self.get(job_id)
+            if job is None or job["status"] != "queued":
+                continue
+            job["status"] = "running"
+            job["started"] = time.time()
+            self._save(job)
+
+            def progress(stage: str, _job=job) -> None:
+                now = time.time()
+                prev, prev_start = _job.get("stage"), _job.get("stage_started")
+                if prev in STAGES and prev_start:
+                    self._learn(prev, now - prev_start, _job.get("audio_duration") or 0.0)
+                _job["stage"] = stage
+                _job["stage_started"] = now
+                self._save(_job)
+
+            try:
+                result = self.handler(job, progress)
+                job["status"] = "done"
+                job["stage"] = "done"
+                job["result"] = result
+            except Exception as e:
+                traceback.print_exc()
+                job["status"] = "error"
+                job["stage"] = "error"
+                job["error"] = str(e)
+            job["finished"] = time.time()
+            self._save(job)
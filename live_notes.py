@@ -0,0 +1,78 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from scheduler import priority, FINALIZE
+from utils import update_live_notes
+
+# ── Laufende Notizen während der Live-Session ─────────────────────────────
+# Alle LIVE_NOTES_EVERY Chunks wird der seit dem letzten Mal hinzugekommene
+# Live-Text im Hintergrund in die Notizen eingearbeitet. Beim Stopp geht nur
+# noch Notizen + letzter Abschnitt an die Zusammenfassung – der letzte LLM-Aufruf
+# bleibt klein, egal wie lang das Gespräch war.
+LIVE_NOTES_EVERY     = int(os.getenv("LIVE_NOTES_EVERY", "6"))           # Chunks pro Notiz-Update, 0 = aus
+LIVE_NOTES_MIN_CHARS = int(os.getenv("LIVE_NOTES_MIN_CHARS", "400"))     # kleinere Abschnitte warten auf mehr Text
+LIVE_NOTES_WAIT      = float(os.getenv("LIVE_NOTES_WAIT", "20"))         # Sekunden, die der Stopp auf ein laufendes Update wartet
+
+NOTES_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-notes")
+
+
+class LiveNotes:
+    """
+    Notizen einer Live-Session: text deckt den Live-Text bis covered (Zeichen-Offset im
+    SessionTranscript) ab. Updates laufen nacheinander; ein Fehler lässt die Notizen unverändert
+    (der Abschnitt kommt dann beim nächsten Update bzw. als Rest in die Zusammenfassung).
+    """
+
+    def __init__(self, lmmodel_name: str):
+        self.lmmodel_name = lmmodel_name
+        self.text = ""
+        self.covered = 0
+        self.updates = 0
+        self.errors = 0
+        self._chunks = 0
+        self._future = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> tuple[str, int]:
+        with self._lock:
+            return self.text, self.covered
+
+    def chunk_committed(self, transcript) -> None:
+        """Nach jedem Live-Chunk mit Text aufrufen; stößt alle LIVE_NOTES_EVERY Chunks ein Update an."""
+        if LIVE_NOTES_EVERY <= 0:
+            return
+        with self._lock:
+            self._chunks += 1
+            if self._chunks < LIVE_NOTES_EVERY or (self._future is not None and not self._future.done()):
+                return
+            if len(transcript) - self.covered < LIVE_NOTES_MIN_CHARS:
+                return
+            self._chunks = 0
+            self._future = NOTES_EXECUTOR.submit(self._update, transcript)
+
+    def _update(self, transcript) -> None:
+        notes, covered = self.snapshot()
+        end = len(transcript)
+        _, segment = transcript.since(covered)
+        segment = segment[: end - covered]
+        try:
+            with priority(FINALIZE):   # hinter Live-Chunks, aber vor Batch-Uploads
+                updated = update_live_notes(notes, segment, self.lmmodel_name)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Live-Notizen: Update fehlgeschlagen ({e})")
+            return
+        with self._lock:
+            self.text, self.covered = updated, end
+            self.updates += 1
+        print(f"📝 Live-Notizen aktualisiert: {end} Zeichen abgedeckt, {len(updated)} Zeichen Notizen")
+
+    def wait(self, timeout: float = LIVE_NOTES_WAIT) -> None:
+        """Laufendes Update abwarten (höchstens timeout) – danach zählt der letzte fertige Stand."""
+        fut = self._future
+        if fut is not None and not fut.done():
+            try:
+                fut.result(timeout=timeout)
+            except Exception:
+                pass
@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ── Gemeinsamer HTTP-Client für den LLM-Server ────────────────────────────
+# Eine requests.Session für alle LLM-Aufrufe (Sprecherzuordnung, Zusammenfassung,
+# Modell-Liste): Keep-Alive statt neuer TCP-Verbindung pro Aufruf, begrenzte
+# Verbindungen pro Host, Wiederholung nur bei Verbindungsfehlern (eine Generierung
+# wird nie doppelt angestoßen) und Latenz-Metriken pro Aufrufart.
+LMSTUDIO_URL     = os.getenv("LMSTUDIO_URL", "http://192.168.105.136:11434/api/generate")   # LLM-Endpunkt (Standard-Server)
+LLM_POOL_MAXSIZE = int(os.getenv("LLM_POOL_MAXSIZE", "8"))       # Verbindungen pro Host
+LLM_POOL_BLOCK   = os.getenv("LLM_POOL_BLOCK", "0") == "1"        # 1 = warten statt Zusatzverbindung öffnen
+LLM_RETRIES      = int(os.getenv("LLM_RETRIES", "2"))             # nur Verbindungsaufbau
+LLM_BACKOFF      = float(os.getenv("LLM_BACKOFF", "0.5"))         # Sekunden, verdoppelt je Versuch
+_LATENCY_WINDOW = 200       # letzte Aufrufe pro Aufrufart für p50/p95
+
+# Memo für Generierungen: gleiche Anfrage (Modell, Prompt, Sampling-Parameter) → gleiches Ergebnis,
+# gleichzeitige identische Anfragen teilen sich einen Aufruf (single-flight)
+LLM_MEMO_SIZE = int(os.getenv("LLM_MEMO_SIZE", "256"))           # Einträge (LRU), 0 = aus
+LLM_MEMO_TTL  = float(os.getenv("LLM_MEMO_TTL", "3600"))         # Sekunden
+
+
+class _CallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = None
+        self.recent = deque(maxlen=_LATENCY_WINDOW)
+        self.timed = 0                 # Aufrufe mit Server-Zeiten (Ollama: load/prompt_eval/eval_duration)
+        self.timing = {"load_ms": 0.0, "prompt_eval_ms": 0.0, "eval_ms": 0.0, "prompt_tokens": 0, "tokens": 0}
+
+    def add(self, ms: float, ok: bool) -> None:
+        self.calls += 1
+        self.errors += not ok
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.last_ms = ms
+        self.recent.append(ms)
+
+    def add_timing(self, timing: dict) -> None:
+        self.timed += 1
+        for k in self.timing:
+            self.timing[k] += timing.get(k) or 0
+
+    def as_dict(self) -> dict:
+        recent = sorted(self.recent)
+        pct = lambda q: round(recent[min(len(recent) - 1, int(q * len(recent)))], 1) if recent else None
+        timing = None
+        if self.timed:
+            # Prompt-Auswertung (sinkt, wenn der Server den festen Prompt-Anfang wiederverwendet) getrennt von Generierung
+            timing = {f"avg_{k}": round(v / self.timed, 1) for k, v in self.timing.items()}
+            timing["calls"] = self.timed
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.calls, 1) if self.calls else None,
+            "p50_ms": pct(0.50),
+            "p95_ms": pct(0.95),
+            "max_ms": round(self.max_ms, 1),
+            "last_ms": round(self.last_ms, 1) if self.last_ms is not None else None,
+            "server_timing": timing,
+        }
+
+
+class LLMClient:
+    """
+    Thread-sicherer HTTP-Client (eine Session, ein Verbindungspool pro Host).
+    name kennzeichnet die Aufrufart für die Metriken ("speaker", "summary", "tags", …).
+    Bei stream=True wird die Latenz bis zu den Antwort-Headern gemessen.
+    """
+
+    def __init__(self, pool_maxsize: int = LLM_POOL_MAXSIZE, retries: int = LLM_RETRIES,
+                 backoff: float = LLM_BACKOFF, pool_block: bool = LLM_POOL_BLOCK):
+        retry = Retry(total=retries, connect=retries, read=0, status=0, other=0, redirect=0,
+                      backoff_factor=backoff, allowed_methods=None, raise_on_status=False)
+        self.retries = retries
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize,
+                                   pool_block=pool_block, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self._stats: dict[str, _CallStats] = {}
+        self._lock = threading.Lock()
+
+    def request(self, method: str, url: str, name: str = "llm", **kwargs) -> requests.Response:
+        t0 = time.perf_counter()
+        ok = False
+        try:
+            resp = self.session.request(method, url, **kwargs)
+            ok = resp.status_code < 400
+            return resp
+        finally:
+            ms = 1000.0 * (time.perf_counter() - t0)
+            with self._lock:
+                self._stats.setdefault(name, _CallStats()).add(ms, ok)
+
+    def post(self, url: str, name: str = "llm", **kwargs) -> requests.Response:
+        return self.request("POST", url, name=name, **kwargs)
+
+    def get(self, url: str, name: str = "llm", **kwargs) -> requests.Response:
+        return self.request("GET", url, name=name, **kwargs)
+
+    def record_timing(self, name: str, timing: dict | None) -> None:
+        """Server-Zeiten eines Aufrufs (siehe utils.llm_timing) zur Aufrufart name addieren."""
+        if not timing:
+            return
+        with self._lock:
+            self._stats.setdefault(name, _CallStats()).add_timing(timing)
+
+    def stats(self) -> dict:
+        with self._lock:
+            calls = {name: st.as_dict() for name, st in sorted(self._stats.items())}
+        hosts = []
+        for key, pool in list(self.adapter.poolmanager.pools._container.items()):
+            hosts.append({
+                "host": f"{pool.scheme}://{pool.host}:{pool.port}",
+                "connections_opened": pool.num_connections,   # < requests → Keep-Alive greift
+                "requests": pool.num_requests,
+                "idle": pool.pool.qsize() if pool.pool is not None else 0,
+            })
+        return {"pool_maxsize": self.adapter._pool_maxsize, "retries": self.retries, "calls": calls, "hosts": hosts}
+
+
+def memo_key(url: str, payload: dict) -> str:
+    """Schlüssel aus Endpunkt, Modell, Prompt-Hash und allen übrigen Parametern (temperature, options, …)."""
+    rest = {k: v for k, v in payload.items() if k not in ("model", "prompt", "messages")}
+    prompt = payload.get("prompt") if "prompt" in payload else payload.get("messages")
+    h_prompt = hashlib.sha256(json.dumps(prompt, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    h_rest = hashlib.sha256(json.dumps(rest, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    return f"{url}|{payload.get('model')}|{h_prompt}|{h_rest}"
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SingleFlightMemo:
+    """
+    LRU mit TTL + single-flight: get_or_compute(key, fn) ruft fn pro Schlüssel höchstens einmal
+    gleichzeitig auf; wer währenddessen dasselbe anfragt, wartet auf dieses Ergebnis.
+    Gespeichert wird nur, was cache_if(value) erlaubt (Fehler/Exceptions nie).
+    """
+
+    def __init__(self, maxsize: int = LLM_MEMO_SIZE, ttl: float = LLM_MEMO_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+        self._flights: dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.shared = 0
+
+    def get_or_compute(self, key: str, fn, cache_if=lambda value: True):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None and time.monotonic() - hit[0] < self.ttl:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit[1]
+            if hit is not None:
+                del self._data[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+                if flight.error is None and cache_if(flight.value):
+                    self._store(key, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def peek(self, key: str):
+        """Gültiger Eintrag oder None (ohne single-flight, zählt als Treffer)."""
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or time.monotonic() - hit[0] >= self.ttl:
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return hit[1]
+
+    def _store(self, key: str, value) -> None:
+        # Aufrufer hält self._lock
+        if self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic(), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._data), "maxsize": self.maxsize, "ttl_sec": self.ttl,
+                    "hits": self.hits, "misses": self.misses, "shared_inflight": self.shared}
+
+
+LLM = LLMClient()
+LLM_MEMO = SingleFlightMemo()
@@ -0,0 +1,262 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from llm_client import LLM, LMSTUDIO_URL
+
+# ── Mehrere LLM-Server: Lastverteilung + Ausfallsicherheit ────────────────
+# LLM_BACKENDS = "http://a:11434=2, http://b:11434" (Gewicht optional, Standard 1).
+# Ohne LLM_BACKENDS gibt es genau einen Server aus LMSTUDIO_URL – Verhalten wie bisher.
+# Aufrufer bauen ihre URL weiter aus LMSTUDIO_URL; der Router tauscht nur Schema/Host/Port
+# gegen den gewählten Server (Pfad /api/generate, /api/chat, /v1/… bleibt).
+# Auswahl: gesunde Server, die das Modell laut /api/tags haben, mit den wenigsten
+# laufenden Anfragen pro Gewicht. Verbindungsfehler, Timeouts und 502/503/504 →
+# Server als ungesund markieren und denselben Aufruf beim nächsten versuchen.
+LLM_BACKENDS        = os.getenv("LLM_BACKENDS", "")
+LLM_PROBE_INTERVAL  = float(os.getenv("LLM_PROBE_INTERVAL", "30"))    # Sekunden zwischen Health-Probes je Server
+LLM_PROBE_TIMEOUT   = float(os.getenv("LLM_PROBE_TIMEOUT", "3"))
+LLM_DOWN_BACKOFF    = float(os.getenv("LLM_DOWN_BACKOFF", "10"))      # ungesunder Server: frühestens dann erneut prüfen
+_FAILOVER_STATUS = (502, 503, 504)
+
+
+def split_url(url: str) -> tuple[str, str]:
+    """"http://h:11434/api/generate" → ("http://h:11434", "/api/generate"); ohne API-Pfad: (url, "")."""
+    url = url.strip().rstrip("/")
+    for marker in ("/api/", "/v1/"):
+        i = url.find(marker)
+        if i >= 0:
+            return url[:i], url[i:]
+    return url, ""
+
+
+def _norm_model(name: str) -> str:
+    return name[: -len(":latest")] if name.endswith(":latest") else name
+
+
+class Backend:
+    """Ein LLM-Server: Gewicht, laufende Anfragen, Gesundheit und Modell-Liste (aus dem letzten Probe)."""
+
+    def __init__(self, url: str, weight: float = 1.0):
+        self.base, _ = split_url(url)
+        self.weight = max(0.01, float(weight))
+        self.outstanding = 0
+        self.healthy = True          # optimistisch bis zum ersten Fehler/Probe
+        self.models: set[str] | None = None   # Namen laut /api/tags; None = unbekannt (noch nicht geprüft)
+        self.checked = 0.0           # monotonic des letzten Probes
+        self.requests = 0
+        self.failures = 0
+        self.last_error = None
+
+    def lists(self, model: str) -> bool:
+        """Meldet der Server das Modell ("mistral" = "mistral:latest")?"""
+        return self.models is not None and _norm_model(model) in {_norm_model(m) for m in self.models}
+
+    def as_dict(self) -> dict:
+        return {
+            "base": self.base, "weight": self.weight, "healthy": self.healthy,
+            "outstanding": self.outstanding, "requests": self.requests, "failures": self.failures,
+            "models": sorted(self.models) if self.models is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+def parse_backends(spec: str) -> list[Backend]:
+    """"url[=gewicht], url[=gewicht], …" → Backends (Leerzeichen oder Komma getrennt)."""
+    out = []
+    for item in spec.replace(",", " ").split():
+        url, weight = item, 1.0
+        head, sep, tail = item.rpartition("=")
+        if sep:
+            try:
+                url, weight = head, float(tail)
+            except ValueError:
+                pass
+        out.append(Backend(url, weight))
+    return out
+
+
+class LLMRouter:
+    """
+    Verteilt LLM-Aufrufe auf mehrere Server (weighted least-outstanding-requests) mit Failover.
+    backends/client/probe_interval sind für Tests injizierbar (z.B. lokale Stub-Server).
+    """
+
+    def __init__(self, backends: list[Backend] | None = None, client=LLM,
+                 probe_interval: float = LLM_PROBE_INTERVAL, down_backoff: float = LLM_DOWN_BACKOFF):
+        if not backends:
+            backends = parse_backends(LLM_BACKENDS) or [Backend(LMSTUDIO_URL)]
+        self.backends = backends
+        self.client = client
+        self.probe_interval = probe_interval
+        self.down_backoff = down_backoff
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._probing: set[str] = set()
+        self._probe_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="llm-probe")
+
+    # ── Health-Probes ──────────────────────────────────────────────────
+    def probe(self, b: Backend, api_path: str = "/api/") -> bool:
+        """GET /api/tags (bzw. /v1/models) → Gesundheit + Modell-Liste des Servers."""
+        openai = api_path.startswith("/v1/")
+        url = f"{b.base}/v1/models" if openai else f"{b.base}/api/tags"
+        try:
+            r = self.client.get(url, name="probe", timeout=LLM_PROBE_TIMEOUT)
+            ok = r.status_code < 400
+            models = None
+            if ok:
+                data = r.json()
+                items = data.get("data" if openai else "models") or []
+                key = "id" if openai else "name"
+                models = {m[key] for m in items if isinstance(m, dict) and isinstance(m.get(key), str)}
+            err = None if ok else f"HTTP {r.status_code}"
+        except (requests.RequestException, ValueError) as e:
+            ok, models, err = False, None, type(e).__name__
+        with self._lock:
+            was = b.healthy
+            b.healthy, b.checked = ok, time.monotonic()
+            if ok:
+                b.models = models
+            b.last_error = err if not ok else b.last_error
+        if was != ok:
+            print(f"{'✅' if ok else '⚠️'} LLM-Server {b.base}: {'erreichbar' if ok else 'nicht erreichbar'}"
+                  + (f" ({err})" if err else ""))
+        return ok
+
+    def _probe_async(self, b: Backend, api_path: str) -> None:
+        with self._lock:
+            if b.base in self._probing:
+                return
+            self._probing.add(b.base)
+
+        def run():
+            try:
+                self.probe(b, api_path)
+            finally:
+                with self._lock:
+                    self._probing.discard(b.base)
+        self._probe_pool.submit(run)
+
+    def _refresh(self, api_path: str) -> None:
+        """Erster Aufruf: alle Server synchron prüfen; danach veraltete im Hintergrund."""
+        now = time.monotonic()
+        unchecked = [b for b in self.backends if b.checked == 0.0]
+        if unchecked and len(self.backends) > 1:
+            list(self._probe_pool.map(lambda b: self.probe(b, api_path), unchecked))
+        for b in self.backends:
+            interval = self.probe_interval if b.healthy else self.down_backoff
+            if b.checked and now - b.checked >= interval:
+                self._probe_async(b, api_path)
+
+    # ── Auswahl ────────────────────────────────────────────────────────
+    def pick(self, model: str | None, exclude: set[str] = frozenset()) -> Backend | None:
+        """Server mit den wenigsten laufenden Anfragen pro Gewicht; Modell-Pinning über /api/tags."""
+        with self._lock:
+            cands = [b for b in self.backends if b.base not in exclude]
+            pinned = [b for b in cands if model is not None and b.lists(model)]
+            pool = pinned or cands   # meldet kein Server das Modell, kommen alle in Frage
+            healthy = [b for b in pool if b.healthy] or pool   # alle ungesund → trotzdem versuchen
+            if not healthy:
+                return None
+            best = min((b.outstanding + 1) / b.weight for b in healthy)
+            ties = [b for b in healthy if (b.outstanding + 1) / b.weight == best]
+            b = random.choice(ties)
+            b.outstanding += 1
+            b.requests += 1
+            return b
+
+    def _releaser(self, b: Backend):
+        """Einmalig aufrufbar: Anfrage bei b als beendet zählen (gestreamt erst beim Schließen der Antwort)."""
+        done = threading.Event()
+
+        def release():
+            if not done.is_set():
+                done.set()
+                with self._lock:
+                    b.outstanding -= 1
+        return release
+
+    def _mark_down(self, b: Backend, err: str) -> None:
+        with self._lock:
+            b.failures += 1
+            b.last_error = err
+            b.checked = time.monotonic()
+            was, b.healthy = b.healthy, False
+        if was:
+            print(f"⚠️ LLM-Server {b.base} ausgefallen ({err}) – weiter mit dem nächsten")
+
+    # ── Aufruf ─────────────────────────────────────────────────────────
+    def post(self, url: str, name: str = "llm", json: dict | None = None, **kwargs) -> requests.Response:
+        """
+        Wie LLM.post(url, …), aber auf einen der Server verteilt (url liefert nur den API-Pfad).
+        Bei Verbindungsfehler/Timeout/502-504 wird derselbe Aufruf beim nächsten Server wiederholt;
+        scheitern alle, wird der letzte Fehler weitergereicht bzw. die letzte Antwort zurückgegeben.
+        """
+        _, path = split_url(url)
+        model = (json or {}).get("model")
+        self._refresh(path)
+        tried: set[str] = set()
+        last_exc, last_resp = None, None
+        while True:
+            b = self.pick(model, tried)
+            if b is None:
+                break
+            tried.add(b.base)
+            if len(tried) > 1:
+                self.failovers += 1
+            release = self._releaser(b)
+            try:
+                resp = self.client.post(b.base + path, name=name, json=json, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                release()
+                self._mark_down(b, type(e).__name__)
+                last_exc = e
+                continue
+            except BaseException:
+                release()
+                raise
+            if resp.status_code in _FAILOVER_STATUS and len(tried) < len(self.backends):
+                release()
+                self._mark_down(b, f"HTTP {resp.status_code}")
+                resp.close()
+                last_resp = resp
+                continue
+            if kwargs.get("stream"):
+                # gestreamte Antwort: Server bleibt belegt, bis der Aufrufer sie schließt (with resp: …)
+                close = resp.close
+
+                def close_and_release(close=close, release=release):
+                    try:
+                        close()
+                    finally:
+                        release()
+                resp.close = close_and_release
+            else:
+                release()
+            return resp
+        if last_exc is not None:
+            raise last_exc
+        if last_resp is not None:
+            return last_resp
+        raise requests.ConnectionError("Kein LLM-Server verfügbar")
+
+    def models(self) -> list[str]:
+        """Vereinigung der Modelle aller erreichbaren Server (für die Einstellungen)."""
+        for b in self.backends:
+            self.probe(b)
+        with self._lock:
+            names = set()
+            for b in self.backends:
+                if b.healthy and b.models:
+                    names |= b.models
+        return sorted(names)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"failovers": self.failovers, "backends": [b.as_dict() for b in self.backends]}
+
+
+ROUTER = LLMRouter()
@@ -0,0 +1,257 @@
+import os
+import re
+import threading
+from collections import Counter
+from difflib import SequenceMatcher
+
+try:
+    from rapidfuzz import process, fuzz
+    USE_RAPIDFUZZ = True
+except Exception:
+    USE_RAPIDFUZZ = False
+
+try:
+    import numpy as np
+    USE_NUMPY = True
+except Exception:
+    USE_NUMPY = False
+
+# ── Fachwort-Index für die Korrektur von Transkripten ─────────────────────
+# Einmal gebaut (und bei Dateiänderung neu geladen) statt pro Aufruf die Liste
+# zu lesen und jedes Token gegen alle Begriffe zu vergleichen:
+#   1) Kandidaten über Länge + gemeinsame Trigramme vorfiltern
+#   2) alle offenen Tokens eines Texts in einem cdist-Aufruf bewerten
+#   3) Ergebnis pro Token merken (Memo, bis zur nächsten Änderung der Datei)
+# Mehrwort-Begriffe ("manuelle Therapie", "L Thyroxin") werden über Wortfenster gefunden.
+MED_TERMS_FILE = os.getenv("MED_TERMS_FILE", "medical_terms_de.txt")
+MIN_TOKEN_LEN = 4           # kürzere Einzelwörter werden nie ersetzt
+MEMO_MAX = 100_000          # Memo-Einträge, danach wird geleert
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]+|\s+", flags=re.UNICODE)
+_WINDOW_SEPS = {"-"}        # erlaubt zwischen Wörtern eines Mehrwort-Begriffs (neben Leerraum)
+
+
+def _match_case(src: str, cand: str) -> str:
+    # Groß-/Kleinschreibung vom Originalwort übernehmen
+    if src.isupper(): return cand.upper()
+    if src.istitle(): return cand[:1].upper() + cand[1:]
+    if src.islower(): return cand.lower()
+    return cand
+
+
+def _trigrams(s: str) -> set[str]:
+    s = f"  {s} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+class _SubIndex:
+    """Begriffe gleicher Art (Einzelwort bzw. Mehrwort) mit Längen- und Trigramm-Vorfilter."""
+
+    def __init__(self, terms: list[str]):
+        self.terms = terms
+        self.norm = [t.lower() for t in terms]
+        self.exact = {n: i for i, n in enumerate(self.norm)}
+        postings: dict[str, list[int]] = {}
+        for i, n in enumerate(self.norm):
+            for g in _trigrams(n):
+                postings.setdefault(g, []).append(i)
+        if USE_NUMPY:
+            self.lengths = np.array([len(n) for n in self.norm], dtype=np.int32)
+            self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+        else:
+            self.lengths = [len(n) for n in self.norm]
+            self.postings = postings
+
+    def candidates(self, q: str, cutoff: float) -> list[int]:
+        """
+        Term-IDs, die cutoff (normierte Indel-Ähnlichkeit wie fuzz.ratio) überhaupt erreichen können:
+        |la - lb| ≤ k und gemeinsame Trigramme ≥ max(la, lb) + 1 - 3k  mit k = ⌊(1 - cutoff)·(la + lb)⌋
+        (der aufgefüllte String hat L+1 Trigramme, jede Edit-Operation zerstört höchstens drei).
+        """
+        la = len(q)
+        grams = [g for g in _trigrams(q) if g in self.postings]
+        if not grams:
+            return []
+        if USE_NUMPY:
+            counts = np.bincount(np.concatenate([self.postings[g] for g in grams]), minlength=len(self.norm))
+            k = np.floor((1.0 - cutoff) * (la + self.lengths)).astype(np.int32)
+            need = np.maximum(la, self.lengths) + 1 - 3 * k
+            ok = (np.abs(self.lengths - la) <= k) & (counts >= np.maximum(need, 1))
+            return np.flatnonzero(ok).tolist()
+        counts = Counter(i for g in grams for i in self.postings[g])
+        out = []
+        for i, c in counts.items():
+            lb = self.lengths[i]
+            k = int((1.0 - cutoff) * (la + lb))
+            if abs(lb - la) <= k and c >= max(la, lb) + 1 - 3 * k:
+                out.append(i)
+        return out
+
+    def best(self, queries: list[str], cutoff: float) -> dict[str, str | None]:
+        """Bester Begriff je Query (oder None) – Kandidaten vorgefiltert, Bewertung gebündelt."""
+        result: dict[str, str | None] = {}
+        cands: dict[str, list[int]] = {}
+        for q in queries:
+            if q in self.exact:
+                result[q] = self.terms[self.exact[q]]
+                continue
+            c = self.candidates(q, cutoff)
+            if c:
+                cands[q] = c
+            else:
+                result[q] = None
+        if not cands:
+            return result
+
+        if USE_RAPIDFUZZ:
+            union = sorted({i for c in cands.values() for i in c})
+            col = {tid: j for j, tid in enumerate(union)}
+            qs = list(cands)
+            scores = process.cdist(qs, [self.norm[i] for i in union], scorer=fuzz.ratio,
+                                   score_cutoff=cutoff * 100.0, workers=-1)
+            for r, q in enumerate(qs):
+                best_i, best_s = None, 0.0
+                for tid in cands[q]:
+                    s = scores[r][col[tid]]
+                    if s > best_s:
+                        best_i, best_s = tid, s
+                result[q] = self.terms[best_i] if best_i is not None else None
+        else:
+            for q, c in cands.items():
+                best_i, best_s = None, cutoff
+                for tid in c:
+                    s = SequenceMatcher(None, q, self.norm[tid]).ratio()
+                    if s >= best_s:
+                        best_i, best_s = tid, s
+                result[q] = self.terms[best_i] if best_i is not None else None
+        return result
+
+
+class MedTermIndex:
+    """
+    Fachwort-Index über eine Begriffsliste (eine Zeile pro Begriff, '#' = Kommentar).
+    Mit path wird die Datei bei Änderung (mtime/Größe) automatisch neu eingelesen.
+    """
+
+    def __init__(self, path: str | None = MED_TERMS_FILE, terms: list[str] | None = None):
+        self.path = path
+        self._sig = None
+        self._lock = threading.Lock()
+        self._memo: dict[tuple[float, int, str], str | None] = {}
+        self.reloads = 0
+        self._build(terms or [])
+        if path:
+            self._maybe_reload()
+
+    @classmethod
+    def from_terms(cls, terms: list[str]) -> "MedTermIndex":
+        return cls(path=None, terms=terms)
+
+    def _build(self, terms: list[str]) -> None:
+        terms = list(dict.fromkeys(t.strip() for t in terms if t.strip()))
+        single = [t for t in terms if len(t.split()) == 1]
+        multi = [t for t in terms if len(t.split()) > 1]
+        self.n_terms = len(terms)
+        self.single = _SubIndex(single)
+        self.multi = _SubIndex(multi)
+        self.max_words = max((len(t.split()) for t in multi), default=1)
+        self._memo = {}
+
+    def _maybe_reload(self) -> None:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return
+        sig = (st.st_mtime_ns, st.st_size)
+        if sig == self._sig:
+            return
+        with self._lock:
+            if sig == self._sig:
+                return
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    terms = [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+            except Exception as e:
+                print(f"⚠️ Fachwortliste konnte nicht gelesen werden ({self.path}): {e}")
+                return
+            self._build(terms)
+            self._sig = sig
+            self.reloads += 1
+            print(f"📚 Fachwort-Index geladen: {len(self.single.terms)} Einzel-, {len(self.multi.terms)} Mehrwortbegriffe")
+
+    def _lookup(self, sub: _SubIndex, kind: int, queries: set[str], cutoff: float) -> None:
+        missing = [q for q in queries if (cutoff, kind, q) not in self._memo]
+        if not missing:
+            return
+        if len(self._memo) > MEMO_MAX:
+            self._memo = {}
+        for q, term in sub.best(missing, cutoff).items():
+            self._memo[(cutoff, kind, q)] = term
+
+    def correct(self, text: str, cutoff: float = 0.90) -> tuple[str, int]:
+        """Korrigiert text → (korrigierter Text, Anzahl Ersetzungen)."""
+        if self.path:
+            self._maybe_reload()
+        if not self.n_terms or not text:
+            return text, 0
+
+        tokens = _TOKEN_RE.findall(text)
+        words = [i for i, t in enumerate(tokens) if t.isalpha()]
+
+        # Wortfenster für Mehrwort-Begriffe: Wörter nur durch Leerraum/Bindestrich getrennt
+        windows: dict[int, list[tuple[int, str]]] = {}
+        if self.multi.terms:
+            for wi, start in enumerate(words):
+                parts, end = [tokens[start]], start
+                for nxt in words[wi + 1:wi + self.max_words]:
+                    between = tokens[end + 1:nxt]
+                    if not between or any(not (t.isspace() or t in _WINDOW_SEPS) for t in between):
+                        break
+                    parts.append(tokens[nxt])
+                    end = nxt
+                    windows.setdefault(start, []).append((end, " ".join(parts).lower()))
+
+        singles = {tokens[i].lower() for i in words if len(tokens[i]) >= MIN_TOKEN_LEN}
+        self._lookup(self.single, 1, singles, cutoff)
+        self._lookup(self.multi, 2, {q for ws in windows.values() for _, q in ws}, cutoff)
+
+        out, replaced, i = [], 0, 0
+        while i < len(tokens):
+            tok = tokens[i]
+            hit = None
+            for end, q in reversed(windows.get(i, [])):          # längstes Fenster zuerst
+                term = self._memo.get((cutoff, 2, q))
+                if term:
+                    hit = (end, term)
+                    break
+            if hit:
+                end, term = hit
+                orig = "".join(tokens[i:end + 1])
+                out.append(term)
+                replaced += orig != term
+                i = end + 1
+                continue
+            if tok.isalpha() and len(tok) >= MIN_TOKEN_LEN:
+                term = self._memo.get((cutoff, 1, tok.lower()))
+                if term:
+                    new = _match_case(tok, term)
+                    out.append(new)
+                    replaced += new != tok
+                    i += 1
+                    continue
+            out.append(tok)
+            i += 1
+        return "".join(out), replaced
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "terms": self.n_terms,
+            "multi_word": len(self.multi.terms),
+            "memo": len(self._memo),
+            "reloads": self.reloads,
+            "backend": "rapidfuzz" if USE_RAPIDFUZZ else "difflib",
+        }
+
+
+MED_TERMS = MedTermIndex()
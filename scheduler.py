@@ -0,0 +1,179 @@
+import contextvars
+import functools
+import heapq
+import itertools
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+
+# ── Prioritäts-Scheduler für ASR- und LLM-Arbeit ─────────────────────────
+# Live-Chunks, Finalisierung und Batch-Uploads konkurrieren um dieselben
+# whisper-Worker und denselben LLM-Server. Jede Arbeit holt sich vorher einen
+# Slot; freie Slots gehen immer an die höchste wartende Klasse. Batch bekommt
+# fest nur ASR/LLM_BATCH_SLOTS, leiht sich freie Slots aber, solange keine
+# Live-/Finalisierungs-Arbeit läuft – so wartet Live höchstens ein Batch-Segment ab.
+LIVE, FINALIZE, BATCH = 0, 1, 2
+PRIORITY_NAMES = {LIVE: "live", FINALIZE: "finalize", BATCH: "batch"}
+
+BATCH_NICE = int(os.getenv("BATCH_NICE", "10"))   # OS-Priorität für Batch-Subprozesse (POSIX)
+
+_current_priority = contextvars.ContextVar("compute_priority", default=BATCH)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+@contextmanager
+def priority(p: int):
+    """Setzt die Prioritätsklasse für alle Slot-Anfragen im aktuellen Kontext (Thread/Request)."""
+    token = _current_priority.set(p)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def with_priority(p: int):
+    """Decorator: Funktion (z.B. Flask-Route, Hintergrund-Task) läuft in Prioritätsklasse p."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with priority(p):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def lower_priority(pid: int) -> None:
+    """Batch-Prozess nach dem Start auf niedrigere OS-Priorität setzen (kein preexec_fn – nicht thread-sicher)."""
+    if current_priority() != BATCH or not hasattr(os, "setpriority") or BATCH_NICE <= 0:
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, pid, os.getpriority(os.PRIO_PROCESS, pid) + BATCH_NICE)
+    except OSError:
+        pass   # Prozess schon beendet o.ä.
+
+
+def run_subprocess(cmd: list[str], timeout: float | None = None, **kwargs) -> subprocess.CompletedProcess:
+    """Wie subprocess.run(cmd, capture_output=True, …), Batch-Prozesse laufen aber mit BATCH_NICE."""
+    with subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs) as proc:
+        lower_priority(proc.pid)
+        try:
+            out, err = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+    return subprocess.CompletedProcess(cmd, proc.returncode, out, err)
+
+
+class _Resource:
+    def __init__(self, name: str, limit: int, batch_limit: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.batch_limit = max(1, min(batch_limit, self.limit))
+        self.cond = threading.Condition()
+        self.waiting = []          # Heap aus (priority, seq)
+        self.running = {p: 0 for p in PRIORITY_NAMES}
+        self.served = {p: 0 for p in PRIORITY_NAMES}
+        self.wait_total = {p: 0.0 for p in PRIORITY_NAMES}
+        self.wait_max = {p: 0.0 for p in PRIORITY_NAMES}
+
+    def _can_run(self, entry) -> bool:
+        p = entry[0]
+        if sum(self.running.values()) >= self.limit:
+            return False
+        if p == BATCH and self.running[BATCH] >= self.batch_limit:
+            # Reservierung statt harter Grenze: über batch_limit hinaus nur, solange keine
+            # Live-/Finalisierungs-Arbeit läuft (wartende stehen im Heap ohnehin vor Batch)
+            if self.running[LIVE] or self.running[FINALIZE]:
+                return False
+        # Vorrang: immer nur der beste Wartende (Klasse, dann Ankunft)
+        return self.waiting[0] == entry
+
+    def acquire(self, p: int, seq: int) -> float:
+        entry = (p, seq)
+        t0 = time.time()
+        with self.cond:
+            heapq.heappush(self.waiting, entry)
+            while not self._can_run(entry):
+                self.cond.wait()
+            heapq.heappop(self.waiting)
+            self.running[p] += 1
+            waited = time.time() - t0
+            self.served[p] += 1
+            self.wait_total[p] += waited
+            self.wait_max[p] = max(self.wait_max[p], waited)
+            self.cond.notify_all()
+        return waited
+
+    def release(self, p: int) -> None:
+        with self.cond:
+            self.running[p] -= 1
+            self.cond.notify_all()
+
+    def stats(self) -> dict:
+        with self.cond:
+            queued = {p: 0 for p in PRIORITY_NAMES}
+            for p, _ in self.waiting:
+                queued[p] += 1
+            return {
+                "limit": self.limit,
+                "batch_limit": self.batch_limit,
+                "classes": {
+                    PRIORITY_NAMES[p]: {
+                        "queued": queued[p],
+                        "running": self.running[p],
+                        "served": self.served[p],
+                        "avg_wait_sec": round(self.wait_total[p] / self.served[p], 3) if self.served[p] else None,
+                        "max_wait_sec": round(self.wait_max[p], 3),
+                    }
+                    for p in PRIORITY_NAMES
+                },
+            }
+
+
+class ComputeScheduler:
+    """
+    Slots je Ressource ("asr", "llm") mit drei Prioritätsklassen (live > finalize > batch).
+    Verwendung:
+        with SCHEDULER.slot("asr"):       # Klasse aus dem Kontext (scheduler.priority)
+            ...
+    """
+
+    def __init__(self, limits: dict[str, tuple[int, int]]):
+        self._resources = {name: _Resource(name, lim, blim) for name, (lim, blim) in limits.items()}
+        self._seq = itertools.count()
+
+    @contextmanager
+    def slot(self, resource: str, prio: int | None = None):
+        res = self._resources[resource]
+        p = current_priority() if prio is None else prio
+        res.acquire(p, next(self._seq))
+        try:
+            yield
+        finally:
+            res.release(p)
+
+    def stats(self) -> dict:
+        return {name: r.stats() for name, r in self._resources.items()}
+
+
+def _limits_from_env() -> dict[str, tuple[int, int]]:
+    # Standard: so viele ASR-Slots wie whisper-server-Worker; ohne Pool so viele wie
+    # transcribe_long_audio whisper-cli-Prozesse startet (je ≥ 4 Threads)
+    pool_size = int(os.getenv("WHISPER_POOL_SIZE", "2"))
+    asr_default = pool_size if pool_size > 0 else max(1, (os.cpu_count() or 4) // 4)
+    asr = int(os.getenv("ASR_SLOTS", str(asr_default)) or asr_default)
+    backends = len(os.getenv("LLM_BACKENDS", "").replace(",", " ").split()) or 1
+    llm = int(os.getenv("LLM_SLOTS", str(2 * backends)))   # Standard: 2 gleichzeitige Aufrufe pro LLM-Server
+    return {
+        "asr": (asr, int(os.getenv("ASR_BATCH_SLOTS", str(max(1, asr - 1))))),
+        "llm": (llm, int(os.getenv("LLM_BATCH_SLOTS", str(max(1, llm - 1))))),
+    }
+
+
+SCHEDULER = ComputeScheduler(_limits_from_env())
@@ -0,0 +1,125 @@
+import re
+import threading
+from bisect import bisect_right
+from collections import deque
+
+# ── Live-Transkript einer Session ─────────────────────────────────────────
+# Ersetzt merge_with_overlap (SequenceMatcher über die letzten 400 Zeichen +
+# prev + add als neuer String pro Chunk): Teile werden nur angehängt, die
+# Überlappung zum neuen Chunk wird auf Token-Ebene per Rolling-Hash gesucht.
+# append() liefert genau das angehängte Delta, since(offset) alles ab einer
+# Position (für das Delta-Protokoll zur UI).
+LOOKBACK_TOKENS = 64        # so weit zurück kann ein Chunk überlappen (Audio-Overlap ≈ wenige Wörter)
+MAX_SKIP_NEW = 3            # am Chunk-Anfang abgeschnittene/verhörte Wörter überspringen
+MAX_SKIP_TAIL = 3           # dito am Ende des Vorgängers
+MIN_OVERLAP_CHARS = 16      # wie min_overlap bei merge_with_overlap
+
+_TOKEN_RE = re.compile(r"\S+")
+_EDGE_PUNCT_RE = re.compile(r"^\W+|\W+$", flags=re.UNICODE)
+_BASE = 1_000_003
+_MOD = (1 << 61) - 1
+
+
+def _norm(tok: str) -> str:
+    return _EDGE_PUNCT_RE.sub("", tok.lower())
+
+
+class SessionTranscript:
+    """
+    Append-only Transkript: parts (Liste der Deltas) + die letzten LOOKBACK_TOKENS Tokens
+    als (normalisiert, Hash, Länge) für die Overlap-Suche.
+    """
+
+    def __init__(self, text: str = ""):
+        self.parts: list[str] = []
+        self.starts: list[int] = []     # Startoffset je Teil (für since())
+        self.length = 0
+        self._tail: deque[tuple[str, int, int]] = deque(maxlen=LOOKBACK_TOKENS)
+        self._lock = threading.Lock()
+        self._joined = ""          # Cache für text(); wird beim Lesen inkrementell ergänzt
+        self._joined_parts = 0
+        if text:
+            self.append(text)
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def rev(self) -> int:
+        """Laufende Nummer des letzten Deltas (0 = leer)."""
+        return len(self.parts)
+
+    def since(self, offset: int) -> tuple[int, str]:
+        """
+        Text ab offset (Zeichen) → (offset, delta). Unbekannter offset (negativ oder hinter dem Ende,
+        z.B. nach Neustart der Session) → (0, kompletter Text).
+        """
+        if offset <= 0 or offset > self.length:
+            return 0, self.text()
+        with self._lock:
+            i = bisect_right(self.starts, offset) - 1
+            head = self.parts[i][offset - self.starts[i]:]
+            return offset, head + "".join(self.parts[i + 1:])
+
+    def text(self) -> str:
+        with self._lock:
+            if self._joined_parts < len(self.parts):
+                self._joined += "".join(self.parts[self._joined_parts:])
+                self._joined_parts = len(self.parts)
+            return self._joined
+
+    def _find_overlap(self, new_toks: list[tuple[str, int, int]]) -> int:
+        """
+        Größtes k, für das tail[-(e+k):-e] == new[s:s+k] (e ≤ MAX_SKIP_TAIL, s ≤ MAX_SKIP_NEW)
+        und die Überlappung ≥ MIN_OVERLAP_CHARS ist. Rückgabe: Index in new_toks hinter der
+        Überlappung (0 = keine Überlappung).
+        """
+        tail = list(self._tail)
+        best_end, best_k = 0, 0
+        for e in range(min(MAX_SKIP_TAIL, len(tail)) + 1):
+            t_end = len(tail) - e
+            for s in range(min(MAX_SKIP_NEW, len(new_toks)) + 1):
+                h_tail = h_new = 0
+                pw = 1
+                chars = 0
+                kmax = min(t_end, len(new_toks) - s)
+                for k in range(1, kmax + 1):
+                    # Suffix von tail wächst nach links, Präfix von new nach rechts
+                    h_tail = (h_tail + tail[t_end - k][1] * pw) % _MOD
+                    h_new = (h_new * _BASE + new_toks[s + k - 1][1]) % _MOD
+                    pw = (pw * _BASE) % _MOD
+                    chars += new_toks[s + k - 1][2] + 1
+                    if (h_tail == h_new and k > best_k and chars - 1 >= MIN_OVERLAP_CHARS
+                            and [t[0] for t in tail[t_end - k:t_end]] == [t[0] for t in new_toks[s:s + k]]):
+                        best_k, best_end = k, s + k
+        return best_end
+
+    def append(self, new: str) -> str:
+        """Hängt einen Chunk-Text an (ohne die Überlappung zum bisherigen Ende) → angehängtes Delta."""
+        new = (new or "").strip()
+        if not new:
+            return ""
+        matches = list(_TOKEN_RE.finditer(new))
+        toks = []
+        for m in matches:
+            n = _norm(m.group())
+            toks.append((n, hash(n) % _MOD, len(m.group())))
+
+        with self._lock:
+            if len(toks) <= len(self._tail) and [t[0] for t in list(self._tail)[-len(toks):]] == [t[0] for t in toks]:
+                return ""          # identische Wiederholung des Endes (auch wenn kürzer als MIN_OVERLAP_CHARS)
+            cut = self._find_overlap(toks) if self._tail else 0
+            if cut >= len(toks):
+                return ""          # Chunk steckt komplett im bisherigen Ende
+            rest = new[matches[cut].start():] if cut else new
+            sep = "" if (not self.length or cut or self.parts[-1][-1:].isspace()) else " "
+            if cut:
+                # Trennzeichen aus dem neuen Text übernehmen (Leerzeichen/Zeilenumbruch vor dem Rest)
+                gap = new[matches[cut - 1].end():matches[cut].start()]
+                sep = gap or " "
+            delta = (sep + rest).rstrip()
+            self.parts.append(delta)
+            self.starts.append(self.length)
+            self.length += len(delta)
+            self._tail.extend(toks[cut:])
+            return delta
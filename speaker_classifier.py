@@ -0,0 +1,219 @@
+import argparse
+import glob
+import json
+import math
+import os
+import re
+import threading
+import time
+import zlib
+
+# ── Lokaler Sprecher-Klassifikator (Arzt/Patient) ─────────────────────────
+# Naive Bayes über gehashte Wort-n-Gramme + Sprecher der Vorzeile, trainiert auf
+# den gespeicherten *_transkript.txt (LLM-Zuordnung, von Ärzten über
+# /save_anamnese korrigiert). Ordnet tausende Zeilen pro Sekunde zu; Zeilen unter
+# SPEAKER_CLF_MIN_CONF gehen an das LLM (siehe app._apply_diarization).
+#
+# Training:  python speaker_classifier.py train [--dir transkripte] [--out …] [--holdout 0.2]
+SPEAKER_CLF_PATH     = os.getenv("SPEAKER_CLF_PATH", os.path.join(os.getcwd(), "cache", "speaker_classifier.json"))
+SPEAKER_CLF_MIN_CONF = float(os.getenv("SPEAKER_CLF_MIN_CONF", "0.8"))   # darunter → LLM
+SPEAKER_CLF_BUCKETS  = 1 << 18      # Hash-Raum der Merkmale
+SPEAKERS = ("Arzt", "Patient")
+
+_LINE_RE = re.compile(r"^\s*(Arzt|Patient)\s*:\s*(.+?)\s*$", flags=re.IGNORECASE)
+_TOKEN_RE = re.compile(r"\w+|\?", flags=re.UNICODE)
+
+
+def features(text: str, prev: str | None) -> list[int]:
+    """Gehashte Merkmale einer Zeile: Wörter, Wort-Bigramme, Satzanfang, Länge, Sprecher der Vorzeile."""
+    toks = _TOKEN_RE.findall((text or "").lower())
+    feats = [f"w:{t}" for t in toks]
+    feats += [f"b:{a} {b}" for a, b in zip(toks, toks[1:])]
+    if toks:
+        feats.append(f"s:{toks[0]}")
+    feats.append(f"len:{min(len(toks) // 4, 6)}")
+    feats.append(f"prev:{prev or '-'}")
+    return [zlib.crc32(f.encode("utf-8")) % SPEAKER_CLF_BUCKETS for f in feats]
+
+
+def read_labeled_lines(path: str) -> list[tuple[str, str]]:
+    """(Sprecher, Text) aus einem *_transkript.txt; Zeilen ohne Arzt/Patient (Unbekannt, Fehler, …) entfallen."""
+    out = []
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = _LINE_RE.match(line)
+            if m:
+                out.append((m.group(1).capitalize(), m.group(2)))
+    return out
+
+
+class SpeakerClassifier:
+    """Multinomialer Naive Bayes (Laplace-geglättet) über gehashte Merkmale, dünn gespeichert."""
+
+    def __init__(self):
+        self.counts = {s: {} for s in SPEAKERS}    # Bucket → Häufigkeit
+        self.totals = {s: 0 for s in SPEAKERS}
+        self.docs = {s: 0 for s in SPEAKERS}
+        self._logp = None
+
+    def fit_lines(self, lines: list[tuple[str, str]]) -> None:
+        """Eine Datei (Zeilen in Gesprächsreihenfolge) – der Vorgänger-Sprecher kommt aus der Vorzeile."""
+        prev = None
+        for spk, text in lines:
+            c = self.counts[spk]
+            for h in features(text, prev):
+                c[h] = c.get(h, 0) + 1
+                self.totals[spk] += 1
+            self.docs[spk] += 1
+            prev = spk
+        self._logp = None
+
+    def _prepare(self):
+        if self._logp is None:
+            vocab = len(set(self.counts["Arzt"]) | set(self.counts["Patient"])) or 1
+            n = sum(self.docs.values()) or 1
+            self._logp = {s: math.log((self.docs[s] + 1) / (n + 2)) for s in SPEAKERS}   # Prior
+            self._denom = {s: self.totals[s] + vocab for s in SPEAKERS}                  # Laplace-Nenner
+        return self._logp
+
+    def predict(self, text: str, prev: str | None) -> tuple[str, float]:
+        """→ (Sprecher, Konfidenz 0.5…1.0)."""
+        prior = self._prepare()
+        feats = features(text, prev)
+        score = {}
+        for s in SPEAKERS:
+            c, denom = self.counts[s], self._denom[s]
+            score[s] = prior[s] + sum(math.log((c.get(h, 0) + 1) / denom) for h in feats)
+        a, p = score["Arzt"], score["Patient"]
+        conf = 1.0 / (1.0 + math.exp(-abs(a - p)))
+        return ("Arzt" if a >= p else "Patient"), conf
+
+    def label(self, blocks: list[dict]) -> list[tuple[str, float]]:
+        """Alle Zeilen in Reihenfolge; die eigene Vorhersage dient der nächsten Zeile als Vorgänger."""
+        out, prev = [], None
+        for b in blocks:
+            spk, conf = self.predict(b.get("text", ""), prev)
+            out.append((spk, conf))
+            prev = spk
+        return out
+
+    @property
+    def trained(self) -> bool:
+        return all(self.docs[s] > 0 for s in SPEAKERS)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"buckets": SPEAKER_CLF_BUCKETS, "docs": self.docs, "totals": self.totals,
+                       "counts": {s: {str(h): n for h, n in c.items()} for s, c in self.counts.items()}}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SpeakerClassifier":
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("buckets") != SPEAKER_CLF_BUCKETS:
+            raise ValueError("Modell mit anderem Hash-Raum trainiert – bitte neu trainieren")
+        clf = cls()
+        clf.docs = {s: int(data["docs"][s]) for s in SPEAKERS}
+        clf.totals = {s: int(data["totals"][s]) for s in SPEAKERS}
+        clf.counts = {s: {int(h): n for h, n in data["counts"][s].items()} for s in SPEAKERS}
+        return clf
+
+
+_loaded: tuple[float, SpeakerClassifier] | None = None
+_load_lock = threading.Lock()
+
+
+def get_classifier(path: str = SPEAKER_CLF_PATH) -> SpeakerClassifier | None:
+    """Trainiertes Modell (neu geladen, wenn die Datei neuer ist) oder None."""
+    global _loaded
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _load_lock:
+        if _loaded is None or _loaded[0] != mtime:
+            try:
+                _loaded = (mtime, SpeakerClassifier.load(path))
+            except Exception as e:
+                print(f"⚠️ Sprecher-Klassifikator nicht ladbar ({path}): {e}")
+                return None
+        return _loaded[1] if _loaded[1].trained else None
+
+
+def speaker_labels_classifier(blocks: list[dict], min_conf: float = SPEAKER_CLF_MIN_CONF
+                              ) -> list[str | None] | None:
+    """
+    Sprecher je Zeile; None = Konfidenz unter min_conf (→ LLM). Gibt None zurück,
+    wenn (noch) kein trainiertes Modell vorliegt.
+    """
+    clf = get_classifier()
+    if clf is None:
+        return None
+    t0 = time.perf_counter()
+    labels = [spk if conf >= min_conf else None for spk, conf in clf.label(blocks)]
+    ms = 1000 * (time.perf_counter() - t0)
+    unsure = sum(1 for s in labels if s is None)
+    print(f"🗣️ Sprecher-Klassifikator: {len(blocks)} Zeilen in {ms:.0f} ms, {unsure} unsicher → LLM")
+    return labels
+
+
+def train(transcript_dir: str, out_path: str = SPEAKER_CLF_PATH, holdout: float = 0.0) -> dict:
+    """Trainiert auf allen *_transkript.txt in transcript_dir; holdout = Anteil Dateien (die neuesten) zur Prüfung."""
+    files = sorted(glob.glob(os.path.join(transcript_dir, "*_transkript.txt")), key=os.path.getmtime)
+    data = [(p, read_labeled_lines(p)) for p in files]
+    data = [(p, lines) for p, lines in data if lines]
+    n_test = int(len(data) * holdout) if holdout > 0 else 0
+    train_set, test_set = data[:len(data) - n_test], data[len(data) - n_test:]
+
+    clf = SpeakerClassifier()
+    for _, lines in train_set:
+        clf.fit_lines(lines)
+    result = {"files": len(train_set), "lines": sum(clf.docs.values()), "docs": dict(clf.docs)}
+    if not clf.trained:
+        raise ValueError(f"Zu wenig Trainingsdaten in {transcript_dir} (braucht Arzt- und Patient-Zeilen)")
+
+    if test_set:
+        hits = total = confident = confident_hits = 0
+        for _, lines in test_set:
+            pred = clf.label([{"text": t} for _, t in lines])
+            for (truth, _), (spk, conf) in zip(lines, pred):
+                total += 1
+                hits += spk == truth
+                if conf >= SPEAKER_CLF_MIN_CONF:
+                    confident += 1
+                    confident_hits += spk == truth
+        result["holdout"] = {
+            "files": len(test_set), "lines": total,
+            "accuracy": round(hits / total, 3) if total else None,
+            "confident_share": round(confident / total, 3) if total else None,
+            "confident_accuracy": round(confident_hits / confident, 3) if confident else None,
+        }
+        # Endgültiges Modell mit allen Dateien
+        for _, lines in test_set:
+            clf.fit_lines(lines)
+        result.update(files=len(data), lines=sum(clf.docs.values()), docs=dict(clf.docs))
+
+    clf.save(out_path)
+    result["path"] = out_path
+    return result
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="Sprecher-Klassifikator (Arzt/Patient) trainieren")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    t = sub.add_parser("train", help="auf den gespeicherten *_transkript.txt trainieren")
+    t.add_argument("--dir", default=os.path.join(os.getcwd(), "transkripte"))
+    t.add_argument("--out", default=SPEAKER_CLF_PATH)
+    t.add_argument("--holdout", type=float, default=0.2, help="Anteil der neuesten Dateien zur Prüfung (0 = keine)")
+    args = ap.parse_args(argv)
+    t0 = time.perf_counter()
+    result = train(args.dir, args.out, args.holdout)
+    print(f"✅ Sprecher-Klassifikator trainiert in {time.perf_counter() - t0:.1f} s")
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
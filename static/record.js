@@ -55,6 +55,46 @@ function wavFromFloat32(float32, sampleRate) {
   }
   return new Blob([buffer], { type: 'audio/wav' });
 }
+// Float32 (mono, srcRate) → 16 kHz per gefenstertem Sinc-Tiefpass (Anti-Aliasing) + Dezimation
+function downsampleTo16k(float32, srcRate) {
+  const dstRate = 16000;
+  if (srcRate === dstRate) return float32;
+  const ratio = srcRate / dstRate;
+  const fc = 0.45 / ratio;                 // Grenzfrequenz knapp unter der neuen Nyquist-Frequenz
+  const half = Math.ceil(8 * ratio);       // Filter-Halbbreite in Quell-Samples
+  const weight = (d) => {
+    const w = 0.5 + 0.5 * Math.cos(Math.PI * d / (half + 1));   // Hann
+    return (d === 0 ? 2 * fc : Math.sin(2 * Math.PI * fc * d) / (Math.PI * d)) * w;
+  };
+  // Ganzzahliges Verhältnis (48 kHz → 3): Kern einmal vorberechnen
+  const kernel = Number.isInteger(ratio) ? Array.from({ length: 2 * half + 1 }, (_, k) => weight(k - half)) : null;
+
+  const outLen = Math.floor(float32.length / ratio);
+  const out = new Float32Array(outLen);
+  for (let i = 0; i < outLen; i++) {
+    const t = i * ratio;
+    const c = Math.floor(t);
+    let acc = 0, norm = 0;
+    for (let j = c - half; j <= c + half; j++) {
+      if (j < 0 || j >= float32.length) continue;
+      const h = kernel ? kernel[j - c + half] : weight(j - t);
+      acc += float32[j] * h; norm += h;
+    }
+    out[i] = norm ? acc / norm : 0;
+  }
+  return out;
+}
+
+// Float32 → PCM16 (Int16Array, little-endian auf allen gängigen Plattformen)
+function float32ToPcm16(float32) {
+  const out = new Int16Array(float32.length);
+  for (let i = 0; i < float32.length; i++) {
+    const x = Math.max(-1, Math.min(1, float32[i]));
+    out[i] = x < 0 ? x * 0x8000 : x * 0x7FFF;
+  }
+  return out;
+}
+
 function concatFloat32(a, b) {
   if (!a || a.length === 0) return new Float32Array(b);
   if (!b || b.length === 0) return new Float32Array(a);
@@ -231,6 +271,9 @@ const baseAudioConstraints = {
   const VAD_WINDOW_MS  = parseInt(localStorage.getItem('VAD_WINDOW_MS')  || '50', 10);
   const VAD_THRESH     = parseFloat(localStorage.getItem('VAD_THRESH')   || '0.006');
   const VAD_HANG_MS    = parseInt(localStorage.getItem('VAD_HANG_MS')    || '450', 10);
+  // 'wav' = 48-kHz-WAV/MediaRecorder-Chunks an /stream_chunk, 'pcm16' = 16-kHz-PCM16 roh an /stream_pcm (~3x weniger Upload),
+  // 'ws' = PCM16 über eine WebSocket-Verbindung pro Session (/ws/live), 'auto' = ws wenn der Server es kann, sonst wav
+  const LIVE_TRANSPORT = (localStorage.getItem('LIVE_TRANSPORT') || 'auto').toLowerCase();
 
   const live = {
     isRecording: false,
@@ -242,7 +285,7 @@ const baseAudioConstraints = {
     mime: "",
     ext: "",
     sessionId: null,
-    lastSeqShown: 0,
+    textLen: 0,        // Länge des angezeigten Live-Texts (Codepoints, wie auf dem Server)
     mode: "mic",
     simSource: null,
     pcmBuf: new Float32Array(0),
@@ -250,6 +293,14 @@ const baseAudioConstraints = {
     vadSilenceRun: 0,
     sampleRate: 48000,
     pcmActive: false,
+    comp: null,
+    pcmSeq: 0,
+    flushPcm: null,
+    pending: new Set(),
+    resyncing: false,
+    transport: 'wav',  // pro Session aus LIVE_TRANSPORT + Server-Fähigkeit (pickTransport)
+    ws: null,
+    wsFinal: null,     // {resolve} – wartet auf {"type": "final"}
   };
   window.__liveState = live;
 
@@ -284,6 +335,7 @@ const baseAudioConstraints = {
 
     const dest = ctx.createMediaStreamDestination();
     source.connect(hp); hp.connect(lp); lp.connect(comp); comp.connect(dest);
+    live.comp = comp;
 
     live.processedStream = dest.stream;
     return live.processedStream;
@@ -329,6 +381,8 @@ const baseAudioConstraints = {
 
     const sid = await fetch("/start_stream").then(r => r.json());
     live.sessionId = sid.session_id;
+    live.pcmSeq = 0; live.textLen = 0;
+    await pickTransport(sid);
 
     const deviceId = (micSel && micSel.value) ? { exact: micSel.value } : undefined;
     const constraints = { audio: { deviceId, ...baseAudioConstraints } };
@@ -340,36 +394,15 @@ const baseAudioConstraints = {
     live.ext  = extForMimeLocal(live.mime);
 
     await buildProcessedStream(live.rawStream);
-    startSegmentMic();
+    if (live.transport !== 'wav') {
+      await attachPcmSegmenter(live.ctx, live.comp);   // Worklet + VAD statt MediaRecorder
+    } else {
+      startSegmentMic();
+    }
   }
 
-  // ====== Simulation aus Datei: PCM/VAD/Overlap ======
-  async function startSimulationFromFile(file) {
-    if (!file || live.isRecording) return;
-    live.mode = "sim"; live.isRecording = true;
-
-    statusEl.textContent = "Simulation läuft…";
-    startBtn.disabled = true; stopBtn.disabled = false;
-    transcriptEl.textContent = "Live-Transkript (Simulation) startet…";
-
-    const sid = await fetch("/start_stream").then(r => r.json());
-    live.sessionId = sid.session_id;
-
-    const ctx = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: 48000, latencyHint: "interactive" });
-    live.ctx = ctx; live.sampleRate = ctx.sampleRate;
-
-    const arrayBuf = await file.arrayBuffer();
-    const audioBuf = await ctx.decodeAudioData(arrayBuf);
-
-    const source = ctx.createBufferSource();
-    source.buffer = audioBuf; live.simSource = source;
-
-    const hp = ctx.createBiquadFilter(); hp.type = "highpass"; hp.frequency.value = 70;
-    const lp = ctx.createBiquadFilter(); lp.type = "lowpass";  lp.frequency.value = 12000;
-
-    const comp = ctx.createDynamicsCompressor();
-    comp.threshold.value = -18; comp.knee.value = 25; comp.ratio.value = 2.5; comp.attack.value = 0.005; comp.release.value = 0.12;
-
+  // ====== PCM-Abgriff per Worklet + VAD-Segmentierung (Simulation und Mikro im PCM16-Modus) ======
+  async function attachPcmSegmenter(ctx, inputNode) {
     // Worklet zum PCM-Abgriff
     const code = `
       class PCMWorklet extends AudioWorkletProcessor {
@@ -384,11 +417,10 @@ const baseAudioConstraints = {
     const blobUrl = URL.createObjectURL(new Blob([code], {type: 'application/javascript'}));
     await ctx.audioWorklet.addModule(blobUrl);
     const node = new AudioWorkletNode(ctx, 'pcm-worklet', { numberOfInputs: 1, numberOfOutputs: 0 });
-
-    const dest = ctx.createGain(); dest.gain.value = 0; // stumm
-    source.connect(hp); hp.connect(lp); lp.connect(comp); comp.connect(node); comp.connect(dest); dest.connect(ctx.destination);
+    inputNode.connect(node);
 
     // PCM/VAD initialisieren
+    live.sampleRate = ctx.sampleRate;
     live.pcmBuf = new Float32Array(0);
     live.carry  = new Float32Array(0);
     live.vadSilenceRun = 0;
@@ -410,8 +442,13 @@ const baseAudioConstraints = {
       if (cutIndex < 0 || cutIndex > total) cutIndex = Math.min(total, MAX_SAMPLES);
       const chunkPart = live.pcmBuf.subarray(0, cutIndex);
       const payload   = concatFloat32(live.carry, chunkPart);
-      const wavBlob   = wavFromFloat32(payload, SR);
-      sendChunkToServer(wavBlob, 'wav');
+      if (live.transport === 'ws') {
+        sendPcmOverSocket(float32ToPcm16(downsampleTo16k(payload, SR)));
+      } else if (live.transport === 'pcm16') {
+        sendPcmToServer(float32ToPcm16(downsampleTo16k(payload, SR)));
+      } else {
+        sendChunkToServer(wavFromFloat32(payload, SR), 'wav');
+      }
 
       const carryLen = Math.min(OVERLAP_SAMP, payload.length);
       live.carry = payload.subarray(payload.length - carryLen);
@@ -454,20 +491,55 @@ const baseAudioConstraints = {
     }
 
     node.port.onmessage = (e) => {
-      if (!live.pcmActive || !live.isRecording || live.mode !== 'sim') return;
+      if (!live.pcmActive || !live.isRecording) return;
       const f32 = e.data; // Float32Array
       if (!(f32 && f32.length)) return;
       live.pcmBuf = concatFloat32(live.pcmBuf, f32);
       processVAD();
     };
 
+    // Rest beim Stopp noch senden
+    live.flushPcm = () => {
+      if (live.pcmBuf.length > 0) maybeFlush(live.pcmBuf.length, true);
+    };
+  }
+
+  // ====== Simulation aus Datei: PCM/VAD/Overlap ======
+  async function startSimulationFromFile(file) {
+    if (!file || live.isRecording) return;
+    live.mode = "sim"; live.isRecording = true;
+
+    statusEl.textContent = "Simulation läuft…";
+    startBtn.disabled = true; stopBtn.disabled = false;
+    transcriptEl.textContent = "Live-Transkript (Simulation) startet…";
+
+    const sid = await fetch("/start_stream").then(r => r.json());
+    live.sessionId = sid.session_id;
+    live.pcmSeq = 0; live.textLen = 0;
+    await pickTransport(sid);
+
+    const ctx = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: 48000, latencyHint: "interactive" });
+    live.ctx = ctx; live.sampleRate = ctx.sampleRate;
+
+    const arrayBuf = await file.arrayBuffer();
+    const audioBuf = await ctx.decodeAudioData(arrayBuf);
+
+    const source = ctx.createBufferSource();
+    source.buffer = audioBuf; live.simSource = source;
+
+    const hp = ctx.createBiquadFilter(); hp.type = "highpass"; hp.frequency.value = 70;
+    const lp = ctx.createBiquadFilter(); lp.type = "lowpass";  lp.frequency.value = 12000;
+
+    const comp = ctx.createDynamicsCompressor();
+    comp.threshold.value = -18; comp.knee.value = 25; comp.ratio.value = 2.5; comp.attack.value = 0.005; comp.release.value = 0.12;
+
+    const dest = ctx.createGain(); dest.gain.value = 0; // stumm
+    source.connect(hp); hp.connect(lp); lp.connect(comp); comp.connect(dest); dest.connect(ctx.destination);
+
+    await attachPcmSegmenter(ctx, comp);
+
     source.onended = () => {
-      if (live.isRecording && live.mode === "sim") {
-        if (live.pcmBuf.length > 0 || live.carry.length > 0) {
-          maybeFlush(live.pcmBuf.length, true);
-        }
-        stopLive();
-      }
+      if (live.isRecording && live.mode === "sim") stopLive();
     };
 
     source.start(0);
@@ -479,7 +551,9 @@ const baseAudioConstraints = {
 
     clearSegmentTimer();
     hardStopRecorder();
+    if (live.pcmActive && live.flushPcm) live.flushPcm();
     live.pcmActive = false;
+    live.flushPcm = null;
 
     statusEl.textContent = "Aufnahme gestoppt.";
     startBtn.disabled = false; stopBtn.disabled = true;
@@ -489,12 +563,12 @@ const baseAudioConstraints = {
     setTimeout(async () => {
       if (!live.sessionId) return;
       statusEl.textContent = "Analyse läuft…";
-      const fd = new FormData(); fd.append("session_id", live.sessionId);
-
+      // letzte Chunk-Uploads abwarten, sonst fehlen sie bei der Finalisierung
+      await Promise.allSettled(Array.from(live.pending));
       const lastLive = transcriptEl.textContent.trim();
 
       let data = {};
-      try { const res = await fetch("/process_stream", { method: "POST", body: fd }); data = await res.json(); }
+      try { data = await finalizeSession(); }
       catch (e) { console.warn("process_stream parse error:", e); data = {}; }
 
       const finalDialog = (data && typeof data.dialog === "string") ? data.dialog.trim() : "";
@@ -515,26 +589,168 @@ const baseAudioConstraints = {
     }, 500);
   }
 
+  // Delta-Protokoll: Server liefert {offset, delta, length} ab der gemeldeten Länge (known);
+  // der Live-Text ist append-only → nur das neue Ende als Text-Knoten anhängen.
+  function showChunkResponse(data) {
+    if (!data || typeof data.offset !== "number" || typeof data.delta !== "string") return;
+    if (data.offset > live.textLen) { resyncText(); return; }   // Delta verpasst → Rest nachladen
+    if (data.offset === 0 && data.length < live.textLen) live.textLen = 0;   // Server-Text kürzer (neu aufgebaut) → komplett neu zeichnen
+    if (data.length <= live.textLen) return;                    // veraltete/überholte Antwort
+
+    const skip = live.textLen - data.offset;                     // überschneidet sich mit schon Angezeigtem
+    const add = skip > 0 ? Array.from(data.delta).slice(skip).join("") : data.delta;
+    if (live.textLen === 0) transcriptEl.textContent = "";      // Platzhalter „startet…“ entfernen
+    transcriptEl.appendChild(document.createTextNode(add));
+    live.textLen = data.length;
+    transcriptEl.scrollTop = transcriptEl.scrollHeight;
+  }
+
+  async function resyncText() {
+    if (live.resyncing || !live.sessionId) return;
+    live.resyncing = true;
+    try {
+      const url = `/stream_text?session_id=${encodeURIComponent(live.sessionId)}&offset=${live.textLen}`;
+      const data = await fetch(url).then(r => r.json());
+      if (data.offset === 0 && live.textLen > 0) live.textLen = 0;   // Server kennt unsere Länge nicht → komplett
+      showChunkResponse(data);
+    } catch (e) {
+      console.warn("Resync fehlgeschlagen:", fmtErr(e));
+    } finally {
+      live.resyncing = false;
+    }
+  }
+
+  // ====== Transport-Wahl + WebSocket (/ws/live) ======
+  async function pickTransport(sid) {
+    live.transport = LIVE_TRANSPORT === 'pcm16' ? 'pcm16' : 'wav';
+    if ((LIVE_TRANSPORT === 'ws' || LIVE_TRANSPORT === 'auto') && sid.ws && window.WebSocket) {
+      live.ws = await openLiveSocket();
+      if (live.ws) live.transport = 'ws';
+      else if (LIVE_TRANSPORT === 'ws') live.transport = 'pcm16';   // Socket nicht erreichbar → gleiche Chunks per HTTP
+    }
+  }
+
+  function openLiveSocket() {
+    return new Promise(resolve => {
+      let ws;
+      const proto = location.protocol === "https:" ? "wss" : "ws";
+      try { ws = new WebSocket(`${proto}://${location.host}/ws/live?session_id=${encodeURIComponent(live.sessionId)}`); }
+      catch (e) { resolve(null); return; }
+      ws.binaryType = "arraybuffer";
+      ws.onopen = () => resolve(ws);
+      ws.onerror = () => resolve(null);     // nur vor onopen relevant → Fallback auf HTTP
+      ws.onmessage = onSocketMessage;
+      ws.onclose = () => {
+        if (live.ws === ws) live.ws = null;
+        if (live.wsFinal) { live.wsFinal.resolve(null); live.wsFinal = null; }   // Finalisierung per HTTP nachholen
+      };
+    });
+  }
+
+  const STAGE_LABELS = { transkript: "Transkript", zusammenfassung: "Zusammenfassung", speichern: "Speichern" };
+
+  function onSocketMessage(ev) {
+    let msg;
+    try { msg = JSON.parse(ev.data); } catch (_) { return; }
+    if (msg.type === "partial") {
+      showChunkResponse(msg);
+    } else if (msg.type === "stage") {
+      statusEl.textContent = `Analyse läuft… (${STAGE_LABELS[msg.stage] || msg.stage})`;
+    } else if (msg.type === "summary") {
+      appendSummary(msg.delta);
+    } else if (msg.type === "final") {
+      if (live.wsFinal) { live.wsFinal.resolve(msg); live.wsFinal = null; }
+    } else if (msg.type === "error") {
+      console.warn("WebSocket-Fehler:", msg.error);
+    }
+  }
+
+  // Binär-Frame: uint32 seq (little-endian) + PCM16
+  function sendPcmOverSocket(int16) {
+    const seq = ++live.pcmSeq;
+    if (!live.ws || live.ws.readyState !== WebSocket.OPEN) { sendPcmToServer(int16, seq); return; }
+    const frame = new Uint8Array(4 + int16.byteLength);
+    new DataView(frame.buffer).setUint32(0, seq, true);
+    frame.set(new Uint8Array(int16.buffer, int16.byteOffset, int16.byteLength), 4);
+    live.ws.send(frame.buffer);
+  }
+
+  // Entstehende Zusammenfassung direkt in den Anamnese-Block schreiben
+  let summaryStarted = false;
+  function appendSummary(delta) {
+    const block = document.getElementById("liveAnamnese");
+    if (!block || !delta) return;
+    if (!summaryStarted) { block.textContent = ""; summaryStarted = true; }
+    block.appendChild(document.createTextNode(delta));
+  }
+
+  // HTTP-Weg: Zusammenfassung per SSE mitlesen, während /process_stream noch läuft
+  function followSummarySse(sessionId) {
+    if (!window.EventSource) return null;
+    const src = new EventSource(`/summary_stream/${encodeURIComponent(sessionId)}`);
+    src.onopen = () => { summaryStarted = false; };            // (Re-)Connect liefert den Text ab Anfang
+    src.onmessage = (ev) => { try { appendSummary(JSON.parse(ev.data).delta); } catch (_) {} };
+    src.addEventListener("done", () => src.close());
+    return src;
+  }
+
+  // Finalisierung: über den Socket (Stufen, Zusammenfassung + Ergebnis kommen gepusht), sonst /process_stream
+  async function finalizeSession() {
+    summaryStarted = false;
+    const ws = live.ws;
+    if (ws && ws.readyState === WebSocket.OPEN) {
+      const msg = await new Promise(resolve => {
+        live.wsFinal = { resolve };
+        ws.send(JSON.stringify({ type: "finalize" }));
+      });
+      if (msg) { try { ws.close(); } catch (_) {} return msg; }
+    }
+    const sse = followSummarySse(live.sessionId);
+    try {
+      const fd = new FormData(); fd.append("session_id", live.sessionId);
+      const res = await fetch("/process_stream", { method: "POST", body: fd });
+      return await res.json();
+    } finally {
+      if (sse) sse.close();
+    }
+  }
+
+  function track(promise) {
+    live.pending.add(promise);
+    promise.finally(() => live.pending.delete(promise));
+    return promise;
+  }
+
   async function sendChunkToServer(blob, ext) {
     const fd = new FormData();
     fd.append("audio_chunk", blob, `chunk.${ext}`);
     fd.append("session_id", live.sessionId);
     fd.append("ext", ext);
+    fd.append("known", String(live.textLen));
 
     try {
-      const data = await fetch("/stream_chunk", { method: "POST", body: fd }).then(r => r.json());
-      if (typeof data.seq === "number" && data.seq < live.lastSeqShown) return;
-      if (typeof data.seq === "number") live.lastSeqShown = data.seq;
-
-      if (data.partial_transcript && data.partial_transcript !== transcriptEl.textContent) {
-        transcriptEl.textContent = data.partial_transcript;
-        transcriptEl.scrollTop = transcriptEl.scrollHeight;
-      }
+      const data = await track(fetch("/stream_chunk", { method: "POST", body: fd }).then(r => r.json()));
+      showChunkResponse(data);
     } catch (e) {
       console.warn("Chunk-Upload fehlgeschlagen:", fmtErr(e));
     }
   }
 
+  // Roh-PCM16 (16 kHz, Mono) ohne Container; seq vergibt der Client, damit Retries/Überholer eindeutig bleiben
+  async function sendPcmToServer(int16, seq = ++live.pcmSeq) {
+    const url = `/stream_pcm?session_id=${encodeURIComponent(live.sessionId)}&seq=${seq}&known=${live.textLen}`;
+    try {
+      const data = await track(fetch(url, {
+        method: "POST",
+        headers: { "Content-Type": "application/octet-stream" },
+        body: int16.buffer,
+      }).then(r => r.json()));
+      showChunkResponse(data);
+    } catch (e) {
+      console.warn("PCM-Upload fehlgeschlagen:", fmtErr(e));
+    }
+  }
+
   // Buttons binden
   startBtn.addEventListener("click", startLive);
   stopBtn.addEventListener("click", stopLive);
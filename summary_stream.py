@@ -0,0 +1,77 @@
+import threading
+import time
+
+# ── Zusammenfassung live mitlesen ─────────────────────────────────────────
+# Die Generierung (Upload-Job oder Live-Finalisierung) schreibt Token-Stücke in
+# einen SummaryStream; die Ergebnisseite liest sie per SSE (/summary_stream/<key>)
+# mit, während das LLM noch generiert. Schlüssel = Job-ID bzw. Session-ID.
+# Leser dürfen sich schon vor dem Start der Generierung anmelden – aber nur für
+# bekannte Schlüssel (laufender Job/laufende Session, siehe summary_stream_route).
+STREAM_TTL_SEC = 600        # abgeschlossene/verwaiste Streams danach verwerfen
+
+
+class SummaryStream:
+    """Wachsender Text + Fertig-Markierung; read() blockiert, bis es Neues gibt."""
+
+    def __init__(self):
+        self.text = ""
+        self.done = False
+        self.final = None          # endgültiger Text (kann von der Summe der Stücke abweichen, z.B. Fehlermeldung)
+        self.touched = time.monotonic()
+        self._cond = threading.Condition()
+
+    def append(self, piece: str) -> None:
+        if not piece:
+            return
+        with self._cond:
+            self.text += piece
+            self.touched = time.monotonic()
+            self._cond.notify_all()
+
+    def finish(self, final: str) -> None:
+        with self._cond:
+            self.done = True
+            self.final = final
+            self.touched = time.monotonic()
+            self._cond.notify_all()
+
+    def read(self, offset: int, timeout: float) -> tuple[int, str, bool]:
+        """Wartet bis zu timeout auf Text hinter offset → (neuer offset, Delta, fertig)."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.text) > offset or self.done, timeout=timeout)
+            self.touched = time.monotonic()   # wartende Leser halten den Stream am Leben
+            return len(self.text), self.text[offset:], self.done
+
+
+class StreamRegistry:
+    def __init__(self, ttl: float = STREAM_TTL_SEC):
+        self.ttl = ttl
+        self._streams: dict[str, SummaryStream] = {}
+        self._lock = threading.Lock()
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for k in [k for k, s in self._streams.items() if now - s.touched > self.ttl]:
+            del self._streams[k]
+
+    def find(self, key: str) -> SummaryStream | None:
+        """Vorhandener Stream zu key oder None (legt nichts an)."""
+        with self._lock:
+            self._purge()
+            return self._streams.get(key)
+
+    def get(self, key: str) -> SummaryStream:
+        """Stream zu key (wird bei Bedarf angelegt – Produzent und Leser bekommen dasselbe Objekt)."""
+        with self._lock:
+            self._purge()
+            st = self._streams.get(key)
+            if st is None:
+                st = self._streams[key] = SummaryStream()
+            return st
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            self._streams.pop(key, None)
+
+
+SUMMARY_STREAMS = StreamRegistry()
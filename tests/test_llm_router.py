@@ -0,0 +1,119 @@
+import json
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_client import LLMClient
+from llm_router import Backend, LLMRouter
+
+
+class _StubLLM(ThreadingHTTPServer):
+    """Lokaler LLM-Stub: /api/tags meldet `models`, /api/generate antwortet mit `status` und zählt Aufrufe."""
+
+    def __init__(self, models=("mistral",), status=200):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.models = list(models)
+        self.status = status
+        self.calls = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._send(200, {"models": [{"name": m} for m in self.server.models]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.calls += 1
+        self._send(self.server.status, {"response": self.server.url})
+
+
+def _dead_url() -> str:
+    """Port, auf dem niemand lauscht → Verbindungsfehler."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def _router(*urls) -> LLMRouter:
+    return LLMRouter(backends=[Backend(u) for u in urls], client=LLMClient(retries=0, backoff=0))
+
+
+@pytest.fixture
+def stubs():
+    servers = []
+
+    def make(**kwargs):
+        srv = _StubLLM(**kwargs)
+        servers.append(srv)
+        return srv
+    yield make
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def _generate(router: LLMRouter, model: str = "mistral"):
+    return router.post("http://ignored:1/api/generate", json={"model": model, "prompt": "x"}, timeout=5)
+
+
+def test_failover_on_502(stubs):
+    bad, good = stubs(status=502), stubs()
+    router = _router(bad.url, good.url)
+    for _ in range(4):
+        resp = _generate(router)
+        assert resp.status_code == 200
+        assert resp.json()["response"] == good.url
+    assert bad.calls >= 1
+    assert router.failovers >= 1
+    assert not router.backends[0].healthy
+    assert all(b.outstanding == 0 for b in router.backends)
+
+
+def test_failover_on_connection_error(stubs):
+    good = stubs()
+    router = _router(_dead_url(), good.url)
+    for _ in range(4):
+        assert _generate(router).json()["response"] == good.url
+    assert good.calls == 4
+    assert all(b.outstanding == 0 for b in router.backends)
+
+
+def test_model_pinning(stubs):
+    a, b = stubs(models=("mistral",)), stubs(models=("llama3:latest",))
+    router = _router(a.url, b.url)
+    for _ in range(6):
+        assert _generate(router, "llama3").json()["response"] == b.url
+        assert _generate(router, "mistral:latest").json()["response"] == a.url
+    assert (a.calls, b.calls) == (6, 6)
+
+
+def test_stream_counts_until_closed(stubs):
+    srv = stubs()
+    router = _router(srv.url)
+    resp = router.post(srv.url + "/api/generate", json={"model": "mistral"}, stream=True, timeout=5)
+    assert router.backends[0].outstanding == 1
+    with resp:
+        resp.json()
+    assert router.backends[0].outstanding == 0
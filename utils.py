@@ -1,18 +1,123 @@
-import subprocess
+import io
 import os
 import requests
 import re
-import shutil
 import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from difflib import SequenceMatcher
+
+from asr_cache import TRANSCRIPT_CACHE, CACHE_ENABLED, pcm_content_hash
+from scheduler import SCHEDULER, BATCH, current_priority, priority, run_subprocess
+from whisper_pool import get_pool
+from llm_client import LLM, LLM_MEMO, LMSTUDIO_URL, memo_key
+from llm_router import ROUTER
 
 # ── Neu: konfigurierbar per ENV (mit sinnvollen Defaults) ────────────────
 MODEL_PATH = os.getenv("WHISPER_MODEL", os.path.abspath("/Users/Mesut/whisper_project/web_app/whisper.cpp/models/ggml-small-q8_0.bin"))
 CLI_PATH   = os.getenv("WHISPER_CLI",   os.path.abspath("/Users/Mesut/whisper_project/web_app/whisper.cpp/build/bin/whisper-cli"))
+SERVER_PATH = os.getenv("WHISPER_SERVER", os.path.join(os.path.dirname(CLI_PATH), "whisper-server"))
 DOMAIN_PROMPT = os.getenv("WHISPER_PROMPT", "").strip()
 
+# Lange Uploads: an Pausen in Segmente ≤ LONG_AUDIO_SEG_SEC schneiden und parallel transkribieren
+LONG_AUDIO_MIN_SEC = float(os.getenv("LONG_AUDIO_MIN_SEC", "180"))
+LONG_AUDIO_SEG_SEC = float(os.getenv("LONG_AUDIO_SEG_SEC", "60"))
+LONG_AUDIO_OVERLAP_SEC = 1.0   # Überlappung bei harten Schnitten (keine Pause gefunden)
+
+# Sprecherzuordnung per LLM: Zeilen fensterweise in einem Aufruf statt einer Generierung pro Zeile
+DIAR_BATCH_LINES = int(os.getenv("DIAR_BATCH_LINES", "40"))      # nummerierte Zeilen pro Aufruf
+DIAR_BATCH_OVERLAP = int(os.getenv("DIAR_BATCH_OVERLAP", "4"))   # schon zugeordnete Zeilen davor als Kontext
+
+# Zusammenfassung als Token-Stream (NDJSON von Ollama bzw. SSE von OpenAI-kompatiblen Servern)
+SUMMARY_STREAM = os.getenv("SUMMARY_STREAM", "1") != "0"
+
+# Zusammenfassung als Chat: die festen Anweisungen aus prompt_summary.txt gehen als System-Nachricht
+# (byte-identisch über alle Aufrufe → der Server kann den ausgewerteten Prompt-Anfang wiederverwenden),
+# Patientengeschlecht + Transkript als User-Nachricht. Das Modell bleibt per keep_alive geladen.
+LLM_CHAT = os.getenv("LLM_CHAT", "1") != "0"
+LLM_KEEP_ALIVE = os.getenv("LLM_KEEP_ALIVE", "30m")                     # Ollama-Dauer ("-1" = immer), "" = Server-Default
+LLM_WARMUP_INTERVAL = float(os.getenv("LLM_WARMUP_INTERVAL", "120"))   # Sekunden zwischen zwei Vorwärm-Aufrufen je Modell
+GESCHLECHT_REF = "<Patientengeschlecht>"   # ersetzt {geschlecht} im System-Teil (Wert steht in der User-Nachricht)
+
+def _decode_defaults() -> list[str]:
+    """Beam-Search + optional Domain-Prompt – gemeinsam für whisper-cli und whisper-server."""
+    defaults = []
+    beam_size = os.getenv("WHISPER_BEAM", "5")   # falls Build -bs unterstützt
+    if beam_size:
+        defaults += ["-bs", str(beam_size)]
+    if DOMAIN_PROMPT:
+        defaults += ["--prompt", DOMAIN_PROMPT]
+    return defaults
+
+def transcript_cache_key(audio_path: str, model_path: str, lang: str, extra_args: list[str] | None = None, mode: str = "single") -> str:
+    """Cache-Schlüssel: PCM-Hash + Modell-Identität + Sprache + WHISPER_BEAM + WHISPER_PROMPT (+ extra_args)."""
+    return TRANSCRIPT_CACHE.make_key(audio_path, model_path, lang, os.getenv("WHISPER_BEAM", "5"), DOMAIN_PROMPT,
+                                     extra_args=extra_args, mode=mode)
+
+def get_whisper_pool(model_path: str = MODEL_PATH, lang: str = "de"):
+    """Resident-Worker-Pool für model_path (oder None → whisper-cli-Fallback)."""
+    return get_pool(os.path.abspath(SERVER_PATH), model_path, lang=lang, args=["-l", lang] + _decode_defaults())
+
+def _segments_from_server_json(obj: dict) -> list[dict]:
+    """whisper-server (response_format=verbose_json) → Blöcke mit Zeit, Token-Wahrscheinlichkeiten, no_speech_prob."""
+    blocks = []
+    for seg in obj.get("segments") or []:
+        t = (seg.get("text") or "").strip()
+        if not t:
+            continue
+        tokens = [
+            {"text": w.get("word", ""), "p": w.get("probability"), "start": w.get("start"), "end": w.get("end")}
+            for w in seg.get("words") or []
+        ]
+        blocks.append({
+            "start": seg.get("start"),
+            "end": seg.get("end"),
+            "text": t,
+            "tokens": tokens,
+            "avg_logprob": seg.get("avg_logprob"),
+            "no_speech_prob": seg.get("no_speech_prob"),
+        })
+    if not blocks and (obj.get("text") or "").strip():
+        blocks = [{"start": None, "end": None, "text": obj["text"].strip(), "tokens": [],
+                   "avg_logprob": None, "no_speech_prob": None}]
+    return blocks
+
+_STDOUT_SEG_RE = re.compile(r"^\[(\d+):(\d{2}):(\d{2}\.\d{3})\s*-->\s*(\d+):(\d{2}):(\d{2}\.\d{3})\]\s*(.*)$")
+
+def _segments_from_cli_stdout(stdout_text: str) -> list[dict]:
+    """
+    whisper-cli schreibt Segmente nach stdout: "[00:00:00.000 --> 00:00:02.000]  Text".
+    Daraus Blöcke mit echten Zeitstempeln – ganz ohne Ausgabedateien.
+    """
+    blocks = []
+    for line in (stdout_text or "").splitlines():
+        m = _STDOUT_SEG_RE.match(line.strip())
+        if not m:
+            continue
+        h1, m1, s1, h2, m2, s2, t = m.groups()
+        t = t.strip()
+        if not t:
+            continue
+        blocks.append({
+            "start": int(h1) * 3600 + int(m1) * 60 + float(s1),
+            "end": int(h2) * 3600 + int(m2) * 60 + float(s2),
+            "text": t,
+            "tokens": [],
+            "avg_logprob": None,
+            "no_speech_prob": None,
+        })
+    return blocks
+
+def blocks_duration(blocks: list[dict]) -> float | None:
+    """Ende des letzten Segments (Sekunden) – ersetzt das Nachparsen der VTT."""
+    ends = [b["end"] for b in blocks or [] if b.get("end") is not None]
+    return round(max(ends), 1) if ends else None
+
 def _read_txt_fallback(stdout_text: str) -> str:
     """
-    Fallback, falls keine .txt-Datei vorhanden ist:
+    Fallback, falls stdout keine Segmente mit Zeitstempel enthält (z.B. Build mit -nt-Default):
     versuche, Text aus stdout zu gewinnen.
     """
     txt = (stdout_text or "").strip()
@@ -20,6 +125,65 @@ def _read_txt_fallback(stdout_text: str) -> str:
     txt = re.sub(r"(?i)^(processing|loading|using model).*?$", "", txt, flags=re.MULTILINE)
     return txt.strip()
 
+def _write_outputs(blocks: list[dict], audio_path: str, output_dir: str | None, output_basename: str | None) -> str:
+    if output_dir is None:
+        output_dir = os.path.dirname(audio_path)
+    os.makedirs(output_dir, exist_ok=True)
+    if output_basename is None:
+        # Standard: gleicher Name wie Audio ohne Endung
+        output_basename = os.path.splitext(os.path.basename(audio_path))[0]
+    return write_vtt(blocks, os.path.join(output_dir, output_basename) + ".vtt")
+
+def _decode_pool(wav: bytes, model_path: str, lang: str) -> list[dict] | None:
+    """WAV-Bytes an den Resident-Pool → Blöcke; None, wenn kein Pool oder der Pool scheitert."""
+    pool = get_whisper_pool(model_path, lang)
+    if pool is None:
+        return None
+    try:
+        return _segments_from_server_json(pool.transcribe(wav, lang=lang, response_format="verbose_json"))
+    except Exception as e:
+        print(f"⚠️ whisper-Pool fehlgeschlagen, Fallback whisper-cli: {e}")
+        return None
+
+def _decode(audio_path: str, model_path: str, lang: str, extra_args: list[str] | None) -> list[dict]:
+    """Ein whisper-Lauf (Pool oder whisper-cli) → Blöcke. Aufrufer hält den ASR-Slot."""
+    blocks = None
+
+    # Resident-Pool bevorzugen (Modell bleibt geladen); whisper-server liest nur WAV direkt
+    if not extra_args and audio_path.lower().endswith(".wav"):
+        with open(audio_path, "rb") as f:
+            blocks = _decode_pool(f.read(), model_path, lang)
+
+    if blocks is None:
+        cmd = [
+            os.path.abspath(CLI_PATH),
+            "-m", model_path,
+            "-f", audio_path,
+            "-l", lang,
+        ]
+        # Zusätzliche Args übernehmen (optional)
+        if extra_args:
+            cmd.extend(extra_args)
+        # Defaults hinten anhängen (Beam-Search + optional Domain-Prompt)
+        cmd.extend(_decode_defaults())
+
+        # Ausführen – Segmente kommen über stdout, keine -otxt/-ovtt-Dateien
+        result = run_subprocess(cmd, text=True)
+
+        if result.returncode != 0:
+            # Versuche, nützlichen Fehler zu zeigen
+            raise RuntimeError(f"whisper-cli Fehler:\ncmd: {' '.join(cmd)}\n{result.stderr}")
+
+        blocks = _segments_from_cli_stdout(result.stdout)
+        if not blocks:
+            # Fallback: aus stdout bestmöglich extrahieren (ohne Zeitstempel)
+            blocks = [
+                {"start": None, "end": None, "text": ln.strip(), "tokens": [], "avg_logprob": None, "no_speech_prob": None}
+                for ln in _read_txt_fallback(result.stdout).splitlines() if ln.strip()
+            ]
+
+    return blocks
+
 def transcribe_with_whispercpp(
     audio_path: str,
     model_path: str = MODEL_PATH,
@@ -28,26 +192,31 @@ def transcribe_with_whispercpp(
     output_dir: str | None = None,
     output_basename: str | None = None,
     extra_args: list[str] | None = None,
+    use_cache: bool = True,
 ):
     """
-    Transkribiert mit whisper-cli.
+    Transkribiert mit whisper.cpp – bevorzugt über den residenten whisper-server-Pool
+    (siehe whisper_pool.py, verbose_json), sonst per whisper-cli-Aufruf (Segmente aus stdout).
+    Es werden keine Zwischendateien gelesen; die VTT entsteht nur bei write_outputs=True aus den Segmenten.
 
     Args:
         audio_path: Eingabe-Audiodatei (wav/mp3/ogg/...)
         model_path: Pfad zum Model (GGUF empfohlen)
         lang: Sprachcode (z.B. 'de')
-        write_outputs: Wenn True, schreibt .txt/.vtt. Wenn False, schreibt in temp-Dateien
-                       (nur .txt) und löscht sie danach – ideal für Live-Chunks.
-        output_dir: Zielordner für Outputs (wenn write_outputs=True). Default: Ordner von audio_path
-        output_basename: Basisname ohne Endung für Outputs (wenn write_outputs=True).
+        write_outputs: Wenn True, wird <output_basename>.vtt geschrieben. Wenn False, keinerlei
+                       Dateien – ideal für Live-Chunks.
+        output_dir: Zielordner für die VTT (wenn write_outputs=True). Default: Ordner von audio_path
+        output_basename: Basisname ohne Endung für die VTT (wenn write_outputs=True).
                          Default: Name von audio_path ohne Endung.
         extra_args: zusätzliche CLI-Argumente (Liste), falls benötigt.
+        use_cache: Ergebnis im Transkriptions-Cache (asr_cache.py) nachschlagen/ablegen.
 
     Returns:
         (text, vtt_path, blocks)
         text: kompletter Text
-        vtt_path: Pfad zur erzeugten VTT (falls vorhanden, sonst None)
-        blocks: Liste von {"start": None, "end": None, "text": ...} (aus .txt-Zeilen)
+        vtt_path: Pfad zur erzeugten VTT (nur bei write_outputs=True, sonst None)
+        blocks: Liste von {"start", "end", "text", "tokens", "avg_logprob", "no_speech_prob"};
+                start/end in Sekunden, tokens = [{"text", "p", "start", "end"}] (nur Pool)
     """
     cli_path = os.path.abspath(CLI_PATH)
     model_path = os.path.abspath(model_path)
@@ -60,157 +229,447 @@ def transcribe_with_whispercpp(
     if not os.path.exists(audio_path):
         raise FileNotFoundError(f"Audio-Datei nicht gefunden: {audio_path}")
 
+    cache_key = None
+    if use_cache and CACHE_ENABLED:
+        cache_key = transcript_cache_key(audio_path, model_path, lang, extra_args)
+        hit = TRANSCRIPT_CACHE.get(cache_key)
+        if hit is not None:
+            blocks = hit["blocks"]
+            vtt_path = _write_outputs(blocks, audio_path, output_dir, output_basename) if write_outputs else None
+            return hit["text"], vtt_path, blocks
+
+    # Decode über den Scheduler (Prioritätsklasse aus dem Aufruf-Kontext: live/finalize/batch)
+    with SCHEDULER.slot("asr"):
+        blocks = _decode(audio_path, model_path, lang, extra_args)
+
+    text = "\n".join(b["text"] for b in blocks)
+    if cache_key:
+        TRANSCRIPT_CACHE.put(cache_key, text, blocks, model_path)
+    vtt_path = _write_outputs(blocks, audio_path, output_dir, output_basename) if write_outputs else None
+    return text, vtt_path, blocks
+
+def transcribe_pcm(
+    pcm: bytes,
+    model_path: str = MODEL_PATH,
+    lang: str = "de",
+    sample_rate: int = 16000,
+    use_cache: bool = True,
+):
+    """
+    Wie transcribe_with_whispercpp, aber direkt aus einem PCM16-Mono-Puffer (z.B. aus audio_ingest):
+    Der Pool bekommt eine WAV im Speicher; nur im whisper-cli-Fallback entsteht eine Temp-Datei.
+    Cache-Schlüssel sind identisch zu denen einer WAV-Datei mit denselben Frames.
+
+    Returns:
+        (text, blocks) – blocks wie bei transcribe_with_whispercpp
+    """
+    model_path = os.path.abspath(model_path)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model-Datei nicht gefunden: {model_path}")
+
+    cache_key = None
+    if use_cache and CACHE_ENABLED:
+        cache_key = TRANSCRIPT_CACHE.make_key(None, model_path, lang, os.getenv("WHISPER_BEAM", "5"), DOMAIN_PROMPT,
+                                              audio_hash=pcm_content_hash(pcm, sample_rate))
+        hit = TRANSCRIPT_CACHE.get(cache_key)
+        if hit is not None:
+            return hit["text"], hit["blocks"]
+
+    with SCHEDULER.slot("asr"):
+        blocks = _decode_pool(wav_bytes(pcm, sample_rate), model_path, lang)
+        if blocks is None:
+            cli_path = os.path.abspath(CLI_PATH)
+            if not os.path.exists(cli_path):
+                raise FileNotFoundError(f"whisper-cli nicht gefunden: {cli_path}")
+            fd, tmp = tempfile.mkstemp(suffix=".wav")
+            os.close(fd)
+            try:
+                write_wav_pcm(tmp, pcm, sample_rate)
+                blocks = _decode(tmp, model_path, lang, None)
+            finally:
+                try: os.remove(tmp)
+                except Exception: pass
+
+    text = "\n".join(b["text"] for b in blocks)
+    if cache_key:
+        TRANSCRIPT_CACHE.put(cache_key, text, blocks, model_path)
+    return text, blocks
+
+# ── PCM-/WAV-Helfer (16 kHz, Mono, PCM16) ───────────────────────────────
+def read_wav_pcm(path: str) -> tuple[bytes, int]:
+    """Liest die PCM-Frames einer WAV-Datei → (bytes, sample_rate)."""
+    with wave.open(path, "rb") as w:
+        return w.readframes(w.getnframes()), w.getframerate()
+
+def write_wav_pcm(path: str, pcm: bytes, sample_rate: int = 16000) -> str:
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return path
+
+def wav_bytes(pcm: bytes, sample_rate: int = 16000) -> bytes:
+    """PCM16-Mono → komplette WAV-Datei im Speicher."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(pcm)
+    return buf.getvalue()
+
+def pcm_duration(pcm: bytes, sample_rate: int = 16000) -> float:
+    return len(pcm) / (2.0 * sample_rate)
+
+def wav_duration(path: str) -> float:
+    try:
+        with wave.open(path, "rb") as w:
+            return w.getnframes() / float(w.getframerate() or 16000)
+    except Exception:
+        return 0.0
+
+def _fmt_vtt_time(sec: float) -> str:
+    ms = int(round(max(0.0, sec) * 1000))
+    h, ms = divmod(ms, 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+def write_vtt(blocks: list[dict], path: str) -> str:
+    """Schreibt eine WebVTT aus Blöcken mit start/end (Sekunden); Blöcke ohne Zeit werden übersprungen."""
+    out = ["WEBVTT", ""]
+    for b in blocks:
+        if b.get("start") is None or b.get("end") is None:
+            continue
+        out.append(f"{_fmt_vtt_time(b['start'])} --> {_fmt_vtt_time(b['end'])}")
+        out.append(b.get("text", ""))
+        out.append("")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(out))
+    return path
+
+def trim_leading_overlap(prev: str, new: str, min_overlap: int = 8) -> str:
+    """Schneidet den Anfang von new ab, der das Ende von prev wiederholt (Dubletten an Schnittgrenzen)."""
+    if not prev or not new:
+        return new
+    tail = prev[-200:]
+    m = SequenceMatcher(a=tail, b=new, autojunk=False).find_longest_match(0, len(tail), 0, len(new))
+    if m.size >= min_overlap and m.a + m.size >= len(tail) - 2 and m.b <= 20:
+        return new[m.b + m.size:].strip()
+    return new
+
+# ── Lange Dateien: Split an Pausen + parallele Transkription ────────────
+def detect_silences(wav_path: str, noise_db: int = -35, min_silence: float = 0.4, timeout: int = 120) -> list[tuple[float, float]]:
+    """Pausen per ffmpeg silencedetect → [(start, end), ...] in Sekunden."""
     cmd = [
-        cli_path,
-        "-m", model_path,
-        "-f", audio_path,
-        "-l", lang,
+        "ffmpeg", "-hide_banner", "-nostats", "-i", wav_path,
+        "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}",
+        "-f", "null", "-",
     ]
+    proc = run_subprocess(cmd, text=True, timeout=timeout)
+    silences, start = [], None
+    for line in proc.stderr.splitlines():
+        m = re.search(r"silence_start:\s*(-?[\d.]+)", line)
+        if m:
+            start = max(0.0, float(m.group(1)))
+            continue
+        m = re.search(r"silence_end:\s*([\d.]+)", line)
+        if m and start is not None:
+            silences.append((start, float(m.group(1))))
+            start = None
+    return silences
+
+def plan_segments(duration: float, silences: list[tuple[float, float]], max_len: float = LONG_AUDIO_SEG_SEC) -> list[tuple[float, float, float]]:
+    """
+    Teilt [0, duration] in Segmente ≤ max_len. Geschnitten wird in der Mitte der spätesten Pause
+    in der zweiten Hälfte des Fensters; gibt es keine, hart bei max_len mit LONG_AUDIO_OVERLAP_SEC Überlappung.
+    Returns: [(start, end, cut), ...] – cut = Zeitpunkt, ab dem dieses Segment "gilt" (≥ start bei Überlappung)
+    """
+    segments, pos, cut = [], 0.0, 0.0
+    while duration - pos > max_len:
+        lo, hi = pos + max_len / 2.0, pos + max_len
+        mids = [(a + b) / 2.0 for a, b in silences if lo < (a + b) / 2.0 <= hi]
+        if mids:
+            end = max(mids)
+            segments.append((pos, end, cut))
+            pos = cut = end
+        else:
+            end = hi
+            segments.append((pos, end, cut))
+            pos, cut = end - LONG_AUDIO_OVERLAP_SEC, end
+    segments.append((pos, duration, cut))
+    return segments
+
+def transcribe_long_audio(
+    audio_path: str,
+    model_path: str = MODEL_PATH,
+    lang: str = "de",
+    write_outputs: bool = True,
+    output_dir: str | None = None,
+    output_basename: str | None = None,
+    max_workers: int | None = None,
+):
+    """
+    Wie transcribe_with_whispercpp, aber für lange (16 kHz-Mono-)WAVs:
+    an Pausen in Segmente geschnitten, parallel transkribiert (Pool-Worker bzw. je ein whisper-cli-Prozess)
+    und mit korrigierten Zeitstempeln + Dubletten-Bereinigung an den Schnittstellen wieder zusammengesetzt.
+    Kurze Dateien (< LONG_AUDIO_MIN_SEC) gehen unverändert an transcribe_with_whispercpp.
+    """
+    duration = wav_duration(audio_path) if audio_path.lower().endswith(".wav") else 0.0
+    if duration < LONG_AUDIO_MIN_SEC:
+        return transcribe_with_whispercpp(audio_path, model_path=model_path, lang=lang, write_outputs=write_outputs,
+                                          output_dir=output_dir, output_basename=output_basename)
+
+    cache_key = None
+    if CACHE_ENABLED:
+        cache_key = transcript_cache_key(audio_path, os.path.abspath(model_path), lang, mode="long")
+        hit = TRANSCRIPT_CACHE.get(cache_key)
+        if hit is not None:
+            vtt_path = _write_outputs(hit["blocks"], audio_path, output_dir, output_basename) if write_outputs else None
+            return hit["text"], vtt_path, hit["blocks"]
 
-    # ── Neu: Defaults ergänzen (Beam-Search + optional Domain-Prompt) ─────────
-    defaults = []
-    beam_size = os.getenv("WHISPER_BEAM", "5")   # falls Build -bs unterstützt
-    if beam_size:
-        defaults += ["-bs", str(beam_size)]
-    if DOMAIN_PROMPT:
-        defaults += ["-p", DOMAIN_PROMPT]
-
-    # Zusätzliche Args übernehmen (optional)
-    if extra_args:
-        cmd.extend(extra_args)
-    # Defaults hinten anhängen
-    if defaults:
-        cmd.extend(defaults)
-
-    # Output-Handling
-    keep_files = False
-    txt_path = None
-    vtt_path = None
-
-    if write_outputs:
-        # Feste Output-Basis
-        if output_dir is None:
-            output_dir = os.path.dirname(audio_path)
-        os.makedirs(output_dir, exist_ok=True)
-        if output_basename is None:
-            # Standard: gleicher Name wie Audio ohne Endung
-            output_basename = os.path.splitext(os.path.basename(audio_path))[0]
-        output_base = os.path.join(output_dir, output_basename)
-
-        # .txt + .vtt erzeugen
-        cmd.extend(["-otxt", "-ovtt", "-of", output_base])
-        txt_path = output_base + ".txt"
-        vtt_path = output_base + ".vtt"
-        keep_files = True
-    else:
-        # Live-Chunk: minimaler IO – nur .txt schreiben, danach löschen
-        # (Viele Builds unterstützen -otxt/-of.)
-        tmp_dir = os.path.dirname(audio_path)  # landet i.d.R. in uploads/
-        os.makedirs(tmp_dir, exist_ok=True)
-        tmp_base = os.path.join(tmp_dir, next(tempfile._get_candidate_names()))
-        cmd.extend(["-otxt", "-of", tmp_base])
-        txt_path = tmp_base + ".txt"
-        vtt_path = tmp_base + ".vtt"  # falls die CLI doch eine VTT ablegt
-        keep_files = False  # nach dem Lesen wieder löschen
-
-    # Ausführen
-    result = subprocess.run(cmd, capture_output=True, text=True)
-
-    if result.returncode != 0:
-        # Versuche, nützlichen Fehler zu zeigen
-        raise RuntimeError(f"whisper-cli Fehler:\ncmd: {' '.join(cmd)}\n{result.stderr}")
-
-    text = ""
-    blocks = []
+    try:
+        silences = detect_silences(audio_path)
+    except Exception as e:
+        print(f"⚠️ silencedetect fehlgeschlagen, schneide hart: {e}")
+        silences = []
+    segments = plan_segments(duration, silences)
+
+    cpus = os.cpu_count() or 4
+    pool = get_whisper_pool(model_path, lang)
+    extra_args = None
+    if max_workers is None:
+        if pool is not None:
+            max_workers = pool.size
+        else:
+            # whisper-cli: Kerne auf parallele Prozesse aufteilen (je ≥ 4 Threads)
+            max_workers = max(1, cpus // 4)
+    if pool is None:
+        extra_args = ["-t", str(max(1, cpus // max_workers))]
+
+    pcm, sr = read_wav_pcm(audio_path)
+    prio = current_priority()   # Executor-Threads erben den Kontext nicht
+
+    def run(job):
+        i, (start, end, _cut) = job
+        seg_path = os.path.join(tmp_dir, f"seg_{i:04d}.wav")
+        write_wav_pcm(seg_path, pcm[int(start * sr) * 2:int(end * sr) * 2], sr)
+        with priority(prio):
+            _, _, blocks = transcribe_with_whispercpp(seg_path, model_path=model_path, lang=lang,
+                                                      write_outputs=False, extra_args=extra_args, use_cache=False)
+        return blocks
+
+    with tempfile.TemporaryDirectory(prefix="aurica_long_") as tmp_dir:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="long-asr") as ex:
+            results = list(ex.map(run, enumerate(segments)))
+
+    print(f"✂️ Lange Datei: {duration:.0f}s in {len(segments)} Segmente, {max_workers} parallel")
+
+    out = []
+    for k, ((start, _end, cut), blocks) in enumerate(zip(segments, results)):
+        next_cut = segments[k + 1][2] if k + 1 < len(segments) else None
+        for b in blocks:
+            b = dict(b)
+            if b.get("start") is not None and b.get("end") is not None:
+                b["start"] += start
+                b["end"] += start
+                mid = (b["start"] + b["end"]) / 2.0
+                # Überlappungsbereiche: jedes Segment gilt nur in [cut, next_cut)
+                if mid < cut or (next_cut is not None and mid >= next_cut):
+                    continue
+                for t in b.get("tokens") or []:
+                    if t.get("start") is not None: t["start"] += start
+                    if t.get("end") is not None: t["end"] += start
+            text = trim_leading_overlap(out[-1]["text"], b["text"]) if out else b["text"]
+            if text:
+                b["text"] = text
+                out.append(b)
+
+    text = "\n".join(b["text"] for b in out)
+    if cache_key:
+        TRANSCRIPT_CACHE.put(cache_key, text, out, os.path.abspath(model_path))
+    vtt_path = _write_outputs(out, audio_path, output_dir, output_basename) if write_outputs else None
+    return text, vtt_path, out
 
-    # Text aus Datei lesen oder Fallback stdout
-    if txt_path and os.path.exists(txt_path):
-        with open(txt_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read().strip()
-        # Blöcke pro Zeile (einfacher Fallback)
-        for line in content.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            blocks.append({"start": None, "end": None, "text": line})
-        text = content
+def read_prompt(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+def _chat_url(url: str) -> str | None:
+    """Chat-Endpunkt zum konfigurierten Generate-Endpunkt (Ollama /api/chat, OpenAI /v1/chat/completions)."""
+    if url.endswith("/api/chat") or url.endswith("/chat/completions"):
+        return url
+    if url.endswith("/api/generate"):
+        return url[: -len("/generate")] + "/chat"
+    if url.endswith("/v1/completions"):
+        return url[: -len("/completions")] + "/chat/completions"
+    return None
+
+def _with_keep_alive(url: str, payload: dict) -> dict:
+    """keep_alive nur an Ollama-Endpunkte (/api/…) – OpenAI-kompatible Server kennen das Feld nicht."""
+    if LLM_KEEP_ALIVE and "/api/" in url:
+        return {**payload, "keep_alive": LLM_KEEP_ALIVE}
+    return payload
+
+def llm_timing(obj: dict | None) -> dict | None:
+    """Server-Zeiten einer Ollama-Antwort (ns) → ms + Token-Zahlen; None, wenn der Server keine liefert."""
+    if not isinstance(obj, dict) or ("eval_duration" not in obj and "prompt_eval_duration" not in obj):
+        return None
+    ms = lambda k: round((obj.get(k) or 0) / 1e6, 1)
+    return {
+        "load_ms": ms("load_duration"),
+        "prompt_eval_ms": ms("prompt_eval_duration"),
+        "eval_ms": ms("eval_duration"),
+        "prompt_tokens": obj.get("prompt_eval_count") or 0,
+        "tokens": obj.get("eval_count") or 0,
+    }
+
+_SEPARATOR_RE = re.compile(r"^-{3,}[ \t]*$", flags=re.MULTILINE)
+
+def split_summary_prompt(template: str) -> tuple[str, str]:
+    """
+    prompt_summary.txt → (System-Nachricht, User-Vorlage mit {dialog}/{geschlecht}).
+    Geteilt wird an der letzten Trennlinie (---) vor {dialog}, sonst vor der Zeile mit {dialog}.
+    Der System-Teil hängt von keinem Aufruf ab: {geschlecht} darin wird zu GESCHLECHT_REF,
+    der Wert steht dann in der User-Nachricht.
+    """
+    pos = template.find("{dialog}")
+    if pos < 0:
+        system_tmpl, user = template, "{dialog}"
     else:
-        # Fallback: aus stdout bestmöglich extrahieren
-        text = _read_txt_fallback(result.stdout)
-        for line in text.splitlines():
-            line = line.strip()
-            if line:
-                blocks.append({"start": None, "end": None, "text": line})
-
-    # Aufräumen im Chunk-Mode
-    if not keep_files:
+        seps = list(_SEPARATOR_RE.finditer(template, 0, pos))
+        if seps:
+            system_tmpl, user = template[: seps[-1].start()], template[seps[-1].end():]
+        else:
+            at = template.rfind("\n", 0, pos) + 1
+            system_tmpl, user = template[:at], template[at:]
+    system = system_tmpl.format(geschlecht=GESCHLECHT_REF).strip()
+    user = user.strip()
+    if "{geschlecht}" in system_tmpl and "{geschlecht}" not in user:
+        user = "Patientengeschlecht: {geschlecht}\n\n" + user
+    return system, user
+
+_warmed: dict[str, float] = {}
+_warm_lock = threading.Lock()
+
+def warm_up_llm(lmmodel_name: str) -> bool:
+    """
+    Modell laden (keep_alive) und im Chat-Modus den System-Teil der Zusammenfassung vorab auswerten,
+    z.B. beim Start einer Live-Session. Höchstens alle LLM_WARMUP_INTERVAL Sekunden je Modell,
+    nur für Ollama-Endpunkte. True = Aufruf erfolgreich.
+    """
+    url = LMSTUDIO_URL
+    if "/api/" not in url:
+        return False
+    now = time.monotonic()
+    with _warm_lock:
+        if now - _warmed.get(lmmodel_name, float("-inf")) < LLM_WARMUP_INTERVAL:
+            return False
+        _warmed[lmmodel_name] = now
+
+    chat_url = _chat_url(url) if LLM_CHAT else None
+    if chat_url:
+        system, _ = split_summary_prompt(read_prompt("prompt_summary.txt"))
+        url, payload = chat_url, {"model": lmmodel_name, "messages": [{"role": "system", "content": system}],
+                                  "stream": False, "options": {"num_predict": 1}}
+    else:
+        payload = {"model": lmmodel_name, "prompt": "", "stream": False}   # leerer Prompt lädt nur das Modell
+    t0 = time.perf_counter()
+    try:
+        with priority(BATCH), SCHEDULER.slot("llm"):
+            resp = ROUTER.post(url, name="warmup", json=_with_keep_alive(url, payload), timeout=120)
+        ok = resp.status_code < 400
+    except requests.RequestException as e:
+        print(f"⚠️ LLM-Vorwärmen fehlgeschlagen: {e}")
+        ok = False
+    if ok:
         try:
-            if txt_path and os.path.exists(txt_path):
-                os.remove(txt_path)
+            obj = resp.json()
         except Exception:
-            pass
+            obj = None   # Vorwärmen hat trotzdem geklappt, nur ohne Server-Zeiten
+        timing = llm_timing(obj) or {}
+        LLM.record_timing("warmup", timing)
+        print(f"🔥 LLM vorgewärmt ({lmmodel_name}): {1000 * (time.perf_counter() - t0):.0f} ms, "
+              f"laden {timing.get('load_ms', '-')} ms, Prompt {timing.get('prompt_eval_ms', '-')} ms")
+    else:
+        with _warm_lock:
+            _warmed.pop(lmmodel_name, None)   # beim nächsten Session-Start erneut versuchen
+    return ok
+
+def _lm_post(url: str, payload: dict, timeout: float, name: str) -> tuple[int, dict | None, str]:
+    """
+    Nicht-streamende Generierung → (HTTP-Status, JSON oder None, Rohtext).
+    Über LLM_MEMO: identische Anfragen (Modell, Prompt, Parameter) kosten nur einmal, auch gleichzeitig.
+    Nur erfolgreiche JSON-Antworten werden gemerkt; Verbindungsfehler werden weitergereicht.
+    """
+    def call():
+        with SCHEDULER.slot("llm"):
+            resp = ROUTER.post(url, name=name, json=payload, timeout=timeout)
         try:
-            if vtt_path and os.path.exists(vtt_path):
-                os.remove(vtt_path)
+            obj = resp.json()
         except Exception:
-            pass
+            obj = None
+        LLM.record_timing(name, llm_timing(obj))
+        return resp.status_code, obj, resp.text
 
-    # Nur zurückgeben, wenn eine echte VTT existiert
-    vtt_path = vtt_path if (vtt_path and os.path.exists(vtt_path)) else None
-    return text, vtt_path, blocks
+    return LLM_MEMO.get_or_compute(memo_key(url, payload), call,
+                                   cache_if=lambda r: r[0] < 400 and isinstance(r[1], dict))
 
-def read_prompt(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return f.read()
+def _lm_generate(prompt: str, lmmodel_name: str, temperature: float = 0.0, timeout_default: float = 30.0,
+                 name: str = "speaker") -> str:
+    """Ein nicht-streamender Aufruf an LMSTUDIO_URL → Antworttext. Wirft bei Verbindungs-/HTTP-Fehlern."""
+    url = LMSTUDIO_URL
+    try:
+        timeout = float(os.getenv("LMSTUDIO_TIMEOUT", str(timeout_default)))
+    except Exception:
+        timeout = timeout_default
+
+    payload = _with_keep_alive(url, {
+        "model": lmmodel_name,
+        "prompt": prompt,
+        "stream": False,
+        "temperature": temperature
+    })
+    status, obj, raw = _lm_post(url, payload, timeout, name)
+    if obj is None:
+        obj = {"error": f"Ungültige JSON-Antwort (HTTP {status})", "raw": raw[:200]}
+
+    if status >= 400:
+        msg = obj.get("error") or obj.get("message") or str(obj)
+        raise RuntimeError(f"HTTP {status}: {msg}")
+    return _extract_lm_text(obj) or ""
+
+def _speaker_from_text(text: str) -> str | None:
+    low = (text or "").lower()
+    if "patient" in low:
+        return "Patient"
+    if "arzt" in low:
+        return "Arzt"
+    return None
+
+def _speaker_for_line(blocks, i: int, lmmodel_name: str, speaker_prompt: str) -> str | None:
+    """Einzelne Zeile zuordnen (Vorgängersatz als Kontext) → "Arzt"/"Patient"/None. Wirft bei API-Fehlern."""
+    context = f"Vorheriger Satz:\n{blocks[i-1]['text']}\n\n" if i > 0 else ""
+    prompt = speaker_prompt.format(context=context, sentence=blocks[i]['text'])
+    return _speaker_from_text(_lm_generate(prompt, lmmodel_name))
 
 def assign_speakers_llm(blocks, lmmodel_name):
     """
-    Weist Blöcken (Textzeilen) Sprecher zu ("Patient"/"Arzt") über einen lokalen LLM-Endpunkt.
+    Weist Blöcken (Textzeilen) Sprecher zu ("Patient"/"Arzt") über einen lokalen LLM-Endpunkt – ein Aufruf pro Zeile.
     Robust gegen unterschiedliche JSON-Formate und API-Fehler.
     ENV:
-      LMSTUDIO_URL (default: http://192.168.105.136:11434/api/generate)
+      LMSTUDIO_URL (default: siehe llm_client.py)
       LMSTUDIO_TIMEOUT (Sekunden, default: 30)
     """
-    url = os.getenv("LMSTUDIO_URL", "http://192.168.105.136:11434/api/generate")
-    try:
-        timeout = float(os.getenv("LMSTUDIO_TIMEOUT", "30"))
-    except Exception:
-        timeout = 30.0
-
-    headers = {"Content-Type": "application/json"}
     speaker_prompt = read_prompt("prompt_speaker.txt")
     results = []
     last_speaker = None
 
     for i, block in enumerate(blocks):
-        context = f"Vorheriger Satz:\n{blocks[i-1]['text']}\n\n" if i > 0 else ""
-        prompt = speaker_prompt.format(context=context, sentence=block['text'])
-
-        payload = {
-            "model": lmmodel_name,
-            "prompt": prompt,
-            "stream": False,
-            "temperature": 0.0
-        }
-
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
-            try:
-                obj = resp.json()
-            except Exception:
-                obj = {"error": f"Ungültige JSON-Antwort (HTTP {resp.status_code})", "raw": resp.text[:200]}
-
-            if resp.status_code >= 400:
-                msg = obj.get("error") or obj.get("message") or str(obj)
-                raise RuntimeError(f"HTTP {resp.status_code}: {msg}")
-
-            text = _extract_lm_text(obj) or ""
-            low = text.lower()
-            if "patient" in low:
-                speaker = "Patient"
-            elif "arzt" in low:
-                speaker = "Arzt"
-            else:
+            speaker = _speaker_for_line(blocks, i, lmmodel_name, speaker_prompt)
+            if speaker is None:
                 speaker = "Patient" if last_speaker == "Arzt" else "Arzt"
         except Exception as e:
             speaker = f"Fehler: {e}"
@@ -220,6 +679,93 @@ def assign_speakers_llm(blocks, lmmodel_name):
 
     return results
 
+def update_live_notes(notes: str, segment: str, lmmodel_name: str) -> str:
+    """
+    Laufende Notizen einer Live-Session um einen neuen Transkript-Abschnitt ergänzen (prompt_notes.txt).
+    Wirft bei Verbindungs-/HTTP-Fehlern; leere Antwort → bisherige Notizen bleiben.
+    """
+    prompt = read_prompt("prompt_notes.txt").format(notes=notes.strip() or "—", segment=segment.strip())
+    updated = _lm_generate(prompt, lmmodel_name, temperature=0.2, timeout_default=60.0, name="notes")
+    return updated.strip() or notes
+
+_BATCH_ANSWER_RE = re.compile(r"^\W*(\d+)\W+(arzt|patient)\b", flags=re.IGNORECASE | re.MULTILINE)
+
+def _parse_batch_answer(text: str, n: int) -> dict[int, str]:
+    """Antwort "1: Arzt\n2: Patient…" → {Zeilennummer (1-basiert): Sprecher}; Nummern außerhalb 1..n ignoriert."""
+    out = {}
+    for num, spk in _BATCH_ANSWER_RE.findall(text or ""):
+        k = int(num)
+        if 1 <= k <= n and k not in out:
+            out[k] = "Arzt" if spk.lower() == "arzt" else "Patient"
+    return out
+
+def assign_speakers_llm_batched(blocks, lmmodel_name, window: int = DIAR_BATCH_LINES, overlap: int = DIAR_BATCH_OVERLAP,
+                                known: list[str | None] | None = None):
+    """
+    Wie assign_speakers_llm, aber fensterweise: bis zu `window` nummerierte Zeilen pro LLM-Aufruf,
+    die letzten `overlap` schon zugeordneten Zeilen davor gehen als Kontext mit.
+    known: bereits bekannte Sprecher je Zeile (z.B. aus der Live-Aufnahme) – gefragt wird nur,
+    wo None steht; Fenster ohne offene Zeile entfallen.
+    Zeilen, die in der Antwort fehlen, werden einzeln (prompt_speaker.txt) nachgefragt.
+    Ist der Endpunkt nicht erreichbar, bekommt das Fenster "Fehler: …" (kein Einzel-Retry je Zeile).
+    """
+    if window <= 1 and known is None:
+        return assign_speakers_llm(blocks, lmmodel_name)
+    return [f"{spk}: {b['text']}" for spk, b in zip(speaker_labels_batched(blocks, lmmodel_name, window, overlap, known), blocks)]
+
+def speaker_labels_batched(blocks, lmmodel_name, window: int = DIAR_BATCH_LINES, overlap: int = DIAR_BATCH_OVERLAP,
+                           known: list[str | None] | None = None) -> list[str]:
+    """Sprecher je Zeile ("Arzt"/"Patient"/"Fehler: …") – siehe assign_speakers_llm_batched."""
+    speakers: list[str | None] = list(known) if known is not None else [None] * len(blocks)
+    window = max(1, window)
+    batch_prompt = read_prompt("prompt_speaker_batch.txt")
+    speaker_prompt = None
+    stats = {"calls": 0, "retries": 0, "known": sum(1 for s in speakers if s)}
+
+    start = 0
+    while start < len(blocks):
+        if speakers[start]:
+            start += 1
+            continue
+        end = min(len(blocks), start + window)
+        ctx_lines = [f"{speakers[j]}: {blocks[j]['text']}" for j in range(max(0, start - overlap), start)
+                     if speakers[j] and not speakers[j].startswith("Fehler")]
+        context = ("Bereits zugeordnet (vorherige Zeilen):\n" + "\n".join(ctx_lines) + "\n\n") if ctx_lines else ""
+        lines = "\n".join(f"{k}: {blocks[j]['text']}" for k, j in enumerate(range(start, end), 1))
+
+        try:
+            stats["calls"] += 1
+            answer = _parse_batch_answer(
+                _lm_generate(batch_prompt.format(context=context, lines=lines), lmmodel_name, name="speaker_batch"),
+                end - start)
+        except Exception as e:
+            for j in range(start, end):
+                speakers[j] = speakers[j] or f"Fehler: {e}"
+            start = end
+            continue
+
+        for k, j in enumerate(range(start, end), 1):
+            if speakers[j]:
+                continue             # schon bekannt – Antwort nur Kontext
+            if k in answer:
+                speakers[j] = answer[k]
+                continue
+            # fehlt in der Antwort → einzeln nachfragen
+            speaker_prompt = speaker_prompt or read_prompt("prompt_speaker.txt")
+            try:
+                stats["retries"] += 1
+                speakers[j] = _speaker_for_line(blocks, j, lmmodel_name, speaker_prompt)
+            except Exception as e:
+                speakers[j] = f"Fehler: {e}"
+            if speakers[j] is None:
+                prev = speakers[j - 1] if j > 0 else None
+                speakers[j] = "Patient" if prev == "Arzt" else "Arzt"
+        start = end
+
+    print(f"🗣️ Sprecherzuordnung: {len(blocks)} Zeilen ({stats['known']} schon bekannt), "
+          f"{stats['calls']} Fenster-Aufrufe, {stats['retries']} Einzel-Retries")
+    return speakers
+
     
 def _extract_lm_text(obj: dict) -> str | None:
     """
@@ -235,6 +781,13 @@ def _extract_lm_text(obj: dict) -> str | None:
         if isinstance(val, str) and val.strip():
             return val.strip()
 
+    # Ollama /api/chat
+    msg = obj.get("message")
+    if isinstance(msg, dict):
+        cont = msg.get("content")
+        if isinstance(cont, str) and cont.strip():
+            return cont.strip()
+
     # OpenAI-ähnlich
     choices = obj.get("choices")
     if isinstance(choices, list) and choices:
@@ -268,51 +821,172 @@ def _extract_lm_text(obj: dict) -> str | None:
 
     return None
 
-def summarize_with_lmstudio(transcript: str, geschlecht: str, lmmodel_name: str):
+def _extract_stream_piece(obj: dict) -> str:
+    """Text-Stück aus einer Stream-Zeile (Ollama generate/chat, OpenAI delta) – Leerraum bleibt erhalten."""
+    piece = obj.get("response")
+    if isinstance(piece, str):
+        return piece
+    msg = obj.get("message")
+    if isinstance(msg, dict) and isinstance(msg.get("content"), str):
+        return msg["content"]
+    choices = obj.get("choices")
+    if isinstance(choices, list) and choices and isinstance(choices[0], dict):
+        delta = choices[0].get("delta")
+        if isinstance(delta, dict) and isinstance(delta.get("content"), str):
+            return delta["content"]
+        if isinstance(choices[0].get("text"), str):
+            return choices[0]["text"]
+    return ""
+
+def _iter_stream_text(resp, final: dict | None = None):
+    """
+    Token-Stücke aus einer NDJSON- oder SSE-Antwort ("data: {...}", "data: [DONE]").
+    final: bekommt die Abschlusszeile (done=true, bei Ollama mit den Server-Zeiten).
+    """
+    import json
+    for raw in resp.iter_lines():
+        line = raw.decode("utf-8", errors="replace").strip() if isinstance(raw, bytes) else (raw or "").strip()
+        if not line or line.startswith(":"):
+            continue
+        if line.startswith("data:"):
+            line = line[5:].strip()
+            if line == "[DONE]":
+                break
+        elif line.startswith(("event:", "id:", "retry:")):
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(obj, dict):
+            continue
+        if obj.get("error"):
+            err = obj["error"]
+            raise RuntimeError(err.get("message") if isinstance(err, dict) else str(err))
+        piece = _extract_stream_piece(obj)
+        if piece:
+            yield piece
+        if obj.get("done") is True:
+            if final is not None:
+                final.update(obj)
+            break
+
+def _summarize_streaming(url: str, payload: dict, timeout: float, on_token, timing: dict | None = None) -> str:
+    """
+    Wie die nicht-streamende Zusammenfassung, aber Token-Stücke gehen sofort an on_token.
+    Ergebnis landet im selben Memo-Eintrag wie die nicht-streamende Anfrage.
+    """
+    key = memo_key(url, payload)
+    cached = LLM_MEMO.peek(key)
+    if cached is not None:
+        text = _extract_lm_text(cached[1]) or ""
+        if text:
+            if timing is not None:
+                timing["memo"] = True
+            on_token(text)
+            return text.strip()
+
+    parts = []
+    final = {}
+    t0 = time.perf_counter()
+    try:
+        with SCHEDULER.slot("llm"):
+            resp = ROUTER.post(url, name="summary_stream", json={**payload, "stream": True}, timeout=timeout, stream=True)
+            with resp:
+                if resp.status_code >= 400:
+                    try:
+                        obj = resp.json()
+                        err = obj.get("error") or obj.get("message") or str(obj)
+                    except Exception:
+                        err = (resp.text or "").strip()[:400]
+                    return f"Fehler bei Zusammenfassung: HTTP {resp.status_code}: {err}"
+                for piece in _iter_stream_text(resp, final):
+                    if not parts:
+                        print(f"⏱️ Zusammenfassung: erstes Token nach {1000 * (time.perf_counter() - t0):.0f} ms")
+                    parts.append(piece)
+                    on_token(piece)
+    except requests.RequestException as e:
+        if parts:
+            return f"Fehler bei Zusammenfassung: Stream abgebrochen ({e})"
+        return f"Fehler bei Zusammenfassung: Verbindung fehlgeschlagen ({e})"
+    except RuntimeError as e:
+        return f"Fehler bei Zusammenfassung: {e}"
+
+    server_timing = llm_timing(final)
+    LLM.record_timing("summary_stream", server_timing)
+    if timing is not None and server_timing:
+        timing.update(server_timing)
+    text = "".join(parts).strip()
+    if not text:
+        return "Fehler bei Zusammenfassung: Leere Antwort vom Stream."
+    LLM_MEMO.put(key, (200, {"response": text}, ""))
+    return text
+
+def summarize_with_lmstudio(transcript: str, geschlecht: str, lmmodel_name: str, on_token=None,
+                            timing: dict | None = None):
     """
     Fasst das Gespräch zusammen über einen lokalen LLM-Endpunkt.
     Robust gegen unterschiedliche JSON-Formate und Fehlermeldungen.
+    on_token(stück): Zusammenfassung streamen und Teiltext sofort weiterreichen (SUMMARY_STREAM=1);
+    Rückgabe ist immer der komplette Text.
+    timing: bekommt die Server-Zeiten (load_ms, prompt_eval_ms, eval_ms, Token-Zahlen), sofern geliefert.
     Konfigurierbar per ENV:
-      LMSTUDIO_URL (default: http://192.168.105.136:11434/api/generate)
+      LMSTUDIO_URL (default: siehe llm_client.py)
       LMSTUDIO_TIMEOUT (Sekunden, default: 60)
+      LLM_CHAT (1 = System-/User-Nachricht über den Chat-Endpunkt, default: 1)
     """
     import json
 
     summary_prompt = read_prompt("prompt_summary.txt")
-    prompt = summary_prompt.format(dialog=transcript, geschlecht=geschlecht)
 
-    url = os.getenv("LMSTUDIO_URL", "http://192.168.105.136:11434/api/generate")
+    url = LMSTUDIO_URL
     try:
         timeout = float(os.getenv("LMSTUDIO_TIMEOUT", "60"))
     except Exception:
         timeout = 60.0
 
-    payload = {
-        "model": lmmodel_name,
-        "prompt": prompt,
-        "stream": False,
-        "temperature": 0.2
-    }
-    headers = {"Content-Type": "application/json"}
+    chat_url = _chat_url(url) if LLM_CHAT else None
+    if chat_url:
+        system, user = split_summary_prompt(summary_prompt)
+        url = chat_url
+        payload = {
+            "model": lmmodel_name,
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": user.format(dialog=transcript, geschlecht=geschlecht)},
+            ],
+            "stream": False,
+            "temperature": 0.2
+        }
+    else:
+        payload = {
+            "model": lmmodel_name,
+            "prompt": summary_prompt.format(dialog=transcript, geschlecht=geschlecht),
+            "stream": False,
+            "temperature": 0.2
+        }
+    payload = _with_keep_alive(url, payload)
+    if on_token is not None and SUMMARY_STREAM:
+        return _summarize_streaming(url, payload, timeout, on_token, timing)
 
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=timeout)
+        status, obj, raw = _lm_post(url, payload, timeout, "summary")
     except requests.RequestException as e:
         return f"Fehler bei Zusammenfassung: Verbindung fehlgeschlagen ({e})"
+    if timing is not None:
+        timing.update(llm_timing(obj) or {})
 
-    # Versuche JSON zu parsen – sonst zeige Rohtext an
-    try:
-        obj = resp.json()
-    except Exception:
-        snippet = (resp.text or "").strip()
+    # JSON nicht lesbar – zeige Rohtext an
+    if obj is None:
+        snippet = (raw or "").strip()
         if len(snippet) > 400:
             snippet = snippet[:400] + "…"
-        return f"Fehler bei Zusammenfassung: Ungültige JSON-Antwort (HTTP {resp.status_code}): {snippet}"
+        return f"Fehler bei Zusammenfassung: Ungültige JSON-Antwort (HTTP {status}): {snippet}"
 
     # API-spezifischer Fehler?
-    if resp.status_code >= 400:
+    if status >= 400:
         err = obj.get("error") or obj.get("message") or str(obj)
-        return f"Fehler bei Zusammenfassung: HTTP {resp.status_code}: {err}"
+        return f"Fehler bei Zusammenfassung: HTTP {status}: {err}"
 
     text = _extract_lm_text(obj)
     if not text:
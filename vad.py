@@ -0,0 +1,91 @@
+import os
+
+try:
+    import numpy as np
+    USE_NUMPY = True
+except Exception:
+    USE_NUMPY = False
+
+# ── Energie-VAD für Live-Chunks ───────────────────────────────────────────
+# Frame-Energie (dB) gegen einen pro Session mitlaufenden Rauschboden.
+# Reine Raumgeräusch-Chunks gehen gar nicht erst an whisper (spart CPU und
+# verhindert Halluzinationen auf Stille), Stille am Chunk-Rand wird abgeschnitten.
+VAD_ENABLED      = os.getenv("VAD_ENABLED", "1") != "0"
+VAD_FRAME_MS     = float(os.getenv("VAD_FRAME_MS", "30"))
+VAD_MARGIN_DB    = float(os.getenv("VAD_MARGIN_DB", "10"))      # Sprache = Rauschboden + Marge
+VAD_MIN_DB       = float(os.getenv("VAD_MIN_DB", "-50"))        # absolute Untergrenze (digitale Stille)
+VAD_MAX_FLOOR_DB = float(os.getenv("VAD_MAX_FLOOR_DB", "-40"))  # Rauschboden nie höher (Chunk ganz ohne Pause)
+VAD_HANG_MS      = float(os.getenv("VAD_HANG_MS", "300"))       # Sprachabschnitte beidseitig verlängern
+VAD_MIN_SPEECH   = float(os.getenv("VAD_MIN_SPEECH", "0.05"))   # Anteil, ab dem ein Chunk dekodiert wird
+_FLOOR_ALPHA = 0.2          # Glättung des Rauschbodens über die Chunks einer Session
+_FLOOR_PERCENTILE = 10      # leisester Anteil eines Chunks ≈ Raumgeräusch
+
+
+class EnergyVAD:
+    """
+    VAD-Zustand einer Live-Session (adaptiver Rauschboden).
+    analyze(pcm) → {"speech_ratio", "spans": [(start, end), ...] in Sekunden (Chunk-Zeit), "floor_db"}
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.floor_db = None
+
+    def _frame_db(self, pcm: bytes):
+        x = np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32768.0
+        n = max(1, int(self.sample_rate * VAD_FRAME_MS / 1000.0))
+        frames = len(x) // n
+        if frames == 0:
+            return np.zeros(0, dtype=np.float32), n
+        power = (x[: frames * n].reshape(frames, n) ** 2).mean(axis=1)
+        return 10.0 * np.log10(power + 1e-10), n
+
+    def analyze(self, pcm: bytes) -> dict:
+        db, n = self._frame_db(pcm)
+        if len(db) == 0:
+            return {"speech_ratio": 0.0, "spans": [], "floor_db": self.floor_db}
+
+        # Rauschboden nachführen – aber nur nach unten schnell, nach oben träge
+        chunk_floor = float(np.percentile(db, _FLOOR_PERCENTILE))
+        if self.floor_db is None:
+            self.floor_db = chunk_floor
+        elif chunk_floor < self.floor_db:
+            self.floor_db = chunk_floor
+        else:
+            self.floor_db = (1 - _FLOOR_ALPHA) * self.floor_db + _FLOOR_ALPHA * chunk_floor
+
+        self.floor_db = min(self.floor_db, VAD_MAX_FLOOR_DB)
+        speech = db > max(self.floor_db + VAD_MARGIN_DB, VAD_MIN_DB)
+        ratio = float(speech.mean())
+
+        # Hangover: Sprach-Frames um VAD_HANG_MS aufweiten (Wortanfänge/-enden nicht abschneiden)
+        hang = int(round(VAD_HANG_MS / VAD_FRAME_MS))
+        if hang > 0 and speech.any():
+            speech = np.convolve(speech.astype(np.int8), np.ones(2 * hang + 1, dtype=np.int8), mode="same") > 0
+
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+        sec = n / float(self.sample_rate)
+        spans = [(round(float(s * sec), 3), round(float(e * sec), 3)) for s, e in zip(starts, ends)]
+        return {"speech_ratio": round(ratio, 3), "spans": spans, "floor_db": round(self.floor_db, 1)}
+
+
+def new_session_vad(sample_rate: int = 16000) -> EnergyVAD | None:
+    """VAD für eine neue Live-Session – None, wenn deaktiviert oder NumPy fehlt (→ alles ist Sprache)."""
+    if not (VAD_ENABLED and USE_NUMPY):
+        return None
+    return EnergyVAD(sample_rate)
+
+
+def speech_bounds(spans: list[tuple[float, float]]) -> tuple[float, float] | None:
+    """Erster Sprachbeginn / letztes Sprachende eines Chunks (None = keine Sprache)."""
+    if not spans:
+        return None
+    return spans[0][0], spans[-1][1]
+
+
+def has_speech_between(spans: list[tuple[float, float]] | None, start: float, end: float) -> bool:
+    """Überschneidet ein Sprachabschnitt [start, end)? spans=None (kein VAD) zählt immer als Sprache."""
+    if spans is None:
+        return True
+    return any(s < end and e > start for s, e in spans)
@@ -0,0 +1,240 @@
+import atexit
+import os
+import queue
+import socket
+import subprocess
+import threading
+import time
+
+import requests
+
+# ── Resident whisper.cpp-Worker ───────────────────────────────────────────
+# Statt pro Live-Chunk einen neuen whisper-cli-Prozess zu starten (und das
+# GGML-Modell jedes Mal neu von der Platte zu laden), halten wir N langlebige
+# whisper-server-Prozesse mit geladenem Modell vor. Jobs gehen per HTTP über
+# 127.0.0.1 an einen freien Worker.
+POOL_SIZE        = int(os.getenv("WHISPER_POOL_SIZE", "2"))        # 0 = Pool aus, immer whisper-cli
+START_TIMEOUT    = float(os.getenv("WHISPER_POOL_START_TIMEOUT", "120"))
+JOB_TIMEOUT      = float(os.getenv("WHISPER_POOL_JOB_TIMEOUT", "600"))
+HEALTH_INTERVAL  = float(os.getenv("WHISPER_POOL_HEALTH_SEC", "10"))
+ACQUIRE_TIMEOUT  = float(os.getenv("WHISPER_POOL_ACQUIRE_TIMEOUT", "900"))
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class WhisperWorker:
+    """
+    Ein whisper-server-Prozess mit genau einem geladenen Modell.
+    Bearbeitet immer nur einen Job gleichzeitig (whisper-server serialisiert intern ohnehin).
+    """
+
+    def __init__(self, idx: int, server_path: str, model_path: str, threads: int, args: list[str]):
+        self.idx = idx
+        self.server_path = server_path
+        self.model_path = model_path
+        self.threads = threads
+        self.args = list(args)
+        self.port = None
+        self.proc = None
+        self.restarts = 0
+        self.jobs = 0
+        self.lock = threading.Lock()   # gehalten, solange ein Job/Restart läuft
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self) -> None:
+        self.port = _free_port()
+        cmd = [
+            self.server_path,
+            "-m", self.model_path,
+            "--host", "127.0.0.1",
+            "--port", str(self.port),
+            "-t", str(self.threads),
+        ] + self.args
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        deadline = time.time() + START_TIMEOUT
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"whisper-server Worker {self.idx} beendet (rc={self.proc.returncode}): {' '.join(cmd)}")
+            if self.healthy():
+                print(f"✅ whisper-server Worker {self.idx} bereit (Port {self.port})")
+                return
+            time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"whisper-server Worker {self.idx} nicht rechtzeitig bereit ({START_TIMEOUT:.0f}s)")
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def healthy(self) -> bool:
+        if not self.alive():
+            return False
+        try:
+            r = requests.get(f"{self.base_url}/health", timeout=2)
+            if r.status_code == 404:
+                # ältere Builds ohne /health: Startseite genügt als Lebenszeichen
+                r = requests.get(f"{self.base_url}/", timeout=2)
+            return r.status_code == 200
+        except requests.RequestException:
+            return False
+
+    def stop(self) -> None:
+        if self.proc is None:
+            return
+        try:
+            self.proc.terminate()
+            self.proc.wait(timeout=5)
+        except Exception:
+            try: self.proc.kill()
+            except Exception: pass
+        self.proc = None
+
+    def restart(self) -> None:
+        print(f"♻️ whisper-server Worker {self.idx} wird neu gestartet")
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def transcribe(self, wav_bytes: bytes, lang: str, response_format: str):
+        files = {"file": ("audio.wav", wav_bytes, "audio/wav")}
+        data = {"response_format": response_format, "language": lang, "temperature": "0.0"}
+        r = requests.post(f"{self.base_url}/inference", files=files, data=data, timeout=JOB_TIMEOUT)
+        if r.status_code >= 400:
+            raise RuntimeError(f"whisper-server HTTP {r.status_code}: {r.text[:200]}")
+        self.jobs += 1
+        return r.json() if response_format.endswith("json") else r.text
+
+
+class WhisperPool:
+    """
+    Pool aus `size` WhisperWorkern für ein Modell.
+    - Workers werden beim ersten Zugriff gestartet
+    - Hintergrund-Thread prüft regelmäßig Prozess + /health und startet Abgestürzte neu
+    - Stirbt ein Worker während eines Jobs, wird er neu gestartet und der Job einmal wiederholt
+    """
+
+    def __init__(self, server_path: str, model_path: str, size: int, lang: str = "de", args: list[str] | None = None):
+        self.server_path = server_path
+        self.model_path = model_path
+        self.size = max(1, size)
+        self.lang = lang
+        threads = os.getenv("WHISPER_THREADS")
+        threads = int(threads) if threads else max(1, (os.cpu_count() or 4) // self.size)
+        self.workers = [WhisperWorker(i, server_path, model_path, threads, args or []) for i in range(self.size)]
+        self._idle = queue.Queue()
+        self._closed = False
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._started:
+                return
+            try:
+                for w in self.workers:
+                    w.start()
+            except Exception:
+                # Teilstart: schon laufende Worker nicht verwaisen lassen (nächster Zugriff startet neu)
+                for w in self.workers:
+                    w.stop()
+                raise
+            for w in self.workers:
+                self._idle.put(w)
+            self._started = True
+            threading.Thread(target=self._monitor, name="whisper-pool-health", daemon=True).start()
+
+    def _monitor(self) -> None:
+        while not self._closed:
+            time.sleep(HEALTH_INTERVAL)
+            for w in self.workers:
+                # Nur freie Worker prüfen – belegte melden sich beim Job selbst
+                if not w.lock.acquire(blocking=False):
+                    continue
+                try:
+                    if not self._closed and not w.healthy():
+                        w.restart()
+                except Exception as e:
+                    print(f"⚠️ whisper-server Worker {w.idx} Health-Check/Restart fehlgeschlagen: {e}")
+                finally:
+                    w.lock.release()
+
+    def transcribe(self, wav_bytes: bytes, lang: str | None = None, response_format: str = "text"):
+        self.start()
+        try:
+            w = self._idle.get(timeout=ACQUIRE_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError("whisper-Pool: kein freier Worker (Timeout)")
+        try:
+            with w.lock:
+                if not w.alive():
+                    w.restart()
+                try:
+                    return w.transcribe(wav_bytes, lang or self.lang, response_format)
+                except requests.ConnectionError:
+                    # Worker während des Jobs abgestürzt → neu starten, Job einmal wiederholen
+                    w.restart()
+                    return w.transcribe(wav_bytes, lang or self.lang, response_format)
+        finally:
+            self._idle.put(w)
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model_path,
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "workers": [
+                {"idx": w.idx, "port": w.port, "alive": w.alive(), "jobs": w.jobs, "restarts": w.restarts}
+                for w in self.workers
+            ],
+        }
+
+    def shutdown(self) -> None:
+        self._closed = True
+        for w in self.workers:
+            w.stop()
+
+
+_POOLS: dict[str, WhisperPool] = {}
+_POOLS_LOCK = threading.Lock()
+_POOL_DISABLED_WARNED = False
+
+
+def get_pool(server_path: str, model_path: str, lang: str = "de", args: list[str] | None = None) -> WhisperPool | None:
+    """
+    Liefert den (ggf. neu angelegten) Pool für model_path – oder None, wenn der Pool
+    deaktiviert ist bzw. kein whisper-server-Binary existiert (→ Fallback whisper-cli).
+    """
+    global _POOL_DISABLED_WARNED
+    if POOL_SIZE <= 0:
+        return None
+    if not os.path.exists(server_path):
+        if not _POOL_DISABLED_WARNED:
+            print(f"⚠️ whisper-server nicht gefunden ({server_path}) – nutze whisper-cli pro Aufruf")
+            _POOL_DISABLED_WARNED = True
+        return None
+    key = os.path.abspath(model_path)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = WhisperPool(server_path, key, POOL_SIZE, lang=lang, args=args)
+            _POOLS[key] = pool
+        return pool
+
+
+def pool_stats() -> list[dict]:
+    with _POOLS_LOCK:
+        return [p.stats() for p in _POOLS.values()]
+
+
+@atexit.register
+def _shutdown_pools() -> None:
+    with _POOLS_LOCK:
+        for p in _POOLS.values():
+            p.shutdown()